@@ -2,6 +2,7 @@ import collections
 import itertools
 import json
 import threading
+import time
 import typing as t
 
 from gi.repository import Gtk, Gdk  # type: ignore
@@ -9,6 +10,7 @@ import cairo
 
 from . import component_registry
 from . import draw
+from . import pacing
 from . import save_load
 from . import shapes
 from . import tools
@@ -22,6 +24,9 @@ if t.TYPE_CHECKING:
 
 
 class Application:
+    # Maximum number of repaints per second in turbo mode
+    MAX_FRAME_RATE = 30
+
     def __init__(self, circuit: 'circuit_mod.Circuit') -> None:
         self._create_tool = tools.CreateTool()
         self._edit_tool = tools.EditTool()
@@ -71,10 +76,15 @@ class Application:
             builder, 'tool_button_step', Gtk.ToolButton)
         self._playing = threading.Event()
         self._stepping = threading.Event()
-        self._update_time = 0.5
+        self._pacer = pacing.Pacer(0.5, repaint_interval=1/self.MAX_FRAME_RATE)
+        self._skip_idle = False
+        self._turbo = False
+        # 0 runs as many ticks as fit in a frame
+        self._ticks_per_frame = 0
+        self._tick_rate = pacing.RateCounter()
         speed_button = utils.get_builder_obj(
             builder, 'play_speed_button', Gtk.SpinButton)
-        speed_button.set_value(self._update_time*1000)
+        speed_button.set_value(self._pacer.period*1000)
 
         self._circuit = circuit
         self._color_updates = False
@@ -140,15 +150,39 @@ class Application:
 
         def update_thread_func() -> None:
             while True:
-                self._playing.wait()
+                if not self._playing.is_set():
+                    self._tick_rate.reset()
+                    self._playing.wait()
+                    self._pacer.start()
                 if exit_event.is_set():
                     break
-                self._circuit.update()
-                self.repaint()
                 if self._stepping.is_set():
+                    self._step()
+                    self.repaint()
                     self._playing.clear()
                     self._stepping.clear()
-                elif exit_event.wait(self._update_time):
+                    continue
+
+                # Sleep until something is scheduled, e.g. by clicking a button
+                updates_pending = self._circuit.updates_pending
+                if not updates_pending.is_set():
+                    self._tick_rate.reset()
+                    self.repaint()
+                    updates_pending.wait()
+                    self._pacer.start()
+                    continue
+
+                # Only repaint if something was updated
+                if self._turbo:
+                    wait_time, repaint = self._run_frame()
+                else:
+                    changed = self._step()
+                    wait_time = self._pacer.finish_tick()
+                    repaint = changed and self._pacer.should_repaint()
+                self._tick_rate.update(self._circuit.time)
+                if repaint:
+                    self.repaint()
+                if exit_event.wait(wait_time):
                     break
 
         update_thread = threading.Thread(target=update_thread_func)
@@ -157,10 +191,37 @@ class Application:
         self._window.show_all()
         Gtk.main()
 
-        self._playing.set()  # so the update thread can exit
+        # Wake up the update thread so it can exit
         exit_event.set()
+        self._playing.set()
+        self._circuit.updates_pending.set()
         update_thread.join()
 
+    def _step(self) -> bool:
+        ''' Update the circuit once, returning whether anything was updated '''
+        if self._skip_idle:
+            return self._circuit.advance_to_next_event()
+        return self._circuit.update()
+
+    def _run_frame(self) -> tuple[float, bool]:
+        ''' Run a frame's worth of ticks
+
+        Returns the time left in the frame and whether anything was updated.
+        '''
+        frame_end = time.monotonic() + 1 / self.MAX_FRAME_RATE
+        changed = False
+        if self._ticks_per_frame:
+            for _ in range(self._ticks_per_frame):
+                changed |= self._step()
+                if not self._circuit.updates_pending.is_set():
+                    break
+        else:
+            while time.monotonic() < frame_end and self._playing.is_set():
+                changed |= self._step()
+                if not self._circuit.updates_pending.is_set():
+                    break
+        return max(0.0, frame_end - time.monotonic()), changed
+
     def repaint(self) -> None:
         self._draw_area.queue_draw()
 
@@ -291,9 +352,24 @@ class Application:
     def handler_step(self, widget: Gtk.Widget) -> None:
         self._stepping.set()
         self._playing.set()
+        # Step even if the update thread is waiting for something to update
+        self._circuit.updates_pending.set()
 
     def handler_speed_set(self, widget: Gtk.SpinButton) -> None:
-        self._update_time = widget.get_value_as_int() / 1000.0
+        self._pacer.period = widget.get_value_as_int() / 1000.0
+
+    def handler_toggle_turbo(self, widget: Gtk.ToggleToolButton) -> None:
+        self._turbo = widget.get_active()
+        self._pacer.start()
+
+    def handler_ticks_per_frame_set(self, widget: Gtk.SpinButton) -> None:
+        self._ticks_per_frame = widget.get_value_as_int()
+
+    def handler_toggle_drop_repaints(self, widget: Gtk.ToggleToolButton) -> None:
+        self._pacer.drop_repaints = widget.get_active()
+
+    def handler_toggle_skip_idle(self, widget: Gtk.ToggleToolButton) -> None:
+        self._skip_idle = widget.get_active()
 
     def handler_toggle_color_updates(self, widget: Gtk.ToggleToolButton) -> None:
         self._color_updates = widget.get_active()
@@ -323,6 +399,8 @@ class Application:
                 self._property_box.add(widget)
 
     def handler_draw_area_draw(self, widget: Gtk.Widget, cr: cairo.Context) -> None:
+        self._circuit.refresh()
+
         with draw.save_state(cr):
             # Round to prevent issues drawing images at fractional positions
             cr.translate(*-(self._position * self.scale - self.size / 2).round())
@@ -373,6 +451,20 @@ class Application:
             draw.text(cr, str(mouse_pos), draw_pos, size=12,
                       h_align=draw.TextHAlign.LEFT, v_align=draw.TextVAlign.BOTTOM)
 
+        rate = self._tick_rate.rate
+        if self._playing.is_set() and rate is not None:
+            status = f'{rate:.0f} ticks/s'
+            if not self._turbo:
+                stats = self._pacer.stats
+                status += (f' of {1/self._pacer.period:.0f}, {stats.overruns} late, '
+                           f'{stats.underruns} on time')
+                if stats.dropped_repaints:
+                    status += f', {stats.dropped_repaints} repaints dropped'
+            with draw.save_state(cr):
+                draw_pos = shapes.Vector2((self.size.x - 10, self.size.y - 10))
+                draw.text(cr, status, draw_pos, size=12,
+                          h_align=draw.TextHAlign.RIGHT, v_align=draw.TextVAlign.BOTTOM)
+
     def handler_draw_area_mouse_button(self, widget: Gtk.Widget,
                                        event: Gdk.EventButton) -> bool:
         position = self.position_from_screen(shapes.Vector2((event.x, event.y)))
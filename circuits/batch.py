@@ -0,0 +1,833 @@
+''' Simulate many copies of a circuit at once
+
+Each copy (instance) starts in the circuit's state, and can then be given
+different values, e.g. for the outputs of Constant and Button components, to
+sweep the circuit over many input vectors. Values are stored per input slot
+and net like in engine.CompiledEngine, but as a column with one entry per
+instance, and nodes are scheduled with a bitmask of the instances to update.
+Each node scheduled in a tick is evaluated for all of its instances at once,
+so the overhead of an update is shared between the instances.
+
+Logic gates can also be bit sliced (see bitslice): while the columns a gate
+reads and writes only hold bools, they are packed into ints with instance i
+in bit i, and the gate is evaluated, and its output written and passed on
+to the connected inputs, for every instance with a few bitwise operations.
+'''
+import collections.abc as abc
+import copy
+import heapq
+import typing as t
+
+from . import component as component_mod
+from . import engine as engine_mod
+from . import netlist as netlist_mod
+from . import vectorize as vectorize_mod
+
+if t.TYPE_CHECKING:
+    from . import circuit as circuit_mod
+    from . import scheduler
+
+
+# Evaluates a node for a list of instances
+BatchEvaluator = abc.Callable[[abc.Sequence[int]], None]
+# Evaluates a node for a bitmask of instances, returning False if it can't
+# be bit sliced
+BitslicedEvaluator = abc.Callable[[int], bool]
+
+# Translate between bools as bytes and binary digits, so that packing and
+# unpacking a column doesn't loop in Python
+_TO_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+_FROM_DIGITS = bytes.maketrans(b'01', b'\x00\x01')
+
+
+def _pack(column: list[t.Any]) -> t.Optional[int]:
+    ''' A column with instance i in bit i, or None if it isn't all bools '''
+    if not set(map(type, column)) <= {bool}:
+        return None
+    return int(bytes(column)[::-1].translate(_TO_DIGITS), 2)
+
+
+def _unpack(bits: int, count: int) -> list[bool]:
+    ''' The column of count bools packed in an int '''
+    digits = format(bits, f'0{count}b').encode('ascii')[::-1].translate(_FROM_DIGITS)
+    return memoryview(digits).cast('?').tolist()
+
+
+def _packed(cache: dict[int, int], columns: list[list[t.Any]], index: int) \
+        -> t.Optional[int]:
+    ''' _pack(columns[index]), which is kept in cache until it's invalidated '''
+    bits = cache.get(index)
+    if bits is None:
+        bits = _pack(columns[index])
+        if bits is not None:
+            cache[index] = bits
+    return bits
+
+
+class BatchSimulator:
+    ''' Simulates num_instances copies of a set of components
+
+    Components without a kernel are updated by calling their on_update
+    function once per instance, with each instance's data, inputs and outputs
+    swapped in around the call. The components themselves are left as they
+    were. Zero delay mode isn't supported.
+
+    With vectorize set, NARY components are evaluated with NumPy array
+    operations across instances where possible (see vectorize.evaluate_group).
+    Raises RuntimeError if NumPy isn't installed.
+
+    With bitslice set, NARY components whose kernel has a bit_function are
+    bit sliced when their inputs and outputs only hold bools, and evaluated
+    as usual otherwise. Whole columns are packed and unpacked, so this only
+    pays off with hundreds of instances or more.
+    '''
+    def __init__(self, circuit: 'circuit_mod.Circuit',
+                 components: abc.Iterable['component_mod.Component'],
+                 updates: 'scheduler.UpdateQueue[component_mod.Component]',
+                 time: int, num_instances: int, vectorize: bool = False,
+                 bitslice: bool = False) -> None:
+        if num_instances <= 0:
+            raise ValueError(f'Need at least one instance, got {num_instances}')
+        if vectorize and not vectorize_mod.available():
+            raise RuntimeError('NumPy is required to vectorize updates')
+        netlist = netlist_mod.Netlist.build(components)
+        self._circuit = circuit
+        self._netlist = netlist
+        self._index = netlist.index()
+        self._num_instances = num_instances
+        self._time = time
+        self._vectorize = vectorize
+
+        self._all_instances = range(num_instances)
+        self._all_mask = (1 << num_instances) - 1
+        self._bits = [1 << instance for instance in self._all_instances]
+
+        def column(value: t.Any) -> list[t.Any]:
+            return [value] * num_instances
+
+        self._values: list[list[t.Any]] = []
+        self._new_values: list[list[t.Any]] = []
+        self._old_values: list[list[t.Any]] = []
+        # See component.Input.edge_state
+        self._change_times: list[list[t.Optional[int]]] = []
+        self._tick_start_values: list[list[t.Any]] = []
+        self._net_values: list[list[t.Any]] = []
+        for component in netlist.components:
+            for input in component.inputs:
+                value, new_value, old_value = input.state
+                change_time, tick_start_value = input.edge_state
+                self._values.append(column(value))
+                self._new_values.append(column(new_value))
+                self._old_values.append(column(old_value))
+                self._change_times.append(column(change_time))
+                self._tick_start_values.append(column(tick_start_value))
+            for output in component.outputs:
+                self._net_values.append(column(output.value))
+
+        # Each instance has its own copy of the data of components that change
+        # it while updating. Other components share theirs.
+        self._data: list[list[dict[str, t.Any]]] = []
+        for component, kernel in zip(netlist.components, netlist.kernels):
+            if kernel is None or kernel.kind in _STATEFUL_KINDS:
+                self._data.append([
+                    copy.deepcopy(component.data) for _ in self._all_instances
+                ])
+            else:
+                self._data.append([component.data] * num_instances)
+
+        # The instances of each node to update next tick, as a bitmask, and
+        # the same for later times, with a heap of those times
+        self._next_updates: dict[int, int] = {}
+        self._later: dict[int, dict[int, int]] = {}
+        self._later_times: list[int] = []
+        for update_time, components_to_update in updates.items():
+            for component in components_to_update:
+                node = self._index.get(component)
+                if node is not None:
+                    self._schedule_mask(node, self._all_mask, update_time - time)
+
+        # Pass through nodes update as soon as their input changes
+        self._instant = {
+            node for node, kernel in enumerate(netlist.kernels)
+            if kernel is not None and kernel.kind is netlist_mod.Kind.PASS_THROUGH
+        }
+        self._updating: set[tuple[int, int]] = set()
+        self._fallback: t.Optional[tuple[int, int]] = None
+        self._suppressed_propagations = 0
+
+        # Packed columns of input slots and nets, see _packed. Anything that
+        # changes an instance's value in a column removes it.
+        self._packed_values: dict[int, int] = {}
+        self._packed_new_values: dict[int, int] = {}
+        self._packed_old_values: dict[int, int] = {}
+        self._packed_nets: dict[int, int] = {}
+
+        self._write, self._write_many, self._write_bits = self._make_write()
+        self._latch_slots = [
+            tuple(netlist.slots(node)) for node in range(netlist.num_nodes)
+        ]
+        self._evaluators: list[t.Optional[BatchEvaluator]] = [
+            self._compile(node) for node in range(netlist.num_nodes)
+        ]
+        self._bitsliced: dict[int, BitslicedEvaluator] = {}
+        if bitslice:
+            for node, kernel in enumerate(netlist.kernels):
+                if (kernel is not None and kernel.kind is netlist_mod.Kind.NARY
+                        and kernel.bit_function is not None):
+                    self._bitsliced[node] = _compile_bitsliced(self, node, kernel)
+
+    @property
+    def netlist(self) -> netlist_mod.Netlist:
+        return self._netlist
+
+    @property
+    def num_instances(self) -> int:
+        return self._num_instances
+
+    @property
+    def time(self) -> int:
+        return self._time
+
+    @property
+    def suppressed_propagations(self) -> int:
+        ''' How many writes to a net were skipped because it had that value '''
+        return self._suppressed_propagations
+
+    def values(self, output: 'component_mod.Output') -> list[t.Any]:
+        ''' An output's value in each instance '''
+        return list(self._net_values[self._net(output)])
+
+    def set_values(self, output: 'component_mod.Output',
+                   values: abc.Sequence[t.Any]) -> None:
+        ''' Set an output's value in each instance
+
+        The connected components are scheduled as if the output had been set
+        in the circuit. This is how inputs, e.g. Constant outputs, are varied
+        between instances.
+        '''
+        if len(values) != self._num_instances:
+            raise ValueError(
+                f'Expected {self._num_instances} values, got {len(values)}')
+        net = self._net(output)
+        for instance, value in enumerate(values):
+            self._write(net, instance, value)
+
+    def data(self, component: 'component_mod.Component') -> list[dict[str, t.Any]]:
+        ''' A component's data in each instance, e.g. a RAM's memory
+
+        Components whose data doesn't change while they update share the same
+        dict between instances.
+        '''
+        return self._data[self._node(component)]
+
+    def has_pending_updates(self) -> bool:
+        return bool(self._next_updates) or bool(self._later)
+
+    def next_update_time(self) -> t.Optional[int]:
+        ''' The next time anything is scheduled to update, or None '''
+        if self._next_updates:
+            return self._time+1
+        if self._later_times:
+            return self._later_times[0]
+        return None
+
+    def update(self) -> bool:
+        ''' Run the next tick, returning whether anything was updated '''
+        return self._update(self._time+1)
+
+    def run_until(self, time: int) -> None:
+        ''' Update until the given time, skipping ticks with nothing scheduled '''
+        if time < self._time:
+            raise ValueError(f'Cannot run until time {time} before {self._time}')
+        while self._time < time:
+            next_time = self.next_update_time()
+            if next_time is None or next_time > time:
+                next_time = time
+            self._update(next_time)
+
+    def _update(self, time: int) -> bool:
+        # Nothing may be scheduled between the current time and the given time
+        next_time = self.next_update_time()
+        if next_time is not None and next_time < time:
+            raise ValueError(
+                f'Cannot advance to time {time}, updates are scheduled at {next_time}')
+        masks = self._next_updates
+        self._next_updates = {}
+        if next_time == time and self._later_times and self._later_times[0] == time:
+            heapq.heappop(self._later_times)
+            for node, mask in self._later.pop(time).items():
+                masks[node] = masks.get(node, 0) | mask
+        self._time = time
+        if not masks:
+            return False
+
+        # Bit sliced nodes don't need a list of their instances unless they
+        # can't be bit sliced after all
+        bitsliced = self._bitsliced
+        nodes: list[tuple[int, int, t.Optional[abc.Sequence[int]]]] = []
+        for node, mask in masks.items():
+            if node in bitsliced and self._latch_bits(node, mask):
+                nodes.append((node, mask, None))
+            else:
+                instances = self._instances(mask)
+                self._latch(node, instances)
+                nodes.append((node, mask, instances))
+        evaluators = self._evaluators
+        for node, mask, instances in nodes:
+            if instances is None:
+                if bitsliced[node](mask):
+                    continue
+                instances = self._instances(mask)
+            evaluator = evaluators[node]
+            if evaluator is not None:
+                evaluator(instances)
+        return True
+
+    def _instances(self, mask: int) -> abc.Sequence[int]:
+        if mask == self._all_mask:
+            return self._all_instances
+        instances = []
+        while mask:
+            bit = mask & -mask
+            instances.append(bit.bit_length() - 1)
+            mask ^= bit
+        return instances
+
+    def _latch(self, node: int, instances: abc.Sequence[int]) -> None:
+        values = self._values
+        new_values = self._new_values
+        old_values = self._old_values
+        for slot in self._latch_slots[node]:
+            self._packed_values.pop(slot, None)
+            self._packed_old_values.pop(slot, None)
+        if instances is self._all_instances:
+            for slot in self._latch_slots[node]:
+                old_values[slot][:] = values[slot]
+                values[slot][:] = new_values[slot]
+            return
+        for slot in self._latch_slots[node]:
+            slot_values = values[slot]
+            slot_new_values = new_values[slot]
+            slot_old_values = old_values[slot]
+            for instance in instances:
+                slot_old_values[instance] = slot_values[instance]
+                slot_values[instance] = slot_new_values[instance]
+
+    def _latch_bits(self, node: int, mask: int) -> bool:
+        ''' _latch for a bitmask of instances, if the slots' values are bools
+
+        Old values needn't be bools, as they aren't before an instance's
+        input has been latched.
+        '''
+        packed = []
+        for slot in self._latch_slots[node]:
+            values = _packed(self._packed_values, self._values, slot)
+            new_values = _packed(self._packed_new_values, self._new_values, slot)
+            if values is None or new_values is None:
+                return False
+            packed.append((slot, values, new_values))
+        count = self._num_instances
+        for slot, values, new_values in packed:
+            old_values = _packed(self._packed_old_values, self._old_values, slot)
+            if old_values is None:
+                # Each instance's (old value, value)[whether it's in mask]
+                slot_old_values = self._old_values[slot]
+                slot_old_values[:] = map(
+                    tuple.__getitem__, zip(slot_old_values, self._values[slot]),
+                    _unpack(mask, count))
+            else:
+                old_values ^= (old_values ^ values) & mask
+                self._old_values[slot][:] = _unpack(old_values, count)
+                self._packed_old_values[slot] = old_values
+            values ^= (values ^ new_values) & mask
+            self._values[slot][:] = _unpack(values, count)
+            self._packed_values[slot] = values
+        return True
+
+    def _schedule(self, node: int, instance: int, delay: int) -> None:
+        self._schedule_mask(node, self._bits[instance], delay)
+
+    def _schedule_mask(self, node: int, mask: int, delay: int) -> None:
+        if delay <= 1:
+            self._next_updates[node] = self._next_updates.get(node, 0) | mask
+            return
+        time = self._time + delay
+        masks = self._later.get(time)
+        if masks is None:
+            masks = self._later[time] = {}
+            heapq.heappush(self._later_times, time)
+        masks[node] = masks.get(node, 0) | mask
+
+    def _make_write(self) -> tuple[abc.Callable[[int, int, t.Any], None],
+                                   abc.Callable[[int, abc.Iterable[int],
+                                                 abc.Iterable[t.Any]], None],
+                                   abc.Callable[[int, int, int], None]]:
+        netlist = self._netlist
+        net_values = self._net_values
+        new_values = self._new_values
+        packed_nets = self._packed_nets
+        packed_new_values = self._packed_new_values
+        count = self._num_instances
+        bits = self._bits
+        slot_nodes = netlist.slot_nodes
+        fanout = [
+            tuple((slot, slot_nodes[slot]) for slot in slots)
+            for slots in netlist.fanout
+        ]
+        # Nodes that don't just get scheduled when an input changes
+        special = self._instant | {
+            slot_nodes[slot] for slot in range(netlist.num_slots)
+            if netlist.sensitivities[slot] is not component_mod.Sensitivity.ANY
+        }
+        input_changed = self._input_changed
+
+        def write(net: int, instance: int, value: t.Any) -> None:
+            # Mirrors engine.CompiledEngine._make_write
+            column = net_values[net]
+            old_value = column[instance]
+            column[instance] = value
+            packed_nets.pop(net, None)
+            if value == old_value and type(value) is type(old_value):
+                self._suppressed_propagations += 1
+                return
+            for slot, node in fanout[net]:
+                slot_new_values = new_values[slot]
+                previous = slot_new_values[instance]
+                if previous != value:
+                    slot_new_values[instance] = value
+                    packed_new_values.pop(slot, None)
+                    if node in special:
+                        input_changed(slot, node, instance, previous, value)
+                    else:
+                        next_updates = self._next_updates
+                        next_updates[node] = next_updates.get(node, 0) | bits[instance]
+
+        def write_many(net: int, instances: abc.Iterable[int],
+                       values: abc.Iterable[t.Any]) -> None:
+            # The same as calling write for each instance, but each connected
+            # node is scheduled for all of the instances at once
+            column = net_values[net]
+            packed_nets.pop(net, None)
+            changed = []
+            for instance, value in zip(instances, values):
+                old_value = column[instance]
+                column[instance] = value
+                if value == old_value and type(value) is type(old_value):
+                    self._suppressed_propagations += 1
+                else:
+                    changed.append((instance, value))
+            if not changed:
+                return
+            for slot, node in fanout[net]:
+                propagate(slot, node, changed)
+
+        def propagate(slot: int, node: int, changed: list[tuple[int, t.Any]]) -> None:
+            # Pass changes to a net's values on to one of its slots
+            slot_new_values = new_values[slot]
+            packed_new_values.pop(slot, None)
+            if node in special:
+                for instance, value in changed:
+                    previous = slot_new_values[instance]
+                    if previous != value:
+                        slot_new_values[instance] = value
+                        input_changed(slot, node, instance, previous, value)
+                return
+            mask = 0
+            for instance, value in changed:
+                if slot_new_values[instance] != value:
+                    slot_new_values[instance] = value
+                    mask |= bits[instance]
+            if mask:
+                next_updates = self._next_updates
+                next_updates[node] = next_updates.get(node, 0) | mask
+
+        def write_bits(net: int, mask: int, values: int) -> None:
+            # The same as write_many for the instances in mask, with their
+            # values packed in an int. Columns that aren't all bools are
+            # written an instance at a time.
+            old_values = _packed(packed_nets, net_values, net)
+            if old_values is None:
+                instances = self._instances(mask)
+                write_many(net, instances, [bool(values >> i & 1) for i in instances])
+                return
+            changed_mask = (old_values ^ values) & mask
+            self._suppressed_propagations += bin(mask ^ changed_mask).count('1')
+            if not changed_mask:
+                return
+            values = old_values ^ changed_mask
+            net_values[net][:] = _unpack(values, count)
+            packed_nets[net] = values
+            changed = None
+            for slot, node in fanout[net]:
+                if node not in special:
+                    slot_new_values = _packed(packed_new_values, new_values, slot)
+                    if slot_new_values is not None:
+                        slot_mask = (slot_new_values ^ values) & changed_mask
+                        if slot_mask:
+                            slot_new_values ^= slot_mask
+                            new_values[slot][:] = _unpack(slot_new_values, count)
+                            packed_new_values[slot] = slot_new_values
+                            next_updates = self._next_updates
+                            next_updates[node] = next_updates.get(node, 0) | slot_mask
+                        continue
+                if changed is None:
+                    changed = [
+                        (instance, bool(values >> instance & 1))
+                        for instance in self._instances(changed_mask)
+                    ]
+                propagate(slot, node, changed)
+        return write, write_many, write_bits
+
+    def _input_changed(self, slot: int, node: int, instance: int,
+                       previous: t.Any, value: t.Any) -> None:
+        # Mirrors engine.CompiledEngine._input_changed
+        if node in self._instant:
+            self._update_now(node, instance)
+            return
+        sensitivity = self._netlist.sensitivities[slot]
+        if sensitivity is component_mod.Sensitivity.ANY:
+            self._schedule(node, instance, 1)
+        elif sensitivity is not component_mod.Sensitivity.NONE:
+            change_times = self._change_times[slot]
+            tick_start_values = self._tick_start_values[slot]
+            if self._time != change_times[instance]:
+                change_times[instance] = self._time
+                tick_start_values[instance] = previous
+            rising = sensitivity is component_mod.Sensitivity.RISING
+            if bool(value) != bool(previous) and bool(value) == rising:
+                self._values[slot][instance] = tick_start_values[instance]
+                self._packed_values.pop(slot, None)
+                self._schedule(node, instance, 1)
+
+    def _update_now(self, node: int, instance: int) -> None:
+        # Prevent loops where the output leads back to the input
+        key = (node, instance)
+        if key in self._updating:
+            return
+        self._updating.add(key)
+        instances = (instance,)
+        self._latch(node, instances)
+        evaluator = self._evaluators[node]
+        if evaluator is not None:
+            evaluator(instances)
+        self._updating.discard(key)
+
+    def _node(self, component: 'component_mod.Component') -> int:
+        node = self._index.get(component)
+        if node is None:
+            raise ValueError(f'Component {component.id} is not simulated')
+        return node
+
+    def _net(self, output: 'component_mod.Output') -> int:
+        return self._netlist.first_net[self._node(output.component)] + output.index
+
+    def _compile(self, node: int) -> t.Optional[BatchEvaluator]:
+        kernel = self._netlist.kernels[node]
+        if kernel is None:
+            return self._compile_fallback(node)
+        compile_func = _COMPILERS.get(kernel.kind)
+        if compile_func is None:
+            return None
+        return compile_func(self, node, kernel)
+
+    def _compile_fallback(self, node: int) -> BatchEvaluator:
+        component = self._netlist.components[node]
+        first_slot = self._netlist.first_slot[node]
+        first_net = self._netlist.first_net[node]
+        values = self._values
+        new_values = self._new_values
+        old_values = self._old_values
+        net_values = self._net_values
+        node_data = self._data[node]
+        write = self._write
+        # Setting an output changes the connected inputs, and pass through
+        # components pass the change on instantly, so everything it can reach
+        # that way is restored along with the component itself
+        inputs, outputs = self._reachable(component)
+
+        def schedule(scheduled: 'component_mod.Component', delay: int) -> None:
+            # Mirrors engine.CompiledEngine.schedule_update
+            if scheduled is component and self._fallback is not None:
+                self._schedule(node, self._fallback[1], delay)
+
+        def evaluate(instances: abc.Sequence[int]) -> None:
+            data = component.data
+            saved_data = dict(data)
+            saved_inputs = [(input, input.state, input.edge_state) for input in inputs]
+            saved_outputs = [(output, output.value) for output in outputs]
+            try:
+                with self._circuit.divert_updates(schedule):
+                    for instance in instances:
+                        for input in component.inputs:
+                            slot = first_slot + input.index
+                            input.state = (values[slot][instance],
+                                           new_values[slot][instance],
+                                           old_values[slot][instance])
+                        for output in component.outputs:
+                            output.restore_value(
+                                net_values[first_net + output.index][instance])
+                        instance_data = node_data[instance]
+                        data.clear()
+                        data.update(instance_data)
+
+                        self._fallback = (node, instance)
+                        try:
+                            component.on_update()
+                        finally:
+                            self._fallback = None
+                            instance_data.clear()
+                            instance_data.update(data)
+
+                        for output in component.outputs:
+                            net = first_net + output.index
+                            value = output.value
+                            if value is not net_values[net][instance]:
+                                write(net, instance, value)
+            finally:
+                data.clear()
+                data.update(saved_data)
+                for input, state, edge_state in saved_inputs:
+                    input.state = state
+                    input.edge_state = edge_state
+                for output, value in saved_outputs:
+                    output.restore_value(value)
+        return evaluate
+
+    def _reachable(self, component: 'component_mod.Component') \
+            -> tuple[list['component_mod.Input'], list['component_mod.Output']]:
+        ''' The inputs and outputs a component's on_update can change '''
+        inputs = list(component.inputs)
+        outputs = list(component.outputs)
+        seen = {component}
+        index = 0
+        while index < len(outputs):
+            for input in outputs[index].connected_inputs:
+                inputs.append(input)
+                reached = input.component
+                node = self._index.get(reached)
+                if reached not in seen and node in self._instant:
+                    seen.add(reached)
+                    outputs.extend(reached.outputs)
+            index += 1
+        return inputs, outputs
+
+
+_BatchCompiler = abc.Callable[[BatchSimulator, int, netlist_mod.Kernel],
+                              t.Optional[BatchEvaluator]]
+
+# Kinds whose data changes as they update
+_STATEFUL_KINDS = frozenset({netlist_mod.Kind.RAM, netlist_mod.Kind.DELAY})
+
+
+def _compile_nary(batch: BatchSimulator, node: int,
+                  kernel: netlist_mod.Kernel) -> BatchEvaluator:
+    # Mirrors engine._compile_nary
+    columns = [batch._values[slot] for slot in batch.netlist.slots(node)]
+    net = batch.netlist.first_net[node]
+    write_many = batch._write_many
+    all_instances = batch._all_instances
+    function = kernel.function
+    assert function is not None
+    default_value = kernel.default_value
+    vectorize = batch._vectorize and kernel.array_function is not None
+
+    def apply(operands: tuple[t.Any, ...]) -> t.Any:
+        try:
+            return function(*operands)
+        except Exception:
+            return default_value
+
+    def evaluate(instances: abc.Sequence[int]) -> None:
+        if instances is all_instances:
+            operand_columns = columns
+        else:
+            operand_columns = [
+                [column[instance] for instance in instances] for column in columns
+            ]
+        results = None
+        if vectorize and len(instances) >= vectorize_mod.MIN_GROUP_SIZE:
+            operands = [
+                operand for row in zip(*operand_columns) for operand in row
+            ]
+            results = vectorize_mod.evaluate_group(kernel, operands, len(columns))
+        if results is None:
+            try:
+                results = list(map(function, *operand_columns))
+            except Exception:
+                # Only the instances that raised get the default value
+                results = list(map(apply, zip(*operand_columns)))
+        write_many(net, instances, results)
+    return evaluate
+
+
+def _compile_bitsliced(batch: BatchSimulator, node: int,
+                       kernel: netlist_mod.Kernel) -> BitslicedEvaluator:
+    # The same as _compile_nary, on packed columns
+    slots = tuple(batch.netlist.slots(node))
+    net = batch.netlist.first_net[node]
+    packed_values = batch._packed_values
+    values = batch._values
+    write_bits = batch._write_bits
+    bit_function = kernel.bit_function
+    assert bit_function is not None
+    all_mask = batch._all_mask
+
+    def evaluate(mask: int) -> bool:
+        operands = []
+        for slot in slots:
+            operand = _packed(packed_values, values, slot)
+            if operand is None:
+                return False
+            operands.append(operand)
+        # Instances outside of mask are evaluated too, but not written
+        write_bits(net, mask, bit_function(all_mask, *operands) & all_mask)
+        return True
+    return evaluate
+
+
+def _compile_mux(batch: BatchSimulator, node: int,
+                 kernel: netlist_mod.Kernel) -> BatchEvaluator:
+    # Mirrors engine._compile_mux
+    columns = [batch._values[slot] for slot in batch.netlist.slots(node)]
+    net = batch.netlist.first_net[node]
+    write = batch._write
+    num_inputs = len(columns)
+
+    def evaluate(instances: abc.Sequence[int]) -> None:
+        for instance in instances:
+            select: t.Optional[int]
+            try:
+                select = int(columns[0][instance] or 0)
+            except ValueError:
+                select = None
+            if select is None or select >= num_inputs-1:
+                write(net, instance, None)
+            else:
+                write(net, instance, [column[instance] for column in columns][select+1])
+    return evaluate
+
+
+def _compile_memory(batch: BatchSimulator, node: int,
+                    kernel: netlist_mod.Kernel) -> BatchEvaluator:
+    # Mirrors engine._compile_memory
+    lo = batch.netlist.first_slot[node]
+    net = batch.netlist.first_net[node]
+    data = batch.netlist.components[node].data
+    clk = batch._values[lo]
+    old_clk = batch._old_values[lo]
+    value = batch._values[lo+1]
+    write = batch._write
+
+    def evaluate(instances: abc.Sequence[int]) -> None:
+        for instance in instances:
+            if engine_mod.should_store(data, clk[instance], old_clk[instance]):
+                write(net, instance, value[instance])
+    return evaluate
+
+
+def _compile_ram(batch: BatchSimulator, node: int,
+                 kernel: netlist_mod.Kernel) -> BatchEvaluator:
+    # Mirrors engine._compile_ram
+    lo = batch.netlist.first_slot[node]
+    net = batch.netlist.first_net[node]
+    node_data = batch._data[node]
+    clk = batch._values[lo]
+    old_clk = batch._old_values[lo]
+    addresses = batch._values[lo+1]
+    value = batch._values[lo+2]
+    write = batch._write
+
+    def evaluate(instances: abc.Sequence[int]) -> None:
+        for instance in instances:
+            data = node_data[instance]
+            memory = data['memory']
+            address = addresses[instance]
+            if not isinstance(address, int) or address < 0 or address >= len(memory):
+                address = 0
+            write(net, instance, memory[address])
+            if engine_mod.should_store(data, clk[instance], old_clk[instance]):
+                memory[address] = value[instance]
+    return evaluate
+
+
+def _compile_clock(batch: BatchSimulator, node: int,
+                   kernel: netlist_mod.Kernel) -> BatchEvaluator:
+    # Mirrors engine._compile_clock
+    net = batch.netlist.first_net[node]
+    data = batch.netlist.components[node].data
+    column = batch._net_values[net]
+    bits = batch._bits
+    write_many = batch._write_many
+    schedule_mask = batch._schedule_mask
+
+    def evaluate(instances: abc.Sequence[int]) -> None:
+        values = [not column[instance] for instance in instances]
+        write_many(net, instances, values)
+        on_mask = off_mask = 0
+        for instance, value in zip(instances, values):
+            if value:
+                on_mask |= bits[instance]
+            else:
+                off_mask |= bits[instance]
+        if on_mask:
+            schedule_mask(node, on_mask, data['on_delay'])
+        if off_mask:
+            schedule_mask(node, off_mask, data['off_delay'])
+    return evaluate
+
+
+def _compile_delay(batch: BatchSimulator, node: int,
+                   kernel: netlist_mod.Kernel) -> BatchEvaluator:
+    # Mirrors engine._compile_delay
+    lo = batch.netlist.first_slot[node]
+    net = batch.netlist.first_net[node]
+    node_data = batch._data[node]
+    values = batch._values[lo]
+    old_values = batch._old_values[lo]
+    write = batch._write
+    schedule = batch._schedule
+
+    def evaluate(instances: abc.Sequence[int]) -> None:
+        now = batch._time
+        for instance in instances:
+            data = node_data[instance]
+            new_value = values[instance]
+            updates = data['updates']
+            delay = data['delay']
+
+            if old_values[instance] != new_value:
+                output_time = now + delay - 1
+                while updates and updates[-1][1] >= output_time:
+                    updates.pop()
+                updates.append((new_value, output_time))
+                if delay > 1:
+                    schedule(node, instance, delay-1)
+
+            if updates and updates[0][1] == now:
+                write(net, instance, updates.popleft()[0])
+    return evaluate
+
+
+def _compile_pass_through(batch: BatchSimulator, node: int,
+                          kernel: netlist_mod.Kernel) -> BatchEvaluator:
+    # Mirrors engine._compile_pass_through
+    lo = batch.netlist.first_slot[node]
+    net = batch.netlist.first_net[node]
+    values = batch._values[lo]
+    write = batch._write
+
+    def evaluate(instances: abc.Sequence[int]) -> None:
+        for instance in instances:
+            write(net, instance, values[instance])
+    return evaluate
+
+
+_COMPILERS: dict[netlist_mod.Kind, _BatchCompiler] = {
+    netlist_mod.Kind.NARY: _compile_nary,
+    netlist_mod.Kind.MUX: _compile_mux,
+    netlist_mod.Kind.MEMORY: _compile_memory,
+    netlist_mod.Kind.RAM: _compile_ram,
+    netlist_mod.Kind.CLOCK: _compile_clock,
+    netlist_mod.Kind.DELAY: _compile_delay,
+    netlist_mod.Kind.PASS_THROUGH: _compile_pass_through,
+}
@@ -0,0 +1,27 @@
+''' Evaluate boolean gates for many instances at once
+
+Each value is packed into a Python int whose bit i is its truth value in
+instance i, so a gate's kernel.bit_function (see netlist.Kernel) evaluates
+it for all instances with a few bitwise operations. batch.BatchSimulator
+bit slices logic gates this way. Counting through every combination of some
+inputs (see counting_pattern) gives a truth table in one evaluation, which
+lut, fold and loops use.
+'''
+
+
+def unpack(bits: int, count: int) -> list[bool]:
+    ''' The first count truth values packed in an int '''
+    return [bool(bits >> i & 1) for i in range(count)]
+
+
+def counting_pattern(index: int, num_inputs: int) -> int:
+    ''' Input index's values when counting through every combination of inputs
+
+    Instance i of the 2**num_inputs instances has the input set if bit index
+    of i is set.
+    '''
+    period = 2 << index
+    block = ((1 << (period // 2)) - 1) << (period // 2)
+    repeats = (1 << num_inputs) // period
+    # Repeat the block every period bits
+    return block * (((1 << (period * repeats)) - 1) // ((1 << period) - 1))
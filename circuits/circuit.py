@@ -1,24 +1,40 @@
 import collections.abc as abc
-import collections
+import contextlib
 import threading
 import typing as t
 
-from gi.repository import Gdk  # type: ignore
-
 from . import component as component_mod
+from . import options as options_mod
+from . import scheduler
 from . import shapes
 
+if t.TYPE_CHECKING:
+    from gi.repository import Gdk  # type: ignore
+    from . import batch as batch_mod
+    from . import engine as engine_mod
+    from . import fold
+    from . import loops
+
 
 class Circuit:
-    KeyCallback = abc.Callable[[Gdk.EventKey], None]
+    KeyCallback = abc.Callable[['Gdk.EventKey'], None]
 
     def __init__(self) -> None:
         self._components: set[component_mod.Component] = set()
-        self._updates: dict[int, set[component_mod.Component]] = \
-            collections.defaultdict(set)
+        self._updates: scheduler.UpdateQueue[component_mod.Component] = \
+            scheduler.UpdateQueue()
         self._time = 0
         self._current_id = 0
-        self._update_lock = threading.Lock()
+        self._update_lock = threading.RLock()
+        self._updates_pending = threading.Event()
+        self._suppressed_propagations = 0
+        self._engine_options = options_mod.EngineOptions()
+        self._fold_report: t.Optional['fold.Report'] = None
+        self._num_merged = 0
+        self._oscillation_detector: t.Optional['loops.OscillationDetector'] = None
+        self._engine: t.Optional['engine_mod.CompiledEngine'] = None
+        self._diverted_updates: t.Optional[
+            abc.Callable[[component_mod.Component, int], None]] = None
         self._key_callbacks: dict[int, tuple[t.Optional['Circuit.KeyCallback'],
                                              t.Optional['Circuit.KeyCallback']]] = {}
 
@@ -26,7 +42,137 @@ class Circuit:
     def time(self) -> int:
         return self._time
 
+    @property
+    def engine_options(self) -> options_mod.EngineOptions:
+        ''' How updates are run, see options.EngineOptions
+
+        Raises RuntimeError if set to vectorize when NumPy isn't installed.
+        '''
+        return self._engine_options
+
+    @engine_options.setter
+    def engine_options(self, value: options_mod.EngineOptions) -> None:
+        if value.vectorize:
+            from . import vectorize
+            if not vectorize.available():
+                raise RuntimeError('NumPy is required to vectorize updates')
+        with self._update_lock:
+            self._sync_lk()
+            self._engine_options = value
+
+    @property
+    def updates_pending(self) -> threading.Event:
+        ''' Set when an update is scheduled, and cleared once none are left
+
+        Threads can wait on this instead of polling has_pending_updates().
+        It can also be set with nothing scheduled to wake up those threads.
+        '''
+        return self._updates_pending
+
+    @property
+    def suppressed_propagations(self) -> int:
+        ''' How many times an output was set to the value it already had
+
+        Those values aren't passed on to the connected inputs.
+        '''
+        engine = self._engine
+        if engine is None:
+            return self._suppressed_propagations
+        return self._suppressed_propagations + engine.suppressed_propagations
+
+    def record_suppressed_propagation(self) -> None:
+        self._suppressed_propagations += 1
+
+    @property
+    def fold_report(self) -> t.Optional['fold.Report']:
+        ''' What was left out the last time the circuit was compiled with fold set '''
+        return self._fold_report
+
+    @property
+    def num_merged(self) -> int:
+        ''' How many duplicates were left out the last time it was compiled with merge '''
+        return self._num_merged
+
+    @property
+    def oscillation_detector(self) -> t.Optional['loops.OscillationDetector']:
+        ''' Told what's updated in each tick, if set '''
+        return self._oscillation_detector
+
+    @oscillation_detector.setter
+    def oscillation_detector(self,
+                             value: t.Optional['loops.OscillationDetector']) -> None:
+        with self._update_lock:
+            self._sync_lk()
+            self._oscillation_detector = value
+
+    def stimulate(self) -> None:
+        ''' Tell the oscillation detector something outside the circuit changed it '''
+        detector = self._oscillation_detector
+        if detector is not None:
+            detector.stimulate()
+
+    def batch(self, num_instances: int,
+              bitslice: bool = False) -> 'batch_mod.BatchSimulator':
+        ''' Create a simulator for many copies of the circuit in its current state
+
+        See batch.BatchSimulator, which is passed bitslice. The copies are
+        independent of the circuit, which can keep running or be edited.
+        '''
+        from . import batch as batch_mod
+
+        with self._update_lock:
+            self._sync_lk()
+            return batch_mod.BatchSimulator(
+                self, self._components, self._updates, self._time, num_instances,
+                vectorize=self._engine_options.vectorize, bitslice=bitslice)
+
+    @contextlib.contextmanager
+    def divert_updates(
+            self, schedule: abc.Callable[[component_mod.Component, int], None]) \
+            -> abc.Iterator[None]:
+        ''' Pass updates scheduled inside the block to a function instead
+
+        This lets a component's on_update be called outside of the circuit's
+        own simulation.
+        '''
+        with self._update_lock:
+            previous = self._diverted_updates
+            self._diverted_updates = schedule
+            try:
+                yield
+            finally:
+                self._diverted_updates = previous
+
+    def sync(self) -> None:
+        ''' Copy the compiled engine's state to the components and discard it
+
+        This must be called before the components are edited. The engine is
+        compiled again on the next update.
+        '''
+        with self._update_lock:
+            self._sync_lk()
+
+    def _sync_lk(self) -> None:
+        engine = self._engine
+        if engine is None:
+            return
+        self._engine = None
+        engine.write_back()
+        self._suppressed_propagations += engine.suppressed_propagations
+        # The queue was left empty at the time the engine was compiled
+        self._updates.clear(self._time)
+        for time, components in engine.take_updates().items():
+            for component in components:
+                self._updates.schedule(component, time - self._time)
+
+    def refresh(self) -> None:
+        ''' Copy the compiled engine's state to the components for display '''
+        with self._update_lock:
+            if self._engine is not None:
+                self._engine.write_back()
+
     def add_component(self, component: component_mod.Component) -> None:
+        self.sync()
         self._components.add(component)
         component.id = self._current_id
         self._current_id += 1
@@ -35,6 +181,7 @@ class Circuit:
             abc.Collection[component_mod.Component]] = None) -> dict[str, t.Any]:
         save_components = components or self._components
         with self._update_lock:
+            self._sync_lk()
             components_by_id = sorted(save_components, key=lambda c: c.id)
             component_data = [
                 component.get_save_data()
@@ -61,12 +208,16 @@ class Circuit:
     def unregister_key_callback(self, callback_id: int) -> None:
         del self._key_callbacks[callback_id]
 
-    def handle_key_press(self, event: Gdk.EventKey) -> None:
+    def handle_key_press(self, event: 'Gdk.EventKey') -> None:
+        self.sync()
+        self.stimulate()
         for callback, _ in self._key_callbacks.values():
             if callback:
                 callback(event)
 
-    def handle_key_release(self, event: Gdk.EventKey) -> None:
+    def handle_key_release(self, event: 'Gdk.EventKey') -> None:
+        self.sync()
+        self.stimulate()
         for _, callback in self._key_callbacks.values():
             if callback:
                 callback(event)
@@ -84,7 +235,7 @@ class Circuit:
         component_data_by_id = {}
         components_by_id = {}
 
-        save_updates = self._updates.copy()
+        self._sync_lk()
 
         # Create components
         for component_data in data['components']:
@@ -102,26 +253,32 @@ class Circuit:
 
         self._components.update(new_components)
 
-        self._updates = save_updates
+        # Replace anything scheduled while creating the components
+        # (e.g. by clocks) with the saved updates
+        for component in new_components:
+            self._updates.cancel(component)
         for delay, ids in data['updates'].items():
-            time = self._time + int(delay)
-            self._updates[time].update(components_by_id[id] for id in ids)
+            for id in ids:
+                self._updates.schedule(components_by_id[id], int(delay))
+        self._check_pending_lk()
 
         return new_components
 
     def remove_component(self, component: component_mod.Component) -> None:
+        self.sync()
         component.on_destroy()
         self._components.remove(component)
         with self._update_lock:
-            for updates in self._updates.values():
-                if component in updates:
-                    updates.remove(component)
+            self._updates.cancel(component)
 
     def clear(self) -> None:
+        self._engine = None
         for component in self._components:
             component.on_destroy()
         self._components = set()
-        self._updates = collections.defaultdict(set)
+        self._updates.clear()
+        self._updates_pending.clear()
+        self._suppressed_propagations = 0
         self._time = 0
         self._current_id = 0
 
@@ -163,28 +320,138 @@ class Circuit:
         return nodes
 
     def schedule_update(self, component: component_mod.Component, delay: int) -> None:
-        if delay < 1:
-            delay = 1
-        self._updates[self._time+delay].add(component)
+        if self._diverted_updates is not None:
+            self._diverted_updates(component, delay)
+            return
+        if self._engine is not None:
+            self._engine.schedule_update(component, delay)
+        else:
+            self._updates.schedule(component, delay)
+        if not self._updates_pending.is_set():
+            self._updates_pending.set()
+
+    def has_pending_updates(self) -> bool:
+        with self._update_lock:
+            return self._has_pending_updates_lk()
+
+    def _has_pending_updates_lk(self) -> bool:
+        if self._engine is not None:
+            return self._engine.has_pending_updates()
+        return bool(self._updates)
+
+    def _check_pending_lk(self) -> None:
+        if not self._has_pending_updates_lk():
+            # Check again after clearing in case another thread scheduled
+            # something in between
+            self._updates_pending.clear()
+            if self._has_pending_updates_lk():
+                self._updates_pending.set()
+        elif not self._updates_pending.is_set():
+            self._updates_pending.set()
+
+    def next_update_time(self) -> t.Optional[int]:
+        ''' The next time anything is scheduled to update, or None '''
+        with self._update_lock:
+            return self._next_update_time_lk()
+
+    def _next_update_time_lk(self) -> t.Optional[int]:
+        if self._engine is not None:
+            return self._engine.next_update_time()
+        return self._updates.next_time()
 
     def components_to_update(self) -> tuple[set[component_mod.Component],
                                             set[component_mod.Component]]:
         with self._update_lock:
-            next_updates = set()
-            later_updates = set()
-            for time, components in self._updates.items():
-                if time == self._time+1:
-                    next_updates.update(components)
-                else:
-                    later_updates.update(components)
+            self._sync_lk()
+            next_time = self._time+1
+            next_updates = set(self._updates.peek(next_time))
+            later_updates = {
+                component for component in self._updates
+                if self._updates.times(component) != {next_time}
+            }
         return next_updates, later_updates
 
-    def update(self) -> None:
+    def update(self) -> bool:
+        ''' Run the next tick, returning whether any components were updated '''
+        with self._update_lock:
+            return self._update_lk(self._time+1)
+
+    def advance_to_next_event(self) -> bool:
+        ''' Skip ahead to the next time anything is scheduled and update
+
+        Returns False, without changing the time, if nothing is scheduled.
+        '''
+        with self._update_lock:
+            next_time = self._next_update_time_lk()
+            if next_time is None:
+                return False
+            self._update_lk(next_time)
+            return True
+
+    def run_until(self, time: int) -> None:
+        ''' Update until the given time, skipping ticks with nothing scheduled '''
         with self._update_lock:
-            self._time += 1
-            components_to_update = self._updates[self._time]
+            if time < self._time:
+                raise ValueError(f'Cannot run until time {time} before {self._time}')
+            while self._time < time:
+                if self._fast_forward_lk(time):
+                    break
+                next_time = self._next_update_time_lk()
+                if next_time is None or next_time > time:
+                    next_time = time
+                self._update_lk(next_time)
+
+    def fast_forward(self, time: int) -> bool:
+        ''' Skip to a time if only clocks whose changes nothing sees update until then
+
+        This only applies when compiled. See engine.CompiledEngine.fast_forward.
+        Returns whether the circuit is now at the time.
+        '''
+        with self._update_lock:
+            return self._fast_forward_lk(time)
+
+    def _fast_forward_lk(self, time: int) -> bool:
+        if self._engine is None or not self._engine.fast_forward(time):
+            return False
+        self._time = time
+        self._check_pending_lk()
+        return True
+
+    def _make_engine_lk(self) -> 'engine_mod.CompiledEngine':
+        # Imported here so the engines are only loaded once they're used
+        from . import engine as engine_mod
+
+        engine_class = engine_mod.CompiledEngine
+        if self._engine_options.generate:
+            from . import codegen
+            engine_class = codegen.GeneratedEngine
+        detector = self._oscillation_detector
+        return engine_class(
+            self._components, self._updates, self._time, options=self._engine_options,
+            observe=None if detector is None else detector.observe)
+
+    def _update_lk(self, time: int) -> bool:
+        # Nothing may be scheduled between the current time and the given time
+        options = self._engine_options
+        if options.compiled:
+            if self._engine is None:
+                self._engine = self._make_engine_lk()
+                if options.fold:
+                    self._fold_report = self._engine.fold_report
+                if options.merge:
+                    self._num_merged = len(self._engine.duplicates)
+                self._updates.clear(self._time)
+            self._time = time
+            updated = self._engine.update(time)
+        else:
+            components_to_update = self._updates.advance_to(time)
+            self._time = time
             for component in components_to_update:
                 component.update_inputs()
             for component in components_to_update:
                 component.on_update()
-            del self._updates[self._time]
+            if components_to_update and self._oscillation_detector is not None:
+                self._oscillation_detector.observe(time, components_to_update)
+            updated = bool(components_to_update)
+        self._check_pending_lk()
+        return updated
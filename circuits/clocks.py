@@ -0,0 +1,39 @@
+''' Clocks that change at the same times
+
+Clocks with the same on and off delays that have the same value and are
+next scheduled at the same time stay in step for as long as they run.
+engine.CompiledEngine groups them into a domain, which is updated as one
+scheduled event that changes all of them, and moves domains ahead any
+number of periods at once when nothing they're connected to needs to see
+the changes in between.
+'''
+import dataclasses
+
+
+@dataclasses.dataclass
+class ClockDomain:
+    on_delay: int
+    off_delay: int
+    # The first node is the one scheduled for all of them
+    nodes: list[int]
+
+    @property
+    def period(self) -> int:
+        return self.on_delay + self.off_delay
+
+    def delay(self, value: bool) -> int:
+        ''' How long the clocks stay at a value '''
+        return self.on_delay if value else self.off_delay
+
+    def advance(self, value: bool, time: int, until: int) -> tuple[bool, int]:
+        ''' The value after every change up to until, and when they next change
+
+        value is what the clocks are until they next change at time.
+        '''
+        if time <= until:
+            # Each period changes the clocks twice, back to the same value
+            time += (until - time) // self.period * self.period
+        while time <= until:
+            value = not value
+            time += self.delay(value)
+        return value, time
@@ -0,0 +1,369 @@
+''' Simulate components with generated Python code
+
+GeneratedEngine works like engine.CompiledEngine, but instead of compiling
+each component to a closure it generates the source of a function for it:
+its inputs are loaded into local variables, its logic is inlined (using the
+kernel's source_function if it has one, see netlist.Kernel) and the writes
+to every input its outputs are connected to are unrolled. Compiled code is
+cached by source, so engines for the same netlist only compile it once.
+
+check() runs generated code alongside the interpreter, or the compiled
+engine with the same options (see reference_options()), to make sure they
+agree.
+'''
+import collections.abc as abc
+import contextlib
+import copy
+import dataclasses
+import functools
+import types
+import typing as t
+
+from . import circuit as circuit_mod
+from . import engine as engine_mod
+from . import netlist as netlist_mod
+from . import options as options_mod
+from . import scheduler
+
+if t.TYPE_CHECKING:
+    from . import component as component_mod
+
+
+# How many compiled netlists to keep
+CACHE_SIZE = 16
+
+
+class GeneratedEngine(engine_mod.CompiledEngine):
+    ''' A CompiledEngine that evaluates components with generated code
+
+    Components whose kind has no code generator (see _GENERATORS) are
+    compiled to closures as usual.
+    '''
+    def __init__(self, components: abc.Iterable['component_mod.Component'],
+                 updates: 'scheduler.UpdateQueue[component_mod.Component]',
+                 time: int,
+                 options: options_mod.EngineOptions = options_mod.EngineOptions(),
+                 external: abc.Collection['component_mod.Component'] = (),
+                 observe: t.Optional[engine_mod.Observer] = None) -> None:
+        # Filled in by _compile() while the base class compiles each node
+        self._generated_nodes: list[int] = []
+        super().__init__(components, updates, time, options=options,
+                         external=external, observe=observe)
+
+        namespace: dict[str, t.Any] = {
+            'values': self._values,
+            'new_values': self._new_values,
+            'old_values': self._old_values,
+            'net_values': self._net_values,
+            'engine': self,
+            'input_changed': self._input_changed,
+            'schedule': self._schedule,
+        }
+        lines = []
+        for node in self._generated_nodes:
+            kernel = self._netlist.kernels[node]
+            assert kernel is not None
+            lines.append(f'def evaluate_{node}():')
+            lines.extend(_indent(_GENERATORS[kernel.kind](self, node, kernel, namespace)))
+            lines.append('')
+        self._source = '\n'.join(lines)
+        exec(_compile_source(self._source), namespace)
+        for node in self._generated_nodes:
+            self._evaluators[node] = namespace[f'evaluate_{node}']
+
+    @property
+    def source(self) -> str:
+        ''' The generated code '''
+        return self._source
+
+    def _compile(self, node: int) -> t.Optional[engine_mod.Evaluator]:
+        kernel = self._netlist.kernels[node]
+        if (kernel is None or kernel.kind not in _GENERATORS
+                or node in self._tables or node in self._collapsed
+                or node in self._skipped or node in self._duplicates
+                or node in self._aliased or node in self._clock_members):
+            return super()._compile(node)
+        # Replaced once the code for every node is compiled
+        self._generated_nodes.append(node)
+        return None
+
+    def _write_source(self, net: int, value: str) -> list[str]:
+        ''' Lines that write a local variable to a net '''
+        # Mirrors CompiledEngine._make_write
+        lines = [
+            f'old = net_values[{net}]',
+            f'net_values[{net}] = {value}',
+            f'if {value} == old and type({value}) is type(old):',
+            '    engine._suppressed_propagations += 1',
+        ]
+        fanout = self._fanout[net]
+        if not fanout:
+            return lines
+        lines.append('else:')
+        if any(node not in self._special for _, node in fanout):
+            lines.append('    next_updates = engine._next_updates')
+        for slot, node in fanout:
+            if node in self._special:
+                lines += [
+                    f'    previous = new_values[{slot}]',
+                    f'    if previous != {value}:',
+                    f'        new_values[{slot}] = {value}',
+                    f'        input_changed({slot}, {node}, previous, {value})',
+                ]
+            else:
+                lines += [
+                    f'    if new_values[{slot}] != {value}:',
+                    f'        new_values[{slot}] = {value}',
+                    f'        next_updates.add({node})',
+                ]
+        return lines
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _compile_source(source: str) -> types.CodeType:
+    return compile(source, '<generated circuit>', 'exec')
+
+
+# Each generator returns the body of a node's function, and adds any objects
+# it refers to other than the engine's lists to the namespace
+_Generator = abc.Callable[[GeneratedEngine, int, netlist_mod.Kernel, dict[str, t.Any]],
+                          list[str]]
+
+
+def _load_operands(engine: GeneratedEngine, node: int) -> tuple[list[str], list[str]]:
+    ''' Lines that load a node's input values into locals, and their names '''
+    slots = engine.netlist.slots(node)
+    operands = [f'a{i}' for i in range(len(slots))]
+    return [f'{name} = values[{slot}]' for name, slot in zip(operands, slots)], operands
+
+
+def _indent(lines: list[str]) -> list[str]:
+    return [f'    {line}' for line in lines]
+
+
+def _generate_nary(engine: GeneratedEngine, node: int, kernel: netlist_mod.Kernel,
+                   namespace: dict[str, t.Any]) -> list[str]:
+    # Mirrors engine._compile_nary
+    lines, operands = _load_operands(engine, node)
+    if kernel.source_function is not None:
+        expression = kernel.source_function(*operands)
+    else:
+        namespace[f'function_{node}'] = kernel.function
+        expression = f'function_{node}({", ".join(operands)})'
+    namespace[f'default_{node}'] = kernel.default_value
+    lines += [
+        'try:',
+        f'    result = {expression}',
+        'except Exception:',
+        f'    result = default_{node}',
+    ]
+    return lines + engine._write_source(engine.netlist.first_net[node], 'result')
+
+
+def _generate_mux(engine: GeneratedEngine, node: int, kernel: netlist_mod.Kernel,
+                  namespace: dict[str, t.Any]) -> list[str]:
+    # Mirrors engine._compile_mux
+    lines, operands = _load_operands(engine, node)
+    lines += [
+        'try:',
+        '    select = int(a0 or 0)',
+        'except ValueError:',
+        '    select = None',
+        f'if select is None or select >= {len(operands) - 1}:',
+        '    result = None',
+        'else:',
+        f'    result = ({", ".join(operands)},)[select+1]',
+    ]
+    return lines + engine._write_source(engine.netlist.first_net[node], 'result')
+
+
+def _store_source(node: int, lo: int) -> list[str]:
+    ''' Lines that set store to engine.should_store() for a node's clk '''
+    return [
+        f'clk = values[{lo}]',
+        f"if data_{node}['edge_triggered']:",
+        f'    store = bool(clk) and not old_values[{lo}]',
+        'else:',
+        '    store = bool(clk)',
+    ]
+
+
+def _generate_memory(engine: GeneratedEngine, node: int, kernel: netlist_mod.Kernel,
+                     namespace: dict[str, t.Any]) -> list[str]:
+    # Mirrors engine._compile_memory
+    lo = engine.netlist.first_slot[node]
+    namespace[f'data_{node}'] = engine.netlist.components[node].data
+    return _store_source(node, lo) + [
+        'if store:',
+        f'    result = values[{lo+1}]',
+        *_indent(engine._write_source(engine.netlist.first_net[node], 'result')),
+    ]
+
+
+def _generate_ram(engine: GeneratedEngine, node: int, kernel: netlist_mod.Kernel,
+                  namespace: dict[str, t.Any]) -> list[str]:
+    # Mirrors engine._compile_ram
+    lo = engine.netlist.first_slot[node]
+    namespace[f'data_{node}'] = engine.netlist.components[node].data
+    return [
+        f"memory = data_{node}['memory']",
+        f'address = values[{lo+1}]',
+        'if not isinstance(address, int) or address < 0 or address >= len(memory):',
+        '    address = 0',
+        'result = memory[address]',
+        *engine._write_source(engine.netlist.first_net[node], 'result'),
+        *_store_source(node, lo),
+        'if store:',
+        f'    memory[address] = values[{lo+2}]',
+    ]
+
+
+def _generate_clock(engine: GeneratedEngine, node: int, kernel: netlist_mod.Kernel,
+                    namespace: dict[str, t.Any]) -> list[str]:
+    # Mirrors engine._compile_clock
+    net = engine.netlist.first_net[node]
+    namespace[f'data_{node}'] = engine.netlist.components[node].data
+    domain = engine._clock_domains.get(node)
+    members = domain.nodes if domain is not None else [node]
+    lines = [f'result = not net_values[{net}]']
+    for member in members:
+        lines += engine._write_source(engine.netlist.first_net[member], 'result')
+    lines.append(f"schedule({node}, data_{node}['on_delay' if result else 'off_delay'])")
+    return lines
+
+
+def _generate_pass_through(engine: GeneratedEngine, node: int,
+                           kernel: netlist_mod.Kernel,
+                           namespace: dict[str, t.Any]) -> list[str]:
+    # Mirrors engine._compile_pass_through
+    lo = engine.netlist.first_slot[node]
+    return [f'result = values[{lo}]',
+            *engine._write_source(engine.netlist.first_net[node], 'result')]
+
+
+_GENERATORS: dict[netlist_mod.Kind, _Generator] = {
+    netlist_mod.Kind.NARY: _generate_nary,
+    netlist_mod.Kind.MUX: _generate_mux,
+    netlist_mod.Kind.MEMORY: _generate_memory,
+    netlist_mod.Kind.RAM: _generate_ram,
+    netlist_mod.Kind.CLOCK: _generate_clock,
+    netlist_mod.Kind.PASS_THROUGH: _generate_pass_through,
+}
+
+
+@dataclasses.dataclass
+class Mismatch:
+    ''' A difference between generated code and what it's checked against '''
+    time: int
+    description: str
+
+    def __str__(self) -> str:
+        return f'At time {self.time}, {self.description}'
+
+
+def reference_options(options: options_mod.EngineOptions) -> options_mod.EngineOptions:
+    ''' The options check() runs what generated code is compared to with
+
+    That's the interpreter, unless any options besides compiled and generate
+    are set. Those change what's updated in each tick, or which outputs are
+    kept up to date, so generated code is compared to a CompiledEngine with
+    the same options instead.
+    '''
+    if dataclasses.replace(options, compiled=False, generate=False) == \
+            options_mod.EngineOptions():
+        return options_mod.EngineOptions()
+    return dataclasses.replace(options, generate=False)
+
+
+def check(circuit: 'circuit_mod.Circuit',
+          max_ticks: t.Optional[int] = None) -> t.Optional[Mismatch]:
+    ''' Compare generated code to the interpreter, tick by tick
+
+    Copies of the circuit are run with its engine_options until nothing is
+    scheduled or max_ticks have run, comparing every output after each
+    tick, including its type. See reference_options() for what the
+    generated code is compared to: with options that change what's updated,
+    that's the compiled engine, so this doesn't check those options
+    themselves against the interpreter. Returns the first output that
+    differs, or None. The circuit itself isn't changed.
+    '''
+    options = circuit.engine_options
+    data = copy.deepcopy(circuit.get_save_data())
+    generated, generated_components, engine = _load_engine(
+        data, GeneratedEngine, dataclasses.replace(options, generate=True))
+    reference_engine: t.Optional[engine_mod.CompiledEngine] = None
+    if reference_options(options).compiled:
+        reference, reference_components, reference_engine = _load_engine(
+            data, engine_mod.CompiledEngine, reference_options(options))
+    else:
+        reference = circuit_mod.Circuit()
+        reference_components = sorted(reference.load(copy.deepcopy(data)),
+                                      key=lambda c: c.id)
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(generated.divert_updates(engine.schedule_update))
+        if reference_engine is not None:
+            stack.enter_context(
+                reference.divert_updates(reference_engine.schedule_update))
+        time = 0
+        while True:
+            if reference_engine is None:
+                next_time = reference.next_update_time()
+            else:
+                next_time = reference_engine.next_update_time()
+            generated_next_time = engine.next_update_time()
+            if next_time != generated_next_time:
+                return Mismatch(time, f'the next update is at {generated_next_time} '
+                                      f'instead of {next_time}')
+            if next_time is None or (max_ticks is not None and next_time > max_ticks):
+                return None
+            if reference_engine is None:
+                reference.advance_to_next_event()
+            else:
+                reference_engine.update(next_time)
+            engine.update(next_time)
+            time = next_time
+            mismatch = _compare_outputs(
+                reference_components, reference_engine, engine, next_time)
+            if mismatch is not None:
+                return mismatch
+
+
+def _load_engine(data: dict[str, t.Any], engine_class: type[engine_mod.CompiledEngine],
+                 options: options_mod.EngineOptions) \
+        -> tuple['circuit_mod.Circuit', list['component_mod.Component'],
+                 engine_mod.CompiledEngine]:
+    ''' Load saved components into a new circuit, and make an engine for them '''
+    circuit = circuit_mod.Circuit()
+    components = sorted(circuit.load(copy.deepcopy(data)), key=lambda c: c.id)
+    # Sorted by id, loaded components are in the order they were saved in
+    by_saved_id = {
+        component_data['id']: component
+        for component, component_data in zip(components, data['components'])
+    }
+    updates: scheduler.UpdateQueue['component_mod.Component'] = scheduler.UpdateQueue()
+    for delay, ids in data['updates'].items():
+        for id in ids:
+            updates.schedule(by_saved_id[id], int(delay))
+    return circuit, components, engine_class(components, updates, 0, options=options)
+
+
+def _compare_outputs(components: list['component_mod.Component'],
+                     reference_engine: t.Optional[engine_mod.CompiledEngine],
+                     engine: engine_mod.CompiledEngine,
+                     time: int) -> t.Optional[Mismatch]:
+    ''' Compare engine's outputs to the components', or reference_engine's '''
+    first_net = engine.netlist.first_net
+    for node, component in enumerate(components):
+        for output in component.outputs:
+            net = first_net[node] + output.index
+            if reference_engine is None:
+                expected = output.value
+            else:
+                expected = reference_engine.net_value(net)
+            actual = engine.net_value(net)
+            if expected != actual or type(expected) is not type(actual):
+                return Mismatch(
+                    time, f'output {output.index} of component {component.id} is '
+                          f'{actual!r} instead of {expected!r}')
+    return None
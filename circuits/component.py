@@ -1,13 +1,13 @@
 import collections.abc as abc
+import enum
 import typing as t
 
-import cairo
-
 from . import component_display
-from . import component_registry
 from . import shapes
 
 if t.TYPE_CHECKING:
+    import cairo
+
     from . import application
     from . import circuit as circuit_mod
     from . import creator as creator_mod
@@ -23,7 +23,7 @@ class ComponentException(Exception):
 
 class Component:
     OnUpdateFunc = abc.Callable[['Component'], None]
-    OnDrawFunc = abc.Callable[['Component', 'application.Application', cairo.Context],
+    OnDrawFunc = abc.Callable[['Component', 'application.Application', 'cairo.Context'],
                               None]
     OnClickFunc = abc.Callable[['Component', 'utils.MouseButton'], None]
     OnDestroyFunc = abc.Callable[['Component'], None]
@@ -80,6 +80,7 @@ class Component:
 
     @num_inputs.setter
     def num_inputs(self, value: int) -> None:
+        self._circuit.sync()
         self._inputs = _resize_list(
             lst=self._inputs,
             size=value,
@@ -93,6 +94,7 @@ class Component:
 
     @num_outputs.setter
     def num_outputs(self, value: int) -> None:
+        self._circuit.sync()
         self._outputs = _resize_list(
             lst=self._outputs,
             size=value,
@@ -122,13 +124,15 @@ class Component:
     def set_on_update(self, func: 'Component.OnUpdateFunc') -> None:
         self._on_update = func
 
-    def on_draw(self, app: 'application.Application', cr: cairo.Context) -> None:
+    def on_draw(self, app: 'application.Application', cr: 'cairo.Context') -> None:
         self._on_draw(self, app, cr)
 
     def set_on_draw(self, func: 'Component.OnDrawFunc') -> None:
         self._on_draw = func
 
     def on_click(self, button: 'utils.MouseButton') -> None:
+        self._circuit.sync()
+        self._circuit.stimulate()
         self._on_click(self, button)
 
     def set_on_click(self, func: 'Component.OnClickFunc') -> None:
@@ -205,7 +209,12 @@ class Component:
             'Component[inputs={} outputs={}]'.format(
                 self._inputs, self._outputs))
 
-    def get_save_data(self) -> dict[str, t.Any]:
+    def get_save_data(self, time: t.Optional[int] = None) -> dict[str, t.Any]:
+        ''' Data to recreate the component from with load()
+
+        Components with times in their data save them relative to time, which
+        defaults to the circuit's time.
+        '''
         return {
             'id': self.id,
             'creator': self.creator.get_save_data() if self.creator else None,
@@ -219,6 +228,9 @@ class Component:
 
     @staticmethod
     def load(circuit: 'circuit_mod.Circuit', data: dict[str, t.Any]) -> 'Component':
+        # Imported here since the registry's creators need Circuit at import time
+        from . import component_registry
+
         creator_data = data['creator']
         creator = component_registry.registry.get_creator(
             creator_data['category'], creator_data['name'])
@@ -233,11 +245,15 @@ class Component:
         for out_data in output_data:
             component.outputs[out_data['index']].value = out_data['value']
 
-        component._data = data['data']
+        component.load_data(data['data'])
         component.display.load(data['display'])
 
         return component
 
+    def load_data(self, data: dict[str, t.Any]) -> None:
+        ''' Replace the data with what get_save_data() saved '''
+        self._data = data
+
     def load_inputs(self, data: dict[str, t.Any],
                     components_by_id: dict[int, 'Component']) -> None:
         input_data = data['inputs']
@@ -250,7 +266,7 @@ def _default_on_update(component: Component) -> None:
 
 
 def _default_on_draw(component: Component, app: 'application.Application',
-                     cr: cairo.Context) -> None:
+                     cr: 'cairo.Context') -> None:
     pass
 
 
@@ -276,6 +292,20 @@ def _resize_list(lst: list[_T], size: int,
     return lst
 
 
+class Sensitivity(enum.Enum):
+    ''' Which changes to an input schedule an update of its component
+
+    Changes that don't schedule an update are still stored in new_value, so
+    the component sees them the next time it updates.
+    '''
+    ANY = enum.auto()
+    NONE = enum.auto()
+    # Changes from a falsy to a truthy value
+    RISING = enum.auto()
+    # Changes from a truthy to a falsy value
+    FALLING = enum.auto()
+
+
 class Input:
     def __init__(self, component: Component, index: int) -> None:
         self._component = component
@@ -283,6 +313,14 @@ class Input:
         self._value: t.Any = None
         self._new_value: t.Any = None
         self._old_value: t.Any = None
+        self._sensitivity = Sensitivity.ANY
+        # Whether changes might not schedule an update, to keep setting the
+        # value fast for the usual ANY sensitivity
+        self._filtered = False
+        # For RISING and FALLING inputs, the time new_value last changed
+        # and its value at the start of that tick
+        self._change_time: t.Optional[int] = None
+        self._tick_start_value: t.Any = None
         self._connected_output: t.Optional['Output'] = None
         self._wire_nodes: list['WireNode'] = []
 
@@ -301,9 +339,52 @@ class Input:
     @value.setter
     def value(self, value: t.Any) -> None:
         if self._new_value != value:
-            self._new_value = value
+            if self._filtered:
+                self._filtered_change(value)
+            else:
+                self._new_value = value
+                self._component.schedule_update()
+
+    def _filtered_change(self, value: t.Any) -> None:
+        previous = self._new_value
+        self._new_value = value
+        if self._sensitivity is Sensitivity.NONE:
+            return
+        time = self._component.circuit.time
+        if time != self._change_time:
+            self._change_time = time
+            self._tick_start_value = previous
+        rising = self._sensitivity is Sensitivity.RISING
+        if bool(value) == bool(previous) or bool(value) != rising:
+            return
+        # Changes since the last update weren't latched, so set the value
+        # they would have been latched as. The component then sees the same
+        # old_value as if every change had scheduled an update.
+        self._value = self._tick_start_value
+        self._component.schedule_update()
+
+    @property
+    def sensitivity(self) -> Sensitivity:
+        return self._sensitivity
+
+    @sensitivity.setter
+    def sensitivity(self, value: Sensitivity) -> None:
+        self._component.circuit.sync()
+        self._sensitivity = value
+        self._filtered = value is not Sensitivity.ANY
+        # Catch up on any change that was ignored
+        if value is Sensitivity.ANY and self._new_value != self._value:
             self._component.schedule_update()
 
+    @property
+    def edge_state(self) -> tuple[t.Optional[int], t.Any]:
+        ''' The (change_time, tick_start_value) tuple used for edge sensitivity '''
+        return self._change_time, self._tick_start_value
+
+    @edge_state.setter
+    def edge_state(self, value: tuple[t.Optional[int], t.Any]) -> None:
+        self._change_time, self._tick_start_value = value
+
     @property
     def new_value(self) -> t.Any:
         return self._new_value
@@ -312,6 +393,15 @@ class Input:
     def old_value(self) -> t.Any:
         return self._old_value
 
+    @property
+    def state(self) -> tuple[t.Any, t.Any, t.Any]:
+        ''' The (value, new_value, old_value) tuple '''
+        return self._value, self._new_value, self._old_value
+
+    @state.setter
+    def state(self, value: tuple[t.Any, t.Any, t.Any]) -> None:
+        self._value, self._new_value, self._old_value = value
+
     @property
     def connected_output(self) -> t.Optional['Output']:
         return self._connected_output
@@ -369,6 +459,7 @@ class Input:
 
     def connect(self, output: 'Output',
                 wire_positions: t.Optional[list[shapes.Vector2]] = None) -> None:
+        self._component.circuit.sync()
         if self._connected_output is output:
             self._wire_nodes = [WireNode(pos) for pos in (wire_positions or [])]
             return
@@ -382,6 +473,7 @@ class Input:
         output = self._connected_output
         if output is None:
             return
+        self._component.circuit.sync()
         self.value = None
         self._connected_output = None
         self._wire_nodes = []
@@ -412,10 +504,20 @@ class Output:
 
     @value.setter
     def value(self, value: t.Any) -> None:
+        old_value = self._value
         self._value = value
+        # The connected inputs already have an equal value. Check the type
+        # too so e.g. 1 and True aren't treated as the same value.
+        if value == old_value and type(value) is type(old_value):
+            self._component.circuit.record_suppressed_propagation()
+            return
         for input in self._connected_inputs:
             input.value = value
 
+    def restore_value(self, value: t.Any) -> None:
+        ''' Set the value without passing it to the connected inputs '''
+        self._value = value
+
     @property
     def label(self) -> str:
         return self._component.output_label(self._index)
@@ -437,16 +539,19 @@ class Output:
                 wire_positions: t.Optional[list[shapes.Vector2]] = None) -> None:
         if input in self._connected_inputs:
             return
+        self._component.circuit.sync()
         self._connected_inputs.add(input)
         input.connect(self, wire_positions)
 
     def disconnect(self, input: Input) -> None:
         if input not in self._connected_inputs:
             return
+        self._component.circuit.sync()
         self._connected_inputs.remove(input)
         input.disconnect()
 
     def disconnect_all(self) -> None:
+        self._component.circuit.sync()
         inputs = set(self._connected_inputs)
         self._connected_inputs.clear()
         for input in inputs:
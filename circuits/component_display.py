@@ -1,11 +1,11 @@
 import typing as t
 
-import cairo
-
 from . import shapes
 from . import draw
 
 if t.TYPE_CHECKING:
+    import cairo
+
     from . import application
     from . import component as component_mod
 
@@ -125,7 +125,7 @@ class ComponentDisplay:
         start = self._rect.top_left if input else self._rect.top_right
         return start + (0, NODE_SEPARATION//2) + (0, NODE_SEPARATION*idx)
 
-    def draw(self, app: 'application.Application', cr: cairo.Context) -> None:
+    def draw(self, app: 'application.Application', cr: 'cairo.Context') -> None:
         draw.rectangle(
             cr, self._rect, self._fill_color, self._outline_color)
 
@@ -159,7 +159,7 @@ class ComponentDisplay:
         self._component.on_draw(app, cr)
 
     def draw_input_wires(self, app: 'application.Application',
-                         cr: cairo.Context, debugging: bool = False) -> None:
+                         cr: 'cairo.Context', debugging: bool = False) -> None:
         inputs = self._component.inputs
 
         for input_idx, input in enumerate(inputs):
@@ -183,7 +183,7 @@ class ComponentDisplay:
                 draw.circle(cr, pos, 2, color, color)
 
     def draw_debug_values(self, app: 'application.Application',
-                          cr: cairo.Context) -> None:
+                          cr: 'cairo.Context') -> None:
         if not self._debug:
             return
 
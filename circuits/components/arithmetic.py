@@ -15,8 +15,27 @@ _operators: list[tuple[str, abc.Callable[..., t.Any], int, int]] = [
     ('Div', (lambda a, b: a//b), 2, 2)
 ]
 
+# The same operators on arrays of ints, see netlist.Kernel. Div is left out
+# since dividing by zero doesn't raise, and Mul only multiplies two operands
+# so the product of operands in range can't overflow.
+_array_operators: dict[str, abc.Callable[..., t.Any]] = {
+    'Add': (lambda *args: functools.reduce(operator.add, args)),
+    'Sub': (lambda a, b: a-b),
+    'Mul': (lambda a, b: a*b)
+}
+
+# The same operators as Python source, see netlist.Kernel. Add still calls
+# sum(), which adds floats differently to + in some Python versions.
+_source_operators: dict[str, abc.Callable[..., str]] = {
+    'Add': (lambda *args: f'sum(({", ".join(args)},))'),
+    'Sub': (lambda a, b: f'{a} - {b}'),
+    'Mul': (lambda *args: ' * '.join(args)),
+    'Div': (lambda a, b: f'{a} // {b}')
+}
+
 for name, op, min_inputs, max_inputs in _operators:
     utils.create_nary_component(
         name, CATEGORY, op,
         min_inputs=min_inputs, max_inputs=max_inputs,
-        default_value=0)
+        default_value=0, array_function=_array_operators.get(name),
+        source_function=_source_operators[name])
@@ -10,20 +10,30 @@ from .. import utils
 
 CATEGORY = 'Bitwise'
 
-_operators: list[tuple[str, abc.Callable[..., t.Any]]] = [
-    ('And', lambda a, b: a & b),
-    ('Or', lambda a, b: a | b),
-    ('Nand', lambda a, b: ~(a & b)),
-    ('Nor', lambda a, b: ~(a | b)),
-    ('Xor', lambda a, b: a ^ b),
-    ('Xnor', lambda a, b: ~(a ^ b)),
-    ('Not', lambda a: ~a),
-    ('Lshift', lambda a, b: a << b),
-    ('Rshift', lambda a, b: a >> b)
+_operators: list[tuple[str, abc.Callable[..., t.Any], str]] = [
+    ('And', lambda a, b: a & b, '{0} & {1}'),
+    ('Or', lambda a, b: a | b, '{0} | {1}'),
+    ('Nand', lambda a, b: ~(a & b), '~({0} & {1})'),
+    ('Nor', lambda a, b: ~(a | b), '~({0} | {1})'),
+    ('Xor', lambda a, b: a ^ b, '{0} ^ {1}'),
+    ('Xnor', lambda a, b: ~(a ^ b), '~({0} ^ {1})'),
+    ('Not', lambda a: ~a, '~{0}'),
+    ('Lshift', lambda a, b: a << b, '{0} << {1}'),
+    ('Rshift', lambda a, b: a >> b, '{0} >> {1}')
 ]
 
-for name, op in _operators:
-    utils.create_nary_component(name, CATEGORY, op)
+# Operators that work elementwise on arrays of ints, see netlist.Kernel.
+# Shifts are left out since they can overflow or raise. And, Or and Xor give
+# bools for bool operands rather than ints.
+_array_operators = {'And', 'Or', 'Nand', 'Nor', 'Xor', 'Xnor', 'Not'}
+_int_only_operators = {'And', 'Or', 'Xor'}
+
+for name, op, source in _operators:
+    utils.create_nary_component(
+        name, CATEGORY, op,
+        array_function=op if name in _array_operators else None,
+        array_bool_operands=name not in _int_only_operators,
+        source_function=source.format)
 
 
 @registry.register('Splitter', CATEGORY)
@@ -13,4 +13,7 @@ _operators = [
 ]
 
 for name, op in _operators:
-    utils.create_nary_component(name, CATEGORY, op)
+    # The operators work elementwise on arrays too, and are their own source
+    utils.create_nary_component(
+        name, CATEGORY, op, array_function=op,
+        source_function=f'{{0}} {name} {{1}}'.format)
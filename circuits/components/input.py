@@ -1,14 +1,16 @@
 import typing as t
 
-from gi.repository import Gdk  # type: ignore
-
 from .. import circuit as circuit_mod
 from .. import component as component_mod
 from .. import draw
 from ..component_registry import registry
+from .. import netlist
 from .. import properties
 from .. import utils
 
+if t.TYPE_CHECKING:
+    from gi.repository import Gdk  # type: ignore
+
 
 CATEGORY = 'Input'
 
@@ -33,6 +35,8 @@ def constant_setter(component: component_mod.Component, values: list[t.Any]) ->
     component.output_labels = [str(val) for val in values]
 
 
+constant.kernel = netlist.Kernel(netlist.Kind.PASSIVE)
+
 constant.add_property(properties.RangedMultiValueProperty(
     getter=constant_getter,
     setter=constant_setter,
@@ -112,7 +116,9 @@ def keyboard(circuit: circuit_mod.Circuit) -> component_mod.Component:
     def on_destroy(component: component_mod.Component) -> None:
         circuit.unregister_key_callback(component.data['callback_id'])
 
-    def on_key_press(key: Gdk.EventKey) -> None:
+    def on_key_press(key: 'Gdk.EventKey') -> None:
+        from gi.repository import Gdk
+
         if component.data['enabled']:
             name = Gdk.keyval_name(key.keyval)
             if name == 'Return':
@@ -136,3 +142,6 @@ def keyboard(circuit: circuit_mod.Circuit) -> component_mod.Component:
     component.data['enabled'] = False
     component.data['text_buffer'] = ''
     return component
+
+
+keyboard.kernel = netlist.Kernel(netlist.Kind.PASSIVE)
@@ -1,9 +1,12 @@
 import collections.abc as abc
+import functools
+import operator
 import typing as t
 
 from .. import component as component_mod
 from .. import circuit as circuit_mod
 from ..component_registry import registry
+from .. import netlist
 from .. import properties
 from .. import utils
 
@@ -20,9 +23,44 @@ _operators: list[tuple[str, abc.Callable[..., t.Any], int, int]] = [
     ('Not',  (lambda a: not a),                 1,  1)
 ]
 
+# The same operators on bit-sliced operands, see netlist.Kernel
+_bit_operators: dict[str, abc.Callable[..., int]] = {
+    'And':  (lambda mask, *args: functools.reduce(operator.and_, args)),
+    'Or':   (lambda mask, *args: functools.reduce(operator.or_, args)),
+    'Nand': (lambda mask, *args: mask ^ functools.reduce(operator.and_, args)),
+    'Nor':  (lambda mask, *args: mask ^ functools.reduce(operator.or_, args)),
+    'Xor':  (lambda mask, a, b: a ^ b),
+    'Xnor': (lambda mask, a, b: mask ^ a ^ b),
+    'Not':  (lambda mask, a: mask ^ a)
+}
+
+# The same operators on arrays of ints, see netlist.Kernel
+_array_operators: dict[str, abc.Callable[..., t.Any]] = {
+    'And':  (lambda *args: functools.reduce(operator.and_, [a != 0 for a in args])),
+    'Or':   (lambda *args: functools.reduce(operator.or_, [a != 0 for a in args])),
+    'Nand': (lambda *args: ~functools.reduce(operator.and_, [a != 0 for a in args])),
+    'Nor':  (lambda *args: ~functools.reduce(operator.or_, [a != 0 for a in args])),
+    'Xor':  (lambda a, b: (a != 0) != (b != 0)),
+    'Xnor': (lambda a, b: (a != 0) == (b != 0)),
+    'Not':  (lambda a: a == 0)
+}
+
+# The same operators as Python source, see netlist.Kernel
+_source_operators: dict[str, abc.Callable[..., str]] = {
+    'And':  (lambda *args: f'bool({" and ".join(args)})'),
+    'Or':   (lambda *args: f'bool({" or ".join(args)})'),
+    'Nand': (lambda *args: f'not ({" and ".join(args)})'),
+    'Nor':  (lambda *args: f'not ({" or ".join(args)})'),
+    'Xor':  (lambda a, b: f'(not {a}) != (not {b})'),
+    'Xnor': (lambda a, b: f'(not {a}) == (not {b})'),
+    'Not':  (lambda a: f'not {a}')
+}
+
 for name, op, min_inputs, max_inputs in _operators:
     utils.create_nary_component(
-        name, CATEGORY, op, min_inputs=min_inputs, max_inputs=max_inputs)
+        name, CATEGORY, op, min_inputs=min_inputs, max_inputs=max_inputs,
+        bit_function=_bit_operators[name], array_function=_array_operators[name],
+        source_function=_source_operators[name])
 
 
 @registry.register('Mux', CATEGORY)
@@ -45,4 +83,6 @@ def mux(circuit: circuit_mod.Circuit) -> component_mod.Component:
     return component
 
 
+mux.kernel = netlist.Kernel(netlist.Kind.MUX)
+
 mux.add_property(properties.NumInputsProperty(min_value=3))
@@ -2,15 +2,16 @@ import itertools
 import textwrap
 import typing as t
 
-import cairo
-
 from .. import circuit as circuit_mod
 from .. import component as component_mod
 from .. import draw
 from ..component_registry import registry
+from .. import netlist
 from .. import shapes
 
 if t.TYPE_CHECKING:
+    import cairo
+
     from .. import application
 
 
@@ -20,7 +21,7 @@ CATEGORY = 'Output'
 @registry.register('Display', CATEGORY)
 def display(circuit: circuit_mod.Circuit) -> component_mod.Component:
     def on_draw(component: component_mod.Component, app: 'application.Application',
-                cr: cairo.Context) -> None:
+                cr: 'cairo.Context') -> None:
         text = str(component.inputs[0].value)
         position = component.display.center
         draw.text(cr, text, position)
@@ -29,13 +30,16 @@ def display(circuit: circuit_mod.Circuit) -> component_mod.Component:
         circuit, num_inputs=1, num_outputs=0, on_draw=on_draw)
 
 
+display.kernel = netlist.Kernel(netlist.Kind.PASSIVE)
+
+
 @registry.register('Console', CATEGORY)
 def console(circuit: circuit_mod.Circuit) -> component_mod.Component:
     max_width = 20
     max_height = 7
 
     def on_draw(component: component_mod.Component, app: 'application.Application',
-                cr: cairo.Context) -> None:
+                cr: 'cairo.Context') -> None:
         lines = list(itertools.chain.from_iterable(
             textwrap.wrap(line, width=max_width, tabsize=4)
             for line in component.data['text'].split('\n')
@@ -1,13 +1,26 @@
+import collections.abc as abc
 import typing as t
 
 from .. import component as component_mod
 from .. import circuit as circuit_mod
 from ..component_registry import registry
+from .. import memory as memory_mod
+from .. import netlist
 from .. import properties
 from .. import utils
 
 
 CATEGORY = 'Storage'
+MAX_RAM_WORDS = 1 << 20
+
+
+def _edge_triggered_setter(
+        update_sensitivity: abc.Callable[[component_mod.Component], None]) \
+        -> abc.Callable[[component_mod.Component, bool], None]:
+    def setter(component: component_mod.Component, value: bool) -> None:
+        component.data['edge_triggered'] = value
+        update_sensitivity(component)
+    return setter
 
 
 def _memory_should_update(component: component_mod.Component) -> bool:
@@ -19,6 +32,17 @@ def _memory_should_update(component: component_mod.Component) -> bool:
         return bool(component.inputs[0].value)
 
 
+def _update_memory_sensitivity(component: component_mod.Component) -> None:
+    # Edge triggered memory only changes on a rising clock edge, and then
+    # uses whatever the value input is at the time
+    if component.data['edge_triggered']:
+        component.inputs[0].sensitivity = component_mod.Sensitivity.RISING
+        component.inputs[1].sensitivity = component_mod.Sensitivity.NONE
+    else:
+        component.inputs[0].sensitivity = component_mod.Sensitivity.ANY
+        component.inputs[1].sensitivity = component_mod.Sensitivity.ANY
+
+
 @registry.register('Memory', CATEGORY)
 def memory(circuit: circuit_mod.Circuit) -> component_mod.Component:
     def on_update(component: component_mod.Component) -> None:
@@ -31,12 +55,15 @@ def memory(circuit: circuit_mod.Circuit) -> component_mod.Component:
         output_labels=['value'],
         on_update=on_update)
     component.data['edge_triggered'] = True
+    _update_memory_sensitivity(component)
     return component
 
 
+memory.kernel = netlist.Kernel(netlist.Kind.MEMORY)
+
 memory.add_property(properties.BoolProperty(
     getter=utils.data_getter('edge_triggered'),
-    setter=utils.data_setter('edge_triggered'),
+    setter=_edge_triggered_setter(_update_memory_sensitivity),
     label='Edge Triggered'))
 
 
@@ -61,25 +88,39 @@ def _ram_address(component: component_mod.Component) -> int:
     return address
 
 
-@registry.register('RAM', CATEGORY)
-def ram(circuit: circuit_mod.Circuit) -> component_mod.Component:
-    def on_update(component: component_mod.Component) -> None:
-        address = _ram_address(component)
-        memory = component.data['memory']
-        component.outputs[0].value = memory[address]
+def _update_ram_sensitivity(component: component_mod.Component) -> None:
+    # An edge triggered RAM ignores changes to the value input, which it only
+    # reads on a clk edge. The output is read before the store, so clk and
+    # adr changes still update it, but it only shows a stored value after
+    # the next clk or adr change, not after any change as it otherwise would
+    component.inputs[0].sensitivity = component_mod.Sensitivity.ANY
+    component.inputs[1].sensitivity = component_mod.Sensitivity.ANY
+    component.inputs[2].sensitivity = (
+        component_mod.Sensitivity.NONE if component.data['edge_triggered']
+        else component_mod.Sensitivity.ANY)
 
-        if _memory_should_update(component):
-            memory[address] = component.inputs[2].value
 
+def _update_ram(component: component_mod.Component) -> None:
+    address = _ram_address(component)
+    memory = component.data['memory']
+    component.outputs[0].value = memory[address]
+
+    if _memory_should_update(component):
+        memory[address] = component.inputs[2].value
+
+
+@registry.register('RAM', CATEGORY)
+def ram(circuit: circuit_mod.Circuit) -> component_mod.Component:
     component = component_mod.Component(
         circuit,
         num_inputs=3,
         num_outputs=1,
         input_labels=['clk', 'adr', 'val'],
         output_labels=['value'],
-        on_update=on_update)
+        on_update=_update_ram)
     component.data['memory'] = [None]*10
     component.data['edge_triggered'] = True
+    _update_ram_sensitivity(component)
     return component
 
 
@@ -94,9 +135,11 @@ def ram_setter(component: component_mod.Component, values: list[t.Any]) -> None:
     component.outputs[0].value = memory[address]
 
 
+ram.kernel = netlist.Kernel(netlist.Kind.RAM)
+
 ram.add_property(properties.BoolProperty(
     getter=utils.data_getter('edge_triggered'),
-    setter=utils.data_setter('edge_triggered'),
+    setter=_edge_triggered_setter(_update_ram_sensitivity),
     label='Edge Triggered'))
 
 ram.add_property(properties.RangedMultiValueProperty(
@@ -104,3 +147,132 @@ ram.add_property(properties.RangedMultiValueProperty(
     setter=ram_setter,
     min_values=1, max_values=1000,
     title='Values', start_index=0))
+
+
+class TypedRAMComponent(component_mod.Component):
+    ''' A RAM that holds unsigned words of a fixed width
+
+    Its memory is a memory.WordMemory, so it can hold far more words than a
+    RAM, and saves them compactly. A sparse one's memory is a
+    memory.SparseMemory instead, so its address space can be much larger.
+    '''
+    def __init__(self, circuit: circuit_mod.Circuit) -> None:
+        super().__init__(
+            circuit,
+            num_inputs=3,
+            num_outputs=1,
+            input_labels=['clk', 'adr', 'val'],
+            output_labels=['value'],
+            on_update=_update_ram)
+        self.data['memory'] = memory_mod.WordMemory(256, 8)
+        self.data['edge_triggered'] = True
+        self.data['sparse'] = False
+        self.data['fill'] = 0
+        self.outputs[0].value = 0
+        _update_ram_sensitivity(self)
+
+    def get_save_data(self, time: t.Optional[int] = None) -> dict[str, t.Any]:
+        save_data = super().get_save_data(time)
+        save_data['data'] = dict(self.data, memory=self.data['memory'].get_save_data())
+        return save_data
+
+    def load_data(self, data: dict[str, t.Any]) -> None:
+        super().load_data(dict(data, memory=memory_mod.load(data['memory'])))
+
+
+@registry.register('Typed RAM', CATEGORY)
+def typed_ram(circuit: circuit_mod.Circuit) -> component_mod.Component:
+    return TypedRAMComponent(circuit)
+
+
+def _replace_memory(component: component_mod.Component, size: int, word_width: int,
+                    sparse: bool, fill: int) -> None:
+    ''' Give a Typed RAM new memory with the same words where they fit
+
+    Words that are the old fill become the new fill, so in either mode the
+    fill is what every word reads as until something else is stored to it.
+    '''
+    if not sparse and size > MAX_RAM_WORDS:
+        raise ValueError(
+            f'Only a sparse Typed RAM can have more than {MAX_RAM_WORDS} words, '
+            f'got {size}')
+    fill &= (1 << word_width) - 1
+    memory: t.Union[memory_mod.WordMemory, memory_mod.SparseMemory]
+    if sparse:
+        memory = memory_mod.SparseMemory(size, word_width, fill)
+    else:
+        memory = memory_mod.WordMemory(size, word_width, fill)
+    old_fill = component.data['fill']
+    for address, word in component.data['memory'].items():
+        if address >= size:
+            break
+        if word != old_fill:
+            memory[address] = word
+    component.data.update(memory=memory, sparse=sparse, fill=fill)
+    component.outputs[0].value = memory[_ram_address(component)]
+
+
+def sparse_setter(component: component_mod.Component, value: bool) -> None:
+    memory = component.data['memory']
+    _replace_memory(component, len(memory), memory.word_width, value,
+                    component.data['fill'])
+
+
+def word_width_setter(component: component_mod.Component, value: int) -> None:
+    _replace_memory(component, len(component.data['memory']), value,
+                    component.data['sparse'], component.data['fill'])
+
+
+def fill_setter(component: component_mod.Component, value: int) -> None:
+    memory = component.data['memory']
+    _replace_memory(component, len(memory), memory.word_width,
+                    component.data['sparse'], value)
+
+
+def size_setter(component: component_mod.Component, value: int) -> None:
+    memory = component.data['memory']
+    _replace_memory(component, value, memory.word_width,
+                    component.data['sparse'], component.data['fill'])
+
+
+typed_ram.kernel = netlist.Kernel(netlist.Kind.RAM)
+
+typed_ram.add_property(properties.BoolProperty(
+    getter=utils.data_getter('edge_triggered'),
+    setter=_edge_triggered_setter(_update_ram_sensitivity),
+    label='Edge Triggered'))
+
+# Before the size, which only a sparse RAM allows more than MAX_RAM_WORDS of
+typed_ram.add_property(properties.BoolProperty(
+    getter=utils.data_getter('sparse'),
+    setter=sparse_setter,
+    label='Sparse'))
+
+# Before the fill, which is kept to the word width
+typed_ram.add_property(properties.NumberProperty(
+    getter=lambda component: component.data['memory'].word_width,
+    setter=word_width_setter,
+    min_value=1, max_value=memory_mod.MAX_WORD_WIDTH,
+    label='Word width'))
+
+typed_ram.add_property(properties.NumberProperty(
+    getter=utils.data_getter('fill'),
+    setter=fill_setter,
+    min_value=0, max_value=(1 << memory_mod.MAX_WORD_WIDTH) - 1,
+    label='Fill'))
+
+typed_ram.add_property(properties.NumberProperty(
+    getter=lambda component: len(component.data['memory']),
+    setter=size_setter,
+    min_value=1, max_value=memory_mod.MAX_SPARSE_WORDS,
+    label='Words'))
+
+
+def page_stats(components: abc.Iterable[component_mod.Component]) \
+        -> list[tuple[component_mod.Component, memory_mod.PageStats]]:
+    ''' The page statistics of each sparse Typed RAM, by id '''
+    return [
+        (component, component.data['memory'].page_stats)
+        for component in sorted(components, key=lambda component: component.id)
+        if isinstance(component, TypedRAMComponent) and component.data['sparse']
+    ]
@@ -1,11 +1,16 @@
+import collections
+import typing as t
+
 from .. import component as component_mod
 from .. import circuit as circuit_mod
 from ..component_registry import registry
+from .. import netlist
 from .. import properties
 from .. import utils
 
 
 CATEGORY = 'Time'
+MAX_DELAY = 1_000_000
 
 
 @registry.register('Clock', CATEGORY)
@@ -27,6 +32,8 @@ def clock(circuit: circuit_mod.Circuit) -> component_mod.Component:
     return component
 
 
+clock.kernel = netlist.Kernel(netlist.Kind.CLOCK)
+
 clock.add_property(properties.NumberProperty(
     getter=utils.data_getter('off_delay'),
     setter=utils.data_setter('off_delay'),
@@ -40,41 +47,69 @@ clock.add_property(properties.NumberProperty(
     label='On delay'))
 
 
-@registry.register('Delay', CATEGORY)
-def delay(circuit: circuit_mod.Circuit) -> component_mod.Component:
-    def on_update(component: component_mod.Component) -> None:
-        now = component.circuit.time
-        old_value = component.inputs[0].old_value
-        new_value = component.inputs[0].value
-        updates = component.data['updates']
-        delay = component.data['delay']
+class DelayComponent(component_mod.Component):
+    ''' A component that sets its output to its input some ticks later
 
-        # Add any updates to a queue
+    Each change waiting to be output is queued with the time it's output at,
+    and the component is scheduled to update at that time, so it's only
+    updated when its input or output changes however long the delay is.
+    Loading a circuit resets its time, so saved data has the times relative
+    to when it was saved.
+    '''
+    def __init__(self, circuit: circuit_mod.Circuit) -> None:
+        super().__init__(circuit, num_inputs=1, num_outputs=1)
+        self.data['delay'] = 1
+        self.data['updates'] = collections.deque()
+
+    def on_update(self) -> None:
+        now = self.circuit.time
+        old_value = self.inputs[0].old_value
+        new_value = self.inputs[0].value
+        updates = self.data['updates']
+        delay = self.data['delay']
+
+        # Add any updates to the queue. If the delay was lowered, a change
+        # replaces those still waiting to be output at or after its time,
+        # like a transport delay, so the queue stays in order
         if old_value != new_value:
-            updates.append([new_value, now + delay - 1])
+            output_time = now + delay - 1
+            while updates and updates[-1][1] >= output_time:
+                updates.pop()
+            updates.append((new_value, output_time))
             if delay > 1:
-                component.schedule_update(delay-1)
+                self.schedule_update(delay-1)
 
         # Check if the next update should happen yet
-        if updates:
-            next_update = updates[0]
-            if next_update[1] == now:
-                component.outputs[0].value = next_update[0]
-                # Not very efficient
-                del updates[0]
+        if updates and updates[0][1] == now:
+            self.outputs[0].value = updates.popleft()[0]
+
+    def get_save_data(self, time: t.Optional[int] = None) -> dict[str, t.Any]:
+        save_data = super().get_save_data(time)
+        if time is None:
+            time = self.circuit.time
+        save_data['data'] = dict(self.data, updates=[
+            [value, update_time - time] for value, update_time in self.data['updates']
+        ])
+        return save_data
+
+    def load_data(self, data: dict[str, t.Any]) -> None:
+        time = self.circuit.time
+        super().load_data(dict(data, updates=collections.deque(
+            (value, time + delay) for value, delay in data['updates']
+        )))
+
+
+@registry.register('Delay', CATEGORY)
+def delay(circuit: circuit_mod.Circuit) -> component_mod.Component:
+    return DelayComponent(circuit)
 
-    component = component_mod.Component(
-        circuit, num_inputs=1, num_outputs=1,
-        on_update=on_update)
-    component.data['delay'] = 1
-    component.data['updates'] = []
-    return component
 
+delay.kernel = netlist.Kernel(netlist.Kind.DELAY)
 
 delay.add_property(properties.NumberProperty(
     getter=utils.data_getter('delay'),
     setter=utils.data_setter('delay'),
-    min_value=1, max_value=100,
+    min_value=1, max_value=MAX_DELAY,
     label='Delay'))
 
 
@@ -100,3 +135,6 @@ class PassThroughComponent(component_mod.Component):
 @registry.register('PassThrough', CATEGORY)
 def pass_through(circuit: circuit_mod.Circuit) -> component_mod.Component:
     return PassThroughComponent(circuit)
+
+
+pass_through.kernel = netlist.Kernel(netlist.Kind.PASS_THROUGH)
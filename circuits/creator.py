@@ -1,12 +1,13 @@
 import collections.abc as abc
 import typing as t
 
-from gi.repository import Gtk  # type: ignore
-
 from . import circuit as circuit_mod
 
 if t.TYPE_CHECKING:
+    from gi.repository import Gtk  # type: ignore
+
     from . import component as component_mod
+    from . import netlist
     from . import properties
 
 
@@ -22,6 +23,7 @@ class Creator:
         self._category = category
         self._base_component = creator_func(_CIRCUIT)
         self._properties: list['properties.Property[t.Any]'] = []
+        self._kernel: t.Optional['netlist.Kernel'] = None
 
     @property
     def category(self) -> str:
@@ -31,6 +33,14 @@ class Creator:
     def name(self) -> str:
         return self._name
 
+    @property
+    def kernel(self) -> t.Optional['netlist.Kernel']:
+        return self._kernel
+
+    @kernel.setter
+    def kernel(self, value: t.Optional['netlist.Kernel']) -> None:
+        self._kernel = value
+
     def get_save_data(self) -> dict[str, str]:
         return {
             'category': self._category,
@@ -59,7 +69,7 @@ class Creator:
                              callback: t.Optional[
                                 abc.Callable[['properties.Property[t.Any]',
                                               'component_mod.Component', t.Any],
-                                             None]] = None) -> list[Gtk.Widget]:
+                                             None]] = None) -> list['Gtk.Widget']:
         if component is None:
             component = self._base_component
         return [
@@ -5,10 +5,11 @@ import itertools
 import math
 import typing as t
 
-import cairo
-
 from . import shapes
 
+if t.TYPE_CHECKING:
+    import cairo
+
 
 class Color:
     def __init__(self, rgb: tuple[float, float, float]) -> None:
@@ -55,7 +56,7 @@ class TextVAlign(enum.Enum):
 
 
 @contextlib.contextmanager
-def save_state(cr: cairo.Context) -> abc.Generator[None, None, None]:
+def save_state(cr: 'cairo.Context') -> abc.Generator[None, None, None]:
     cr.save()
     try:
         yield
@@ -63,10 +64,12 @@ def save_state(cr: cairo.Context) -> abc.Generator[None, None, None]:
         cr.restore()
 
 
-def text(cr: cairo.Context, text: str, position: shapes.Vector2, size: int = 12,
+def text(cr: 'cairo.Context', text: str, position: shapes.Vector2, size: int = 12,
          bold: bool = False, h_align: TextHAlign = TextHAlign.CENTER,
          v_align: TextVAlign = TextVAlign.MIDDLE,
          background_color: t.Optional[Color] = None) -> None:
+    import cairo
+
     weight = cairo.FONT_WEIGHT_BOLD if bold else cairo.FONT_WEIGHT_NORMAL
     cr.select_font_face(
         'FreeMono',
@@ -103,7 +106,7 @@ def text(cr: cairo.Context, text: str, position: shapes.Vector2, size: int = 12,
     cr.show_text(text)
 
 
-def line(cr: cairo.Context, pos1: shapes.Vector2, pos2: shapes.Vector2,
+def line(cr: 'cairo.Context', pos1: shapes.Vector2, pos2: shapes.Vector2,
          color: Color, thickness: float = 2.0) -> None:
     cr.set_source_rgb(*color.rgb)
     cr.move_to(*pos1)
@@ -112,7 +115,7 @@ def line(cr: cairo.Context, pos1: shapes.Vector2, pos2: shapes.Vector2,
     cr.stroke()
 
 
-def lines(cr: cairo.Context, positions: abc.Iterable[shapes.Vector2],
+def lines(cr: 'cairo.Context', positions: abc.Iterable[shapes.Vector2],
           color: Color, thickness: float = 2.0) -> None:
     it1, it2 = itertools.tee(positions)
     next(it2, None)
@@ -120,7 +123,7 @@ def lines(cr: cairo.Context, positions: abc.Iterable[shapes.Vector2],
         line(cr, pos1, pos2, color, thickness)
 
 
-def circle(cr: cairo.Context, position: shapes.Vector2, radius: float,
+def circle(cr: 'cairo.Context', position: shapes.Vector2, radius: float,
            fill_color: Color, outline_color: Color) -> None:
     cr.new_path()
     cr.arc(position.x, position.y, radius, 0, math.pi*2)
@@ -133,7 +136,7 @@ def circle(cr: cairo.Context, position: shapes.Vector2, radius: float,
     cr.stroke()
 
 
-def rectangle(cr: cairo.Context, rect: shapes.Rectangle,
+def rectangle(cr: 'cairo.Context', rect: shapes.Rectangle,
               fill_color: t.Optional[Color],
               outline_color: t.Optional[Color] = None) -> None:
     cr.rectangle(*rect.top_left, *rect.size)
@@ -0,0 +1,1050 @@
+import collections.abc as abc
+import heapq
+import typing as t
+
+from . import clocks
+from . import component as component_mod
+from . import fold as fold_mod
+from . import graph
+from . import hashing
+from . import lut
+from . import netlist as netlist_mod
+from . import options as options_mod
+from . import scheduler
+from . import vectorize as vectorize_mod
+
+
+Evaluator = abc.Callable[[], None]
+Observer = abc.Callable[[int, abc.Iterable['component_mod.Component']], None]
+
+
+class CompiledEngine:
+    ''' Simulates components over flat lists instead of Input/Output objects
+
+    Input values are stored per input slot and output values per net (see
+    netlist.Netlist), and updates are scheduled by node index. Components
+    with a kernel are compiled to closures over those lists. Anything else
+    falls back to its on_update function, with its inputs and outputs copied
+    to and from the component around the call.
+
+    The components are not updated while the engine runs. Call write_back()
+    to copy the simulation state to them, and take_updates() to get the
+    pending updates back.
+
+    The other options.EngineOptions change how the updates are run (compiled
+    and generate are up to whoever makes the engine). With zero_delay set,
+    combinational components (see LEVELIZED_KINDS) take no time to update.
+    When their inputs change they are evaluated at the end of the same tick,
+    in topological order so each is evaluated once. Combinational components
+    in a loop are updated as usual, a tick after their inputs change. Those
+    whose inputs were changed between ticks, e.g. by a click, are evaluated
+    before anything else in the next tick. With collapse also set, trees of
+    boolean gates with few inputs are evaluated with a lookup table (see
+    lut.collapse), and the other gates in a tree aren't evaluated at all:
+    their outputs are set from the table, and their inputs only when written
+    back.
+
+    With vectorize set, NARY components with the same kernel and number of
+    inputs that update in the same tick are evaluated together with NumPy
+    array operations (see vectorize.evaluate_group). Groups whose inputs
+    aren't all small ints are evaluated one component at a time. Raises
+    RuntimeError if NumPy isn't installed.
+
+    With fold set, components that are constant or whose outputs can't be
+    observed (see fold.analyze) aren't updated. Writes to their inputs are
+    remembered, and they're scheduled to catch up when the updates are
+    taken, so the components are up to date once the engine is discarded.
+
+    With merge set, components that duplicate another one (see
+    hashing.find_duplicates) aren't updated either. The connections from
+    their outputs are moved to the outputs of the component they duplicate,
+    and their state is copied from it when written back.
+
+    Pass through components are resolved when compiled, once their input
+    and output have settled on the value they pass on: writes to the net a
+    chain of them reads go straight to what the end of the chain is
+    connected to. Their own inputs and outputs are only set when written
+    back, and net_value() gives the value they pass on. They aren't merged,
+    and chains fed by a duplicate pass on the outputs of what it duplicates.
+
+    Clocks are grouped into domains (see clocks.ClockDomain) that are each
+    scheduled as one event. fast_forward() moves domains that nothing needs
+    to see change ahead by whole periods at once.
+
+    If observe is set, it's called with the time and the components
+    scheduled to update in each tick that any are.
+
+    Components in external are never updated or scheduled. Their outputs are
+    only set with write(), e.g. by a simulation running them elsewhere.
+    '''
+    LEVELIZED_KINDS = frozenset({netlist_mod.Kind.NARY, netlist_mod.Kind.MUX})
+
+    def __init__(self, components: abc.Iterable['component_mod.Component'],
+                 updates: 'scheduler.UpdateQueue[component_mod.Component]',
+                 time: int,
+                 options: options_mod.EngineOptions = options_mod.EngineOptions(),
+                 external: abc.Collection['component_mod.Component'] = (),
+                 observe: t.Optional[Observer] = None) -> None:
+        if options.vectorize and not vectorize_mod.available():
+            raise RuntimeError('NumPy is required to vectorize updates')
+        netlist = netlist_mod.Netlist.build(components)
+        self._netlist = netlist
+        self._index = netlist.index()
+        self._external = {self._index[component] for component in external}
+        self._options = options
+        self._time = time
+
+        self._values: list[t.Any] = [None] * netlist.num_slots
+        self._new_values: list[t.Any] = [None] * netlist.num_slots
+        self._old_values: list[t.Any] = [None] * netlist.num_slots
+        self._net_values: list[t.Any] = [None] * netlist.num_nets
+        # See component.Input.edge_state
+        self._change_times: list[t.Optional[int]] = [None] * netlist.num_slots
+        self._tick_start_values: list[t.Any] = [None] * netlist.num_slots
+        for node, component in enumerate(netlist.components):
+            first_slot = netlist.first_slot[node]
+            for input in component.inputs:
+                slot = first_slot + input.index
+                (self._values[slot], self._new_values[slot],
+                 self._old_values[slot]) = input.state
+                (self._change_times[slot],
+                 self._tick_start_values[slot]) = input.edge_state
+            first_net = netlist.first_net[node]
+            for output in component.outputs:
+                self._net_values[first_net + output.index] = output.value
+
+        self._updates: scheduler.UpdateQueue[int] = scheduler.UpdateQueue(
+            time, track_items=False)
+        for update_time, components_to_update in updates.items():
+            for component in components_to_update:
+                node = self._index.get(component)
+                if node is not None and node not in self._external:
+                    self._updates.schedule(node, update_time - time)
+        self._next_updates = self._updates.next_updates
+
+        # Pass through nodes update as soon as their input changes
+        self._instant = {
+            node for node, kernel in enumerate(netlist.kernels)
+            if kernel is not None and kernel.kind is netlist_mod.Kind.PASS_THROUGH
+        }
+        self._updating: set[int] = set()
+        self._fallback: t.Optional['component_mod.Component'] = None
+        self._suppressed_propagations = 0
+        self._observe = observe
+
+        # With zero_delay, the levelized nodes, the topological rank of each
+        # node and the levelized nodes whose inputs changed this tick
+        self._levelized: set[int] = set()
+        self._ranks: list[int] = []
+        self._dirty: set[int] = set()
+        self._dirty_ranks: list[tuple[int, int]] = []
+        if options.zero_delay:
+            self._levelize()
+
+        # The (slot, node) each net is connected to, and the nodes that don't
+        # just get scheduled when an input changes
+        self._fanout = [
+            tuple((slot, netlist.slot_nodes[slot]) for slot in slots
+                  if netlist.slot_nodes[slot] not in self._external)
+            for slots in netlist.fanout
+        ]
+        self._special = self._instant | self._levelized | {
+            netlist.slot_nodes[slot] for slot in range(netlist.num_slots)
+            if netlist.sensitivities[slot] is not component_mod.Sensitivity.ANY
+        }
+        self._latch_slots = [
+            tuple(netlist.slots(node)) for node in range(netlist.num_nodes)
+        ]
+
+        # With fold, the nodes that aren't updated, and those of them whose
+        # inputs changed
+        self._skipped: set[int] = set()
+        self._stale: set[int] = set()
+        self._fold_report: t.Optional[fold_mod.Report] = None
+        if options.fold:
+            self._fold()
+
+        # The pass through nodes resolved into aliases, in the order they're
+        # chained in and as a set, and the net each of their outputs is an
+        # alias of
+        self._aliases: list[int] = []
+        self._aliased: set[int] = set()
+        self._alias_nets: dict[int, int] = {}
+        self._alias()
+
+        # With merge, the node each duplicate node duplicates
+        self._duplicates: dict[int, int] = {}
+        if options.merge:
+            self._merge()
+
+        # With collapse, the lookup table for each tree of gates by its root,
+        # and the root of the tree each other gate in one is in
+        self._tables: dict[int, lut.Table] = {}
+        self._collapsed: dict[int, int] = {}
+        if options.zero_delay and options.collapse:
+            self._collapse()
+
+        # The domain each scheduled clock node updates, the node scheduled for
+        # each other clock in a domain, and the nodes of domains whose clocks
+        # are only connected to inputs that ignore their changes
+        self._clock_domains: dict[int, clocks.ClockDomain] = {}
+        self._clock_members: dict[int, int] = {}
+        self._idle_clocks: set[int] = set()
+        self._group_clocks()
+
+        if options.zero_delay:
+            self._dirty_pending()
+
+        self._write = self._make_write()
+        self._evaluators: list[t.Optional[Evaluator]] = [
+            None if node in self._external else self._compile(node)
+            for node in range(netlist.num_nodes)
+        ]
+
+        # With vectorize, the (kernel, number of inputs) of each group, and
+        # the group each node can be evaluated in or -1
+        self._vectorize = options.vectorize
+        self._groups: list[tuple[netlist_mod.Kernel, int]] = []
+        self._node_groups: list[int] = [-1] * netlist.num_nodes
+        group_indexes: dict[tuple[netlist_mod.Kernel, int], int] = {}
+        for node, kernel in enumerate(netlist.kernels):
+            if (node in self._tables or node in self._collapsed or node in self._skipped
+                    or node in self._duplicates):
+                continue
+            if kernel is not None and kernel.array_function is not None:
+                key = (kernel, len(self._latch_slots[node]))
+                if key not in group_indexes:
+                    group_indexes[key] = len(self._groups)
+                    self._groups.append(key)
+                self._node_groups[node] = group_indexes[key]
+
+    @property
+    def netlist(self) -> netlist_mod.Netlist:
+        return self._netlist
+
+    @property
+    def levelized(self) -> abc.Set[int]:
+        ''' The nodes evaluated with zero delay '''
+        return self._levelized
+
+    @property
+    def tables(self) -> list[lut.Table]:
+        ''' The lookup tables trees of gates were collapsed into '''
+        return list(self._tables.values())
+
+    @property
+    def options(self) -> options_mod.EngineOptions:
+        return self._options
+
+    @property
+    def fold_report(self) -> t.Optional[fold_mod.Report]:
+        ''' What was eliminated, if fold was set '''
+        return self._fold_report
+
+    @property
+    def duplicates(self) -> abc.Mapping[int, int]:
+        ''' The node each node merged into another one duplicates '''
+        return self._duplicates
+
+    @property
+    def suppressed_propagations(self) -> int:
+        ''' How many writes to a net were skipped because it had that value '''
+        return self._suppressed_propagations
+
+    def has_pending_updates(self) -> bool:
+        return bool(self._updates) or bool(self._dirty)
+
+    def net_value(self, net: int) -> t.Any:
+        return self._net_values[self._alias_nets.get(net, net)]
+
+    def write(self, net: int, value: t.Any) -> None:
+        ''' Set a net's value in the current tick, as its driver would '''
+        self._write(net, value)
+
+    def next_update_time(self) -> t.Optional[int]:
+        if self._dirty:
+            return self._time+1
+        return self._updates.next_time()
+
+    def schedule_update(self, component: 'component_mod.Component', delay: int) -> None:
+        # Fallback components write to their Output objects, which schedules
+        # the connected components. Those are scheduled from the net values
+        # instead, so only let components schedule themselves.
+        if self._fallback is not None and component is not self._fallback:
+            return
+        node = self._index.get(component)
+        if node is not None and node not in self._external:
+            self._schedule(node, delay)
+
+    def update(self, time: int) -> bool:
+        ''' Run the updates scheduled at a time
+
+        Any ticks skipped over must have nothing scheduled. Returns whether
+        anything was updated.
+        '''
+        # Levelized nodes whose inputs were written between ticks, e.g. by a
+        # click, settle before anything in the tick sees them
+        settled = bool(self._dirty)
+        if settled:
+            self._settle()
+        if time != self._time + 1:
+            nodes = self._updates.advance_to(time)
+        else:
+            nodes = self._updates.advance()
+        self._time = time
+        self._next_updates = self._updates.next_updates
+        if not nodes:
+            return settled
+        if self._observe is not None:
+            components = self._netlist.components
+            self._observe(time, [components[node] for node in nodes])
+
+        latch_slots = self._latch_slots
+        values = self._values
+        new_values = self._new_values
+        old_values = self._old_values
+        for node in nodes:
+            for slot in latch_slots[node]:
+                old_values[slot] = values[slot]
+                values[slot] = new_values[slot]
+
+        if self._vectorize:
+            nodes = self._evaluate_groups(nodes)
+        evaluators = self._evaluators
+        for node in nodes:
+            evaluator = evaluators[node]
+            if evaluator is not None:
+                evaluator()
+        if self._dirty:
+            self._settle()
+        return True
+
+    def fast_forward(self, time: int) -> bool:
+        ''' Run the updates scheduled up to a time at once, if they're only clocks
+
+        This only happens if the clocks are in domains whose clocks are only
+        connected to inputs that ignore their changes (see _ignores_changes),
+        so they can change any number of times without anything else
+        updating, and those inputs are given the clocks' values at the time.
+        Returns whether the engine is now at the time.
+        '''
+        idle = self._idle_clocks
+        if (time <= self._time or not idle or not self._next_updates <= idle
+                or self._dirty):
+            return False
+        scheduled: dict[int, int] = {}
+        for update_time, nodes in self._updates.items():
+            if update_time > time:
+                break
+            for node in nodes:
+                if node not in idle or node in scheduled:
+                    return False
+                scheduled[node] = update_time
+
+        first_net = self._netlist.first_net
+        later = [
+            (update_time, nodes) for update_time, nodes in self._updates.items()
+            if update_time > time
+        ]
+        self._updates.clear(time)
+        for update_time, nodes in later:
+            for node in nodes:
+                self._updates.schedule(node, update_time - time)
+        for node, update_time in scheduled.items():
+            domain = self._clock_domains[node]
+            # Mirrors _compile_clock
+            value, next_time = domain.advance(
+                self._net_values[first_net[node]], update_time, time)
+            for member in domain.nodes:
+                net = first_net[member]
+                self._net_values[net] = value
+                # Mirrors _make_write, for a net that changed at least once
+                for slot, other in self._fanout[net]:
+                    self._new_values[slot] = value
+                    if other in self._skipped:
+                        self._stale.add(other)
+            self._updates.schedule(node, next_time - time)
+        self._time = time
+        self._next_updates = self._updates.next_updates
+        return True
+
+    def _evaluate_groups(self, nodes: abc.Iterable[int]) -> list[int]:
+        ''' Evaluate the nodes that can be grouped and return the rest '''
+        node_groups = self._node_groups
+        groups: dict[int, list[int]] = {}
+        remaining = []
+        for node in nodes:
+            group = node_groups[node]
+            if group < 0:
+                remaining.append(node)
+            elif group in groups:
+                groups[group].append(node)
+            else:
+                groups[group] = [node]
+
+        latch_slots = self._latch_slots
+        first_net = self._netlist.first_net
+        values = self._values
+        write = self._write
+        for group, members in groups.items():
+            results = None
+            if len(members) >= vectorize_mod.MIN_GROUP_SIZE:
+                kernel, num_inputs = self._groups[group]
+                operands = [
+                    values[slot] for node in members for slot in latch_slots[node]
+                ]
+                results = vectorize_mod.evaluate_group(kernel, operands, num_inputs)
+            if results is None:
+                remaining.extend(members)
+                continue
+            for node, result in zip(members, results):
+                write(first_net[node], result)
+        return remaining
+
+    def _levelize(self) -> None:
+        netlist = self._netlist
+        # Pass through nodes are included since they update instantly too
+        combinational = [
+            kernel is not None and (kernel.kind in self.LEVELIZED_KINDS
+                                    or kernel.kind is netlist_mod.Kind.PASS_THROUGH)
+            for kernel in netlist.kernels
+        ]
+        successors = [
+            [successor for successor in node_successors if combinational[successor]]
+            if combinational[node] else []
+            for node, node_successors in enumerate(netlist.successors())
+        ]
+        components = graph.strongly_connected_components(successors)
+        self._ranks = [0] * netlist.num_nodes
+        for rank, component in enumerate(reversed(components)):
+            for node in component:
+                self._ranks[node] = rank
+            if graph.is_cyclic(component, successors):
+                continue
+            kernel = netlist.kernels[component[0]]
+            if kernel is not None and kernel.kind in self.LEVELIZED_KINDS:
+                self._levelized.add(component[0])
+
+    def _fold(self) -> None:
+        folded, dead = fold_mod.analyze(
+            self._netlist, self._net_values, self._new_values, self._external)
+        self._skipped = folded | dead
+        # Writes to their inputs go through _input_changed
+        self._special |= self._skipped
+        for _, nodes in self._updates.items():
+            self._stale |= nodes & self._skipped
+        self._fold_report = fold_mod.Report(
+            self._netlist.num_nodes, len(folded), len(dead))
+
+    def _alias(self) -> None:
+        netlist = self._netlist
+        drivers = netlist.drivers
+        first_slot = netlist.first_slot
+
+        def settled(node: int) -> bool:
+            slot = first_slot[node]
+            if drivers[slot] < 0:
+                return False
+            value = self._net_values[drivers[slot]]
+            return all(
+                other == value and type(other) is type(value)
+                for other in (self._values[slot], self._new_values[slot],
+                              self._net_values[netlist.first_net[node]]))
+
+        candidates = {
+            node for node in self._instant
+            if node not in self._external and node not in self._skipped and settled(node)
+        }
+
+        def driver(node: int) -> int:
+            return netlist.net_nodes[drivers[first_slot[node]]]
+
+        # Each chain is resolved from the net of the first node in it that
+        # isn't a candidate, so leave out candidates chained in a loop
+        looped = set()
+        for node in candidates:
+            chain = {node}
+            current = driver(node)
+            while current in candidates and current not in chain:
+                chain.add(current)
+                current = driver(current)
+            if current == node:
+                looped.add(node)
+        candidates -= looped
+        depths: dict[int, int] = {}
+        for node in candidates:
+            chain = [node]
+            current = driver(node)
+            while current in candidates and current not in depths:
+                chain.append(current)
+                current = driver(current)
+            depth = depths.get(current, -1)
+            for chained in reversed(chain):
+                depth += 1
+                depths[chained] = depth
+        self._aliases = sorted(depths, key=lambda node: depths[node])
+        self._aliased = candidates
+        for node in self._aliases:
+            net = drivers[first_slot[node]]
+            self._alias_nets[netlist.first_net[node]] = self._alias_nets.get(net, net)
+
+        # Nets are written with the fanout of the chains they lead to
+        aliased = self._aliased
+        fanout = self._fanout
+        for net in range(netlist.num_nets):
+            if net in self._alias_nets:
+                continue
+            resolved = []
+            pending = list(reversed(fanout[net]))
+            while pending:
+                slot, node = pending.pop()
+                if node in aliased:
+                    pending.extend(reversed(fanout[netlist.first_net[node]]))
+                else:
+                    resolved.append((slot, node))
+            fanout[net] = tuple(resolved)
+        for net in self._alias_nets:
+            fanout[net] = ()
+
+    def _merge(self) -> None:
+        netlist = self._netlist
+        candidates = [
+            node for node, kernel in enumerate(netlist.kernels)
+            if kernel is not None and kernel.kind in hashing.MERGEABLE_KINDS
+            and node not in self._external and node not in self._skipped
+            and node not in self._aliased
+        ]
+        if self._levelized:
+            # What a duplicate drives must be evaluated after the node kept
+            candidates.sort(key=lambda node: self._ranks[node])
+        pending: dict[int, set[int]] = {}
+        for time, nodes in self._updates.items():
+            for node in nodes:
+                pending.setdefault(node, set()).add(time)
+        slot_lists = (self._values, self._new_values, self._old_values,
+                      self._change_times, self._tick_start_values)
+
+        def same_state(node: int, other: int) -> bool:
+            if pending.get(node) != pending.get(other):
+                return False
+            if (node in self._levelized) != (other in self._levelized):
+                return False
+            pairs = [
+                (values[slot], values[other_slot]) for values in slot_lists
+                for slot, other_slot in zip(netlist.slots(node), netlist.slots(other))
+            ]
+            pairs.extend(
+                (self._net_values[net], self._net_values[other_net])
+                for net, other_net in zip(netlist.nets(node), netlist.nets(other)))
+            return all(a == b and type(a) is type(b) for a, b in pairs)
+
+        self._duplicates = hashing.find_duplicates(netlist, candidates, same_state)
+        # Duplicates are never scheduled, and what their outputs are connected
+        # to is written by the outputs of the node they duplicate instead
+        for net, slots in enumerate(self._fanout):
+            self._fanout[net] = tuple(
+                (slot, node) for slot, node in slots if node not in self._duplicates)
+        original_nets: dict[int, int] = {}
+        for duplicate, original in self._duplicates.items():
+            for net, original_net in zip(netlist.nets(duplicate), netlist.nets(original)):
+                self._fanout[original_net] += self._fanout[net]
+                self._fanout[net] = ()
+                original_nets[net] = original_net
+        # Chains fed by a duplicate are aliases of what the original writes
+        for net, root in self._alias_nets.items():
+            self._alias_nets[net] = original_nets.get(root, root)
+
+    def _group_clocks(self) -> None:
+        netlist = self._netlist
+        pending: dict[int, list[int]] = {}
+        for time, nodes in self._updates.items():
+            for node in nodes:
+                pending.setdefault(node, []).append(time)
+        domains: dict[t.Hashable, clocks.ClockDomain] = {}
+        for node, kernel in enumerate(netlist.kernels):
+            if (kernel is None or kernel.kind is not netlist_mod.Kind.CLOCK
+                    or node in self._external):
+                continue
+            data = netlist.components[node].data
+            value = self._net_values[netlist.first_net[node]]
+            times = pending.get(node, [])
+            # Clocks that aren't scheduled once are in a domain of their own
+            key: t.Hashable = node
+            if len(times) == 1:
+                key = (data['on_delay'], data['off_delay'], value, type(value), times[0])
+            domain = domains.get(key)
+            if domain is None:
+                domains[key] = clocks.ClockDomain(
+                    data['on_delay'], data['off_delay'], [node])
+            else:
+                domain.nodes.append(node)
+                self._clock_members[node] = domain.nodes[0]
+        for domain in domains.values():
+            node = domain.nodes[0]
+            self._clock_domains[node] = domain
+            if all(self._ignores_changes(slot, other)
+                   for member in domain.nodes
+                   for slot, other in self._fanout[netlist.first_net[member]]):
+                self._idle_clocks.add(node)
+
+    def _ignores_changes(self, slot: int, node: int) -> bool:
+        ''' Whether changes to an input slot only need their last value kept
+
+        That's the case for nodes left out by fold, and for inputs whose
+        changes don't make their node update.
+        '''
+        # Mirrors _input_changed
+        if node in self._skipped:
+            return True
+        return (node not in self._levelized and node not in self._instant
+                and self._netlist.sensitivities[slot] is component_mod.Sensitivity.NONE)
+
+    def _collapse(self) -> None:
+        netlist = self._netlist
+        # Duplicated nodes drive more than the netlist says
+        merged = self._duplicates.keys() | set(self._duplicates.values())
+        gates = set()
+        for node in self._levelized:
+            kernel = netlist.kernels[node]
+            if (kernel is not None and kernel.bit_function is not None
+                    and node not in self._external and node not in self._skipped
+                    and node not in merged):
+                gates.add(node)
+        tables = lut.collapse(netlist, gates, self._ranks, self._new_values)
+        for table in tables:
+            self._tables[table.root] = table
+            for node in table.nodes:
+                if node != table.root:
+                    self._collapsed[node] = table.root
+            # Only the inputs the table reads need to be latched
+            self._latch_slots[table.root] = tuple(table.inputs)
+
+        # Writes to a tree's inputs go to its root, and nets inside a tree
+        # are set by the table instead of by writes
+        for net, slots in enumerate(self._fanout):
+            driver_root = self._collapsed.get(netlist.net_nodes[net])
+            self._fanout[net] = tuple(
+                (slot, self._collapsed.get(node, node)) for slot, node in slots
+                if driver_root is None or self._collapsed.get(node, node) != driver_root
+            )
+
+    def _dirty_pending(self) -> None:
+        ''' Move the levelized nodes scheduled to update to _dirty
+
+        They're scheduled when their inputs were written outside of the
+        engine, and are settled before the next tick instead. Gates in a tree
+        collapsed into a lookup table settle by evaluating its root.
+        '''
+        levelized = self._levelized - self._skipped
+        pending = [
+            (update_time, nodes) for update_time, nodes in self._updates.items()
+        ]
+        self._updates.clear(self._time)
+        for update_time, nodes in pending:
+            for node in nodes:
+                if node not in levelized:
+                    self._updates.schedule(node, update_time - self._time)
+                    continue
+                node = self._collapsed.get(node, node)
+                if node not in self._dirty:
+                    self._dirty.add(node)
+                    heapq.heappush(self._dirty_ranks, (self._ranks[node], node))
+        self._next_updates = self._updates.next_updates
+
+    def _settle(self) -> None:
+        ''' Evaluate the levelized nodes whose inputs changed this tick '''
+        dirty = self._dirty
+        dirty_ranks = self._dirty_ranks
+        latch_slots = self._latch_slots
+        values = self._values
+        new_values = self._new_values
+        old_values = self._old_values
+        evaluators = self._evaluators
+        # Evaluating a node can only add nodes with a higher rank
+        while dirty_ranks:
+            _, node = heapq.heappop(dirty_ranks)
+            dirty.discard(node)
+            for slot in latch_slots[node]:
+                old_values[slot] = values[slot]
+                values[slot] = new_values[slot]
+            evaluator = evaluators[node]
+            if evaluator is not None:
+                evaluator()
+
+    def write_back(self) -> None:
+        ''' Copy input and output values to the components '''
+        netlist = self._netlist
+        # Duplicates are in the same state as the node they duplicate
+        slot_lists = (self._values, self._new_values, self._old_values,
+                      self._change_times, self._tick_start_values)
+        for duplicate, original in self._duplicates.items():
+            for slot, original_slot in zip(netlist.slots(duplicate),
+                                           netlist.slots(original)):
+                for values in slot_lists:
+                    values[slot] = values[original_slot]
+            for net, original_net in zip(netlist.nets(duplicate), netlist.nets(original)):
+                self._net_values[net] = self._net_values[original_net]
+        # Mirrors _input_changed and _update_now for each link of a chain,
+        # which may be fed by a duplicate
+        for node in self._aliases:
+            slot = netlist.first_slot[node]
+            value = self._net_values[netlist.drivers[slot]]
+            if self._new_values[slot] != value:
+                self._new_values[slot] = value
+                self._old_values[slot] = self._values[slot]
+                self._values[slot] = value
+                self._net_values[netlist.first_net[node]] = value
+        # Inputs of collapsed gates aren't updated while running
+        for node in self._collapsed.keys() | self._tables.keys():
+            for slot in netlist.slots(node):
+                net = netlist.drivers[slot]
+                if net >= 0 and netlist.net_nodes[net] in self._collapsed:
+                    self._new_values[slot] = self._net_values[net]
+                self._values[slot] = self._new_values[slot]
+        for node, component in enumerate(netlist.components):
+            first_slot = netlist.first_slot[node]
+            for input in component.inputs:
+                slot = first_slot + input.index
+                input.state = (
+                    self._values[slot], self._new_values[slot], self._old_values[slot])
+                input.edge_state = (
+                    self._change_times[slot], self._tick_start_values[slot])
+            first_net = netlist.first_net[node]
+            for output in component.outputs:
+                output.restore_value(self._net_values[first_net + output.index])
+
+    def take_updates(self) -> dict[int, set['component_mod.Component']]:
+        ''' Remove and return the pending updates, by time '''
+        # Nodes left to settle update next tick without zero delay
+        for node in self._dirty:
+            self._updates.schedule(node, 1)
+        self._dirty.clear()
+        self._dirty_ranks.clear()
+        for node in self._stale:
+            self._updates.schedule(node, 1)
+        self._stale.clear()
+        components = self._netlist.components
+        updates = {
+            time: {components[node] for node in nodes}
+            for time, nodes in self._updates.items()
+        }
+        # Duplicates and clocks in a domain are scheduled with the node they follow
+        followers = self._duplicates | self._clock_members
+        for time, nodes in self._updates.items():
+            updates[time] |= {
+                components[follower] for follower, leader in followers.items()
+                if leader in nodes
+            }
+        self._updates.clear(self._time)
+        self._next_updates = self._updates.next_updates
+        return updates
+
+    def _schedule(self, node: int, delay: int) -> None:
+        self._updates.schedule(node, delay)
+
+    def _make_write(self) -> abc.Callable[[int, t.Any], None]:
+        net_values = self._net_values
+        new_values = self._new_values
+        fanout = self._fanout
+        special = self._special
+        input_changed = self._input_changed
+
+        def write(net: int, value: t.Any) -> None:
+            # Mirrors component.Output.value
+            old_value = net_values[net]
+            net_values[net] = value
+            if value == old_value and type(value) is type(old_value):
+                self._suppressed_propagations += 1
+                return
+            for slot, node in fanout[net]:
+                previous = new_values[slot]
+                if previous != value:
+                    new_values[slot] = value
+                    if node in special:
+                        input_changed(slot, node, previous, value)
+                    else:
+                        self._next_updates.add(node)
+        return write
+
+    def _input_changed(self, slot: int, node: int, previous: t.Any, value: t.Any) -> None:
+        # Mirrors component.Input.value
+        if node in self._skipped:
+            self._stale.add(node)
+            return
+        if node in self._levelized:
+            if node not in self._dirty:
+                self._dirty.add(node)
+                heapq.heappush(self._dirty_ranks, (self._ranks[node], node))
+            return
+        if node in self._instant:
+            self._update_now(node)
+            return
+        sensitivity = self._netlist.sensitivities[slot]
+        if sensitivity is component_mod.Sensitivity.ANY:
+            self._next_updates.add(node)
+        elif sensitivity is not component_mod.Sensitivity.NONE:
+            if self._time != self._change_times[slot]:
+                self._change_times[slot] = self._time
+                self._tick_start_values[slot] = previous
+            rising = sensitivity is component_mod.Sensitivity.RISING
+            if bool(value) != bool(previous) and bool(value) == rising:
+                self._values[slot] = self._tick_start_values[slot]
+                self._next_updates.add(node)
+
+    def _update_now(self, node: int) -> None:
+        # Prevent loops where the output leads back to the input
+        if node in self._updating:
+            return
+        self._updating.add(node)
+        lo = self._netlist.first_slot[node]
+        hi = self._netlist.first_slot[node+1]
+        self._old_values[lo:hi] = self._values[lo:hi]
+        self._values[lo:hi] = self._new_values[lo:hi]
+        evaluator = self._evaluators[node]
+        if evaluator is not None:
+            evaluator()
+        self._updating.discard(node)
+
+    def _compile(self, node: int) -> t.Optional[Evaluator]:
+        if (node in self._skipped or node in self._duplicates or node in self._aliased
+                or node in self._clock_members):
+            return None
+        if node in self._tables:
+            return _compile_table(self, self._tables[node])
+        if node in self._collapsed:
+            return None
+        kernel = self._netlist.kernels[node]
+        if kernel is None:
+            return self._compile_fallback(node)
+        compile_func = _COMPILERS.get(kernel.kind)
+        if compile_func is None:
+            return None
+        return compile_func(self, node, kernel)
+
+    def _compile_fallback(self, node: int) -> Evaluator:
+        component = self._netlist.components[node]
+        first_slot = self._netlist.first_slot[node]
+        first_net = self._netlist.first_net[node]
+        values = self._values
+        new_values = self._new_values
+        old_values = self._old_values
+        net_values = self._net_values
+        write = self._write
+
+        def evaluate() -> None:
+            for input in component.inputs:
+                slot = first_slot + input.index
+                input.state = (values[slot], new_values[slot], old_values[slot])
+            for output in component.outputs:
+                output.restore_value(net_values[first_net + output.index])
+
+            self._fallback = component
+            try:
+                component.on_update()
+            finally:
+                self._fallback = None
+
+            for output in component.outputs:
+                net = first_net + output.index
+                value = output.value
+                if value is not net_values[net]:
+                    write(net, value)
+        return evaluate
+
+
+_Compiler = abc.Callable[[CompiledEngine, int, netlist_mod.Kernel],
+                         t.Optional[Evaluator]]
+
+
+def _compile_nary(engine: CompiledEngine, node: int,
+                  kernel: netlist_mod.Kernel) -> Evaluator:
+    # Mirrors utils.create_nary_component
+    lo = engine.netlist.first_slot[node]
+    hi = engine.netlist.first_slot[node+1]
+    net = engine.netlist.first_net[node]
+    values = engine._values
+    write = engine._write
+    function = kernel.function
+    assert function is not None
+    default_value = kernel.default_value
+
+    def evaluate() -> None:
+        try:
+            result = function(*values[lo:hi])
+        except Exception:
+            result = default_value
+        write(net, result)
+    return evaluate
+
+
+def _compile_mux(engine: CompiledEngine, node: int,
+                 kernel: netlist_mod.Kernel) -> Evaluator:
+    # Mirrors components.logic.mux
+    lo = engine.netlist.first_slot[node]
+    hi = engine.netlist.first_slot[node+1]
+    net = engine.netlist.first_net[node]
+    values = engine._values
+    write = engine._write
+    num_inputs = hi - lo
+
+    def evaluate() -> None:
+        select: t.Optional[int]
+        try:
+            select = int(values[lo] or 0)
+        except ValueError:
+            select = None
+        if select is None or select >= num_inputs-1:
+            write(net, None)
+        else:
+            write(net, values[lo:hi][select+1])
+    return evaluate
+
+
+def _compile_memory(engine: CompiledEngine, node: int,
+                    kernel: netlist_mod.Kernel) -> Evaluator:
+    # Mirrors components.storage.memory
+    lo = engine.netlist.first_slot[node]
+    net = engine.netlist.first_net[node]
+    data = engine.netlist.components[node].data
+    values = engine._values
+    old_values = engine._old_values
+    write = engine._write
+
+    def evaluate() -> None:
+        if should_store(data, values[lo], old_values[lo]):
+            write(net, values[lo+1])
+    return evaluate
+
+
+def _compile_ram(engine: CompiledEngine, node: int,
+                 kernel: netlist_mod.Kernel) -> Evaluator:
+    # Mirrors components.storage.ram
+    lo = engine.netlist.first_slot[node]
+    net = engine.netlist.first_net[node]
+    data = engine.netlist.components[node].data
+    values = engine._values
+    old_values = engine._old_values
+    write = engine._write
+
+    def evaluate() -> None:
+        memory = data['memory']
+        address = values[lo+1]
+        if not isinstance(address, int) or address < 0 or address >= len(memory):
+            address = 0
+        write(net, memory[address])
+        if should_store(data, values[lo], old_values[lo]):
+            memory[address] = values[lo+2]
+    return evaluate
+
+
+def should_store(data: dict[str, t.Any], clk: t.Any, old_clk: t.Any) -> bool:
+    ''' Whether a Memory or RAM stores its input, given its clk values '''
+    if data['edge_triggered']:
+        clk = bool(clk)
+        return clk and clk != bool(old_clk)
+    return bool(clk)
+
+
+def _compile_clock(engine: CompiledEngine, node: int,
+                   kernel: netlist_mod.Kernel) -> Evaluator:
+    # Mirrors components.time.clock
+    net = engine.netlist.first_net[node]
+    data = engine.netlist.components[node].data
+    net_values = engine._net_values
+    write = engine._write
+    schedule = engine._schedule
+    domain = engine._clock_domains.get(node)
+    if domain is not None and len(domain.nodes) > 1:
+        nets = [engine.netlist.first_net[member] for member in domain.nodes]
+
+        def evaluate_domain() -> None:
+            value = not net_values[net]
+            for member_net in nets:
+                write(member_net, value)
+            schedule(node, data['on_delay' if value else 'off_delay'])
+        return evaluate_domain
+
+    def evaluate() -> None:
+        value = not net_values[net]
+        write(net, value)
+        schedule(node, data['on_delay' if value else 'off_delay'])
+    return evaluate
+
+
+def _compile_delay(engine: CompiledEngine, node: int,
+                   kernel: netlist_mod.Kernel) -> Evaluator:
+    # Mirrors components.time.DelayComponent
+    lo = engine.netlist.first_slot[node]
+    net = engine.netlist.first_net[node]
+    data = engine.netlist.components[node].data
+    values = engine._values
+    old_values = engine._old_values
+    write = engine._write
+    schedule = engine._schedule
+
+    def evaluate() -> None:
+        now = engine._time
+        new_value = values[lo]
+        updates = data['updates']
+        delay = data['delay']
+
+        if old_values[lo] != new_value:
+            output_time = now + delay - 1
+            while updates and updates[-1][1] >= output_time:
+                updates.pop()
+            updates.append((new_value, output_time))
+            if delay > 1:
+                schedule(node, delay-1)
+
+        if updates and updates[0][1] == now:
+            write(net, updates.popleft()[0])
+    return evaluate
+
+
+def _compile_pass_through(engine: CompiledEngine, node: int,
+                          kernel: netlist_mod.Kernel) -> Evaluator:
+    # Mirrors components.time.PassThroughComponent
+    lo = engine.netlist.first_slot[node]
+    net = engine.netlist.first_net[node]
+    values = engine._values
+    write = engine._write
+
+    def evaluate() -> None:
+        write(net, values[lo])
+    return evaluate
+
+
+def _compile_table(engine: CompiledEngine, table: lut.Table) -> Evaluator:
+    # Evaluates the gates in the tree, see lut.Table
+    net = engine.netlist.first_net[table.root]
+    values = engine._values
+    net_values = engine._net_values
+    write = engine._write
+    inputs = [(1 << index, slot) for index, slot in enumerate(table.inputs)]
+    rows = table.rows[net]
+    # The gates in the tree other than the root
+    inner_rows = [
+        (inner_net, net_rows) for inner_net, net_rows in table.rows.items()
+        if inner_net != net
+    ]
+
+    def evaluate() -> None:
+        row = 0
+        for bit, slot in inputs:
+            if values[slot]:
+                row |= bit
+        for inner_net, net_rows in inner_rows:
+            net_values[inner_net] = net_rows[row]
+        write(net, rows[row])
+    return evaluate
+
+
+_COMPILERS: dict[netlist_mod.Kind, _Compiler] = {
+    netlist_mod.Kind.NARY: _compile_nary,
+    netlist_mod.Kind.MUX: _compile_mux,
+    netlist_mod.Kind.MEMORY: _compile_memory,
+    netlist_mod.Kind.RAM: _compile_ram,
+    netlist_mod.Kind.CLOCK: _compile_clock,
+    netlist_mod.Kind.DELAY: _compile_delay,
+    netlist_mod.Kind.PASS_THROUGH: _compile_pass_through,
+}
@@ -0,0 +1,151 @@
+''' Find components that never need to be updated
+
+Passive components like Constant never change their outputs, and neither
+does a pure component (see PURE_KINDS) whose inputs are all constant, once
+it has settled on its result. Boolean gates can be constant when only some
+of their inputs are too, e.g. an And with a false input. Those components
+are folded: their outputs keep the value they have.
+
+A pure component is dead if its outputs only lead to other pure components
+that are dead or folded. Nothing can observe its outputs, so it doesn't
+need to be updated either.
+'''
+import collections.abc as abc
+import dataclasses
+import typing as t
+
+from . import bitslice
+from . import netlist as netlist_mod
+
+
+# Kinds whose components only set their outputs from their inputs
+PURE_KINDS = frozenset({
+    netlist_mod.Kind.NARY, netlist_mod.Kind.MUX, netlist_mod.Kind.PASS_THROUGH
+})
+# Gates with more inputs than this that aren't constant aren't folded
+MAX_UNKNOWN_INPUTS = 8
+
+
+@dataclasses.dataclass
+class Report:
+    ''' How many components were eliminated '''
+    num_components: int
+    folded: int
+    dead: int
+
+    @property
+    def eliminated(self) -> int:
+        return self.folded + self.dead
+
+    def __str__(self) -> str:
+        fraction = self.eliminated / self.num_components if self.num_components else 0
+        return (f'Eliminated {self.eliminated} of {self.num_components} components '
+                f'({fraction:.1%}): {self.folded} constant, {self.dead} dead')
+
+
+def analyze(netlist: netlist_mod.Netlist, net_values: abc.Sequence[t.Any],
+            slot_values: abc.Sequence[t.Any],
+            excluded: abc.Set[int] = frozenset()) -> tuple[set[int], set[int]]:
+    ''' Return the folded and the dead nodes
+
+    net_values and slot_values are the current values of nets and input
+    slots (which unconnected inputs keep). Nodes in excluded are neither.
+    '''
+    kernels = netlist.kernels
+    pure = {
+        node for node, kernel in enumerate(kernels)
+        if kernel is not None and kernel.kind in PURE_KINDS and node not in excluded
+    }
+    constant = {
+        net for node, kernel in enumerate(kernels)
+        if kernel is not None and kernel.kind is netlist_mod.Kind.PASSIVE
+        for net in netlist.nets(node)
+    }
+
+    folded: set[int] = set()
+    pending = [
+        netlist.slot_nodes[slot] for net in constant for slot in netlist.fanout[net]
+    ]
+    while pending:
+        node = pending.pop()
+        if node in folded or node not in pure:
+            continue
+        result = _constant_result(netlist, node, constant, net_values, slot_values)
+        net = netlist.first_net[node]
+        if result is _UNKNOWN or not _same(result, net_values[net]):
+            continue
+        folded.add(node)
+        constant.add(net)
+        pending.extend(netlist.slot_nodes[slot] for slot in netlist.fanout[net])
+
+    # Walk back from everything else, skipping the inputs of folded nodes
+    live: set[int] = set()
+    stack = [node for node in range(netlist.num_nodes) if node not in pure]
+    while stack:
+        node = stack.pop()
+        for slot in netlist.slots(node):
+            net = netlist.drivers[slot]
+            if net < 0:
+                continue
+            driver = netlist.net_nodes[net]
+            if driver in pure and driver not in live and driver not in folded:
+                live.add(driver)
+                stack.append(driver)
+    return folded, pure - live - folded
+
+
+_UNKNOWN = object()
+
+
+def _same(a: t.Any, b: t.Any) -> bool:
+    return bool(a == b) and type(a) is type(b)
+
+
+def _constant_result(netlist: netlist_mod.Netlist, node: int, constant: abc.Set[int],
+                     net_values: abc.Sequence[t.Any],
+                     slot_values: abc.Sequence[t.Any]) -> t.Any:
+    ''' The value a node always has given its constant inputs, or _UNKNOWN '''
+    kernel = netlist.kernels[node]
+    assert kernel is not None
+    operands = []
+    unknown: dict[int, int] = {}
+    for slot in netlist.slots(node):
+        net = netlist.drivers[slot]
+        if net < 0:
+            operands.append(slot_values[slot])
+        elif net in constant:
+            operands.append(net_values[net])
+        else:
+            operands.append(None)
+            unknown.setdefault(net, len(unknown))
+
+    if not unknown:
+        if kernel.kind is netlist_mod.Kind.PASS_THROUGH:
+            return operands[0]
+        if kernel.kind is netlist_mod.Kind.NARY:
+            # Mirrors utils.create_nary_component
+            assert kernel.function is not None
+            try:
+                return kernel.function(*operands)
+            except Exception:
+                return kernel.default_value
+        return _UNKNOWN
+
+    # Try every combination of the other inputs' truth values
+    if kernel.bit_function is None or len(unknown) > MAX_UNKNOWN_INPUTS:
+        return _UNKNOWN
+    num_instances = 1 << len(unknown)
+    mask = (1 << num_instances) - 1
+    bits = []
+    for slot, operand in zip(netlist.slots(node), operands):
+        net = netlist.drivers[slot]
+        if net in unknown:
+            bits.append(bitslice.counting_pattern(unknown[net], len(unknown)))
+        else:
+            bits.append(mask if operand else 0)
+    result = kernel.bit_function(mask, *bits) & mask
+    if result == 0:
+        return False
+    if result == mask:
+        return True
+    return _UNKNOWN
@@ -0,0 +1,148 @@
+''' Algorithms on graphs of integer nodes, given as successor lists '''
+import collections.abc as abc
+import heapq
+
+
+Successors = abc.Sequence[abc.Iterable[int]]
+
+
+def strongly_connected_components(successors: Successors) -> list[list[int]]:
+    ''' Find the strongly connected components with Tarjan's algorithm
+
+    The components are returned in reverse topological order: no component
+    has an edge to a component after it in the list. This is iterative so
+    long chains of components don't hit the recursion limit.
+    '''
+    num_nodes = len(successors)
+    index = [-1] * num_nodes
+    lowlink = [0] * num_nodes
+    on_stack = [False] * num_nodes
+    stack: list[int] = []
+    components: list[list[int]] = []
+    next_index = 0
+
+    for root in range(num_nodes):
+        if index[root] >= 0:
+            continue
+        work = [(root, iter(successors[root]))]
+        index[root] = lowlink[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = True
+
+        while work:
+            node, edges = work[-1]
+            for successor in edges:
+                if index[successor] < 0:
+                    index[successor] = lowlink[successor] = next_index
+                    next_index += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, iter(successors[successor])))
+                    break
+                if on_stack[successor]:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def is_cyclic(component: abc.Sequence[int], successors: Successors) -> bool:
+    ''' Whether a strongly connected component contains a cycle '''
+    if len(component) > 1:
+        return True
+    node = component[0]
+    return node in successors[node]
+
+
+def topological_order(successors: Successors) -> list[int]:
+    ''' Order the nodes so every edge goes forwards
+
+    Raises ValueError if the graph has a cycle.
+    '''
+    order = []
+    for component in reversed(strongly_connected_components(successors)):
+        if is_cyclic(component, successors):
+            raise ValueError(f'Graph has a cycle through node {component[0]}')
+        order.append(component[0])
+    return order
+
+
+def partition(neighbours: abc.Sequence[abc.Mapping[int, int]],
+              weights: abc.Sequence[int], num_parts: int,
+              max_imbalance: float = 0.1) -> list[int]:
+    ''' Split the nodes into num_parts parts of similar weight, cutting few edges
+
+    neighbours gives the weight of the edge to each neighbouring node, in
+    both directions. Parts are grown one at a time from an unassigned node,
+    adding the neighbour with the most edge weight into the part, then nodes
+    are moved between parts while that reduces the weight of the edges cut
+    without making any part more than max_imbalance heavier than average.
+    Returns the part of each node.
+    '''
+    num_nodes = len(weights)
+    total = sum(weights)
+    num_parts = max(1, min(num_parts, num_nodes))
+    parts = [-1] * num_nodes
+    part_weights = [0] * num_parts
+
+    next_seed = 0
+    for part in range(num_parts):
+        remaining = total - sum(part_weights)
+        target = remaining / (num_parts - part)
+        # Max heap of (-connection weight, node) for nodes next to the part
+        frontier: list[tuple[int, int]] = []
+        connection: dict[int, int] = {}
+        while part_weights[part] < target or part == num_parts - 1:
+            if frontier:
+                _, node = heapq.heappop(frontier)
+                if parts[node] >= 0:
+                    continue
+            else:
+                while next_seed < num_nodes and parts[next_seed] >= 0:
+                    next_seed += 1
+                if next_seed == num_nodes:
+                    break
+                node = next_seed
+            parts[node] = part
+            part_weights[part] += weights[node]
+            for neighbour, weight in neighbours[node].items():
+                if parts[neighbour] < 0:
+                    connection[neighbour] = connection.get(neighbour, 0) + weight
+                    heapq.heappush(frontier, (-connection[neighbour], neighbour))
+
+    max_weight = (1 + max_imbalance) * total / num_parts
+    improved = True
+    while improved:
+        improved = False
+        for node in range(num_nodes):
+            part = parts[node]
+            connections: dict[int, int] = {}
+            for neighbour, weight in neighbours[node].items():
+                neighbour_part = parts[neighbour]
+                connections[neighbour_part] = connections.get(neighbour_part, 0) + weight
+            internal = connections.get(part, 0)
+            best_part, best_gain = part, 0
+            for other, weight in connections.items():
+                gain = weight - internal
+                if (other != part and gain > best_gain
+                        and part_weights[other] + weights[node] <= max_weight):
+                    best_part, best_gain = other, gain
+            if best_part != part:
+                parts[node] = best_part
+                part_weights[part] -= weights[node]
+                part_weights[best_part] += weights[node]
+                improved = True
+    return parts
@@ -0,0 +1,57 @@
+''' Find components that duplicate another component
+
+Two pure components (see MERGEABLE_KINDS) made by the same creator, with
+inputs connected to the same outputs, compute the same values as long as
+they start in the same state. They're found by structural hashing: each
+component is keyed by its creator, kernel and the nets its inputs read,
+where the nets of a duplicate count as those of the component it
+duplicates. That way duplicated networks of components are found too, not
+just duplicated components.
+'''
+import collections.abc as abc
+import typing as t
+
+from . import netlist as netlist_mod
+
+
+MERGEABLE_KINDS = frozenset({netlist_mod.Kind.NARY, netlist_mod.Kind.MUX})
+
+
+def find_duplicates(netlist: netlist_mod.Netlist, candidates: abc.Sequence[int],
+                    same_state: abc.Callable[[int, int], bool]) -> dict[int, int]:
+    ''' Map each duplicate node to the node it duplicates
+
+    Only candidates, which must have a kind in MERGEABLE_KINDS, are
+    considered, and the first of them in a set of duplicates is the one
+    kept. same_state(node, other) says whether two nodes have the same
+    input, output and scheduling state. A node that's duplicated is never a
+    duplicate itself.
+    '''
+    # Each net, or the net of the node it duplicates
+    canonical = list(range(netlist.num_nets))
+    duplicates: dict[int, int] = {}
+    changed = True
+    while changed:
+        changed = False
+        # Nodes with each key that aren't duplicates
+        originals: dict[t.Hashable, list[int]] = {}
+        for node in candidates:
+            if node in duplicates:
+                continue
+            key = (
+                netlist.components[node].creator,
+                netlist.kernels[node],
+                tuple(canonical[netlist.drivers[slot]] if netlist.drivers[slot] >= 0
+                      else -1 for slot in netlist.slots(node)),
+            )
+            nodes = originals.setdefault(key, [])
+            original = next((other for other in nodes if same_state(other, node)), None)
+            if original is None:
+                nodes.append(node)
+                continue
+            duplicates[node] = original
+            for offset in range(len(netlist.nets(node))):
+                canonical[netlist.first_net[node] + offset] = \
+                    netlist.first_net[original] + offset
+            changed = True
+    return duplicates
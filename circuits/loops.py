@@ -0,0 +1,173 @@
+''' Find loops of components that may never settle
+
+Connections into stateful components like Memory and Delay break a loop
+into steps, but a loop made only of pure components (see fold.PURE_KINDS)
+has nothing to hold its values: it only settles if they reach a fixed
+point. A loop of only pass throughs takes no time at all, and is only cut
+short by the pass throughs refusing to update again while they update.
+
+find_loops() finds those loops before simulating, as the strongly connected
+components of the graph of connections between pure components. A loop of
+boolean gates and pass throughs with few enough components is checked for a
+fixed point by evaluating every state of it at once (see bitslice): with
+none, it oscillates for as long as its other inputs stay the same.
+
+OscillationDetector finds components that do keep updating every tick while
+nothing outside the circuit is changing it.
+'''
+import collections.abc as abc
+import dataclasses
+import enum
+import typing as t
+
+from . import bitslice
+from . import fold
+from . import graph
+from . import netlist as netlist_mod
+
+if t.TYPE_CHECKING:
+    from . import component as component_mod
+
+
+# Loops with more components than this aren't checked for a fixed point
+MAX_STATE_COMPONENTS = 12
+# How many ticks in a row a component updates for before it's oscillating
+MIN_OSCILLATION_TICKS = 64
+
+
+class Kind(enum.Enum):
+    # Only pass throughs, which take no time to update
+    INSTANT = 'instant'
+    # Settles or not depending on its values
+    COMBINATIONAL = 'combinational'
+    # Has no fixed point with its current inputs from outside the loop
+    OSCILLATOR = 'oscillator'
+
+
+@dataclasses.dataclass
+class Loop:
+    kind: Kind
+    components: list['component_mod.Component']
+
+    def __str__(self) -> str:
+        ids = ', '.join(str(component.id) for component in self.components)
+        return f'{self.kind.value.capitalize()} loop through components {ids}'
+
+
+def find_loops(components: abc.Iterable['component_mod.Component']) -> list[Loop]:
+    ''' Find the loops of pure components, using their current values '''
+    netlist = netlist_mod.Netlist.build(components)
+    net_values = [None] * netlist.num_nets
+    slot_values = [None] * netlist.num_slots
+    for node, component in enumerate(netlist.components):
+        for output in component.outputs:
+            net_values[netlist.first_net[node] + output.index] = output.value
+        for input in component.inputs:
+            slot_values[netlist.first_slot[node] + input.index] = input.state[1]
+    return [
+        Loop(kind, [netlist.components[node] for node in nodes])
+        for kind, nodes in analyze(netlist, net_values, slot_values)
+    ]
+
+
+def analyze(netlist: netlist_mod.Netlist, net_values: abc.Sequence[t.Any],
+            slot_values: abc.Sequence[t.Any]) -> list[tuple[Kind, list[int]]]:
+    ''' Find the kind and nodes of each loop of pure nodes
+
+    net_values and slot_values are the current values of nets and input
+    slots (which unconnected inputs keep). Nodes are in ascending order.
+    '''
+    # Mirrors engine.CompiledEngine._levelize
+    pure = [
+        kernel is not None and kernel.kind in fold.PURE_KINDS
+        for kernel in netlist.kernels
+    ]
+    successors = [
+        [successor for successor in node_successors if pure[successor]]
+        if pure[node] else []
+        for node, node_successors in enumerate(netlist.successors())
+    ]
+    loops = []
+    for component in reversed(graph.strongly_connected_components(successors)):
+        if not pure[component[0]] or not graph.is_cyclic(component, successors):
+            continue
+        nodes = sorted(component)
+        loops.append((_classify(netlist, nodes, net_values, slot_values), nodes))
+    return loops
+
+
+def _classify(netlist: netlist_mod.Netlist, nodes: list[int],
+              net_values: abc.Sequence[t.Any], slot_values: abc.Sequence[t.Any]) -> Kind:
+    kernels = [netlist.kernels[node] for node in nodes]
+    if all(kernel is not None and kernel.kind is netlist_mod.Kind.PASS_THROUGH
+           for kernel in kernels):
+        return Kind.INSTANT
+    if len(nodes) > MAX_STATE_COMPONENTS or not all(
+            kernel is not None and (kernel.bit_function is not None
+                                    or kernel.kind is netlist_mod.Kind.PASS_THROUGH)
+            for kernel in kernels):
+        return Kind.COMBINATIONAL
+
+    # Every state of the loop's nets, with net i set in state j if bit i of
+    # j is, evaluated once to find the states that stay the same
+    num_states = 1 << len(nodes)
+    mask = (1 << num_states) - 1
+    packed = {
+        netlist.first_net[node]: bitslice.counting_pattern(index, len(nodes))
+        for index, node in enumerate(nodes)
+    }
+    fixed = mask
+    for node, kernel in zip(nodes, kernels):
+        assert kernel is not None
+        operands = []
+        for slot in netlist.slots(node):
+            net = netlist.drivers[slot]
+            if net in packed:
+                operands.append(packed[net])
+            else:
+                value = net_values[net] if net >= 0 else slot_values[slot]
+                operands.append(mask if value else 0)
+        if kernel.bit_function is None:
+            result = operands[0]
+        else:
+            result = kernel.bit_function(mask, *operands) & mask
+        fixed &= ~(result ^ packed[netlist.first_net[node]])
+    return Kind.COMBINATIONAL if fixed & mask else Kind.OSCILLATOR
+
+
+class OscillationDetector:
+    ''' Finds components updated in every tick without anything from outside
+
+    Pass the components updated in each tick to observe(), and call
+    stimulate() whenever something outside the circuit changes it, e.g. a
+    click. Clocks are meant to keep updating, so are never oscillating.
+    '''
+    def __init__(self, min_ticks: int = MIN_OSCILLATION_TICKS) -> None:
+        self._min_ticks = min_ticks
+        self._time: t.Optional[int] = None
+        # The last tick each component updated in, and how many ticks in a
+        # row it had updated in then
+        self._streaks: dict['component_mod.Component', tuple[int, int]] = {}
+
+    @property
+    def oscillating(self) -> list['component_mod.Component']:
+        ''' Components updated in at least the last min_ticks ticks, by id '''
+        return sorted((
+            component for component, (time, count) in self._streaks.items()
+            if time == self._time and count >= self._min_ticks
+        ), key=lambda component: component.id)
+
+    def observe(self, time: int,
+                components: abc.Iterable['component_mod.Component']) -> None:
+        streaks = self._streaks
+        for component in components:
+            kernel = netlist_mod.get_kernel(component)
+            if kernel is not None and kernel.kind is netlist_mod.Kind.CLOCK:
+                continue
+            last_time, count = streaks.get(component, (None, 0))
+            streaks[component] = (time, count + 1 if last_time == time - 1 else 1)
+        self._time = time
+
+    def stimulate(self) -> None:
+        ''' Forget what was updated before now '''
+        self._streaks.clear()
@@ -0,0 +1,116 @@
+''' Collapse small trees of boolean gates into lookup tables
+
+In a tree of gates, where every gate but the root only drives one input of
+another gate in the tree, the value of every gate is a boolean function of
+the nets the tree reads from outside. With few enough of those inputs the
+values can be tabulated for each combination of them (by bit slicing, see
+bitslice), and the whole tree evaluated with one table lookup.
+
+Gates take a tick to update, so this only gives the same values when they
+have no delay. engine.CompiledEngine uses it in zero delay mode.
+'''
+import collections.abc as abc
+import dataclasses
+import typing as t
+
+from . import bitslice
+from . import netlist as netlist_mod
+
+
+# Tables have 2**MAX_INPUTS rows
+MAX_INPUTS = 8
+
+
+@dataclasses.dataclass
+class Table:
+    ''' The values of a tree of gates for every combination of its inputs '''
+    root: int
+    # The nodes in the tree, in topological order
+    nodes: list[int]
+    # For each input, a slot reading it. Row i has input j set if bit j of i is.
+    inputs: list[int]
+    # The value of each net in the tree, by row
+    rows: dict[int, list[bool]]
+
+
+def collapse(netlist: netlist_mod.Netlist, gates: abc.Set[int], ranks: abc.Sequence[int],
+             slot_values: abc.Sequence[t.Any],
+             max_inputs: int = MAX_INPUTS) -> list[Table]:
+    ''' Tabulate trees of gates with at most max_inputs inputs
+
+    gates are the nodes that can be collapsed, which must have a
+    bit_function, and ranks orders them topologically. Unconnected inputs
+    keep the truth value they have in slot_values. Trees of one gate aren't
+    worth collapsing, so aren't included.
+    '''
+    # The gate each gate drives, if it drives nothing else
+    parents: dict[int, int] = {}
+    for node in gates:
+        net = netlist.first_net[node]
+        slots = netlist.fanout[net]
+        if len(slots) == 1 and netlist.slot_nodes[slots[0]] in gates:
+            parents[node] = netlist.slot_nodes[slots[0]]
+    children: dict[int, list[int]] = {}
+    for child, parent in parents.items():
+        children.setdefault(parent, []).append(child)
+
+    tables = []
+    assigned: set[int] = set()
+    # Roots come before the gates driving them, which become roots of their
+    # own trees if they don't fit in their parent's
+    for root in sorted(gates, key=lambda node: ranks[node], reverse=True):
+        if root in assigned:
+            continue
+        assigned.add(root)
+        tree = [root]
+        inputs = _input_nets(netlist, root)
+        candidates = list(children.get(root, ()))
+        while candidates:
+            child = candidates.pop()
+            child_inputs = inputs - {netlist.first_net[child]}
+            child_inputs |= _input_nets(netlist, child)
+            if len(child_inputs) > max_inputs:
+                continue
+            inputs = child_inputs
+            tree.append(child)
+            assigned.add(child)
+            candidates.extend(children.get(child, ()))
+        if len(tree) > 1:
+            tree.sort(key=lambda node: ranks[node])
+            tables.append(_tabulate(netlist, root, tree, slot_values))
+    return tables
+
+
+def _input_nets(netlist: netlist_mod.Netlist, node: int) -> set[int]:
+    return {netlist.drivers[slot] for slot in netlist.slots(node)} - {-1}
+
+
+def _tabulate(netlist: netlist_mod.Netlist, root: int, tree: list[int],
+              slot_values: abc.Sequence[t.Any]) -> Table:
+    nets = {netlist.first_net[node] for node in tree}
+    input_slots: dict[int, int] = {}
+    for node in tree:
+        for slot in netlist.slots(node):
+            net = netlist.drivers[slot]
+            if net >= 0 and net not in nets:
+                input_slots.setdefault(net, slot)
+
+    num_rows = 1 << len(input_slots)
+    mask = (1 << num_rows) - 1
+    packed = {
+        net: bitslice.counting_pattern(index, len(input_slots))
+        for index, net in enumerate(input_slots)
+    }
+    for node in tree:
+        kernel = netlist.kernels[node]
+        assert kernel is not None and kernel.bit_function is not None
+        operands = [
+            packed[netlist.drivers[slot]] if netlist.drivers[slot] >= 0
+            else mask if slot_values[slot] else 0
+            for slot in netlist.slots(node)
+        ]
+        packed[netlist.first_net[node]] = kernel.bit_function(mask, *operands) & mask
+
+    return Table(root, tree, list(input_slots.values()), {
+        net: bitslice.unpack(packed[net], num_rows) for net in nets
+    })
@@ -0,0 +1,240 @@
+''' Memory for RAM that holds fixed width words
+
+A RAM's memory is normally a list, which can hold any value but takes a
+Python object per word. WordMemory holds unsigned integers of up to
+MAX_WORD_WIDTH bits in an array, so it takes a few bytes per word and can
+be large enough for a realistic memory. SparseMemory holds the same words
+in pages that are only allocated once a word in them is stored, so an
+address space can be as large as MAX_SPARSE_WORDS. Both can be indexed and
+assigned like the list, so the engines don't need to know which one a RAM
+has.
+
+NumPy isn't used even when it's installed: indexing its arrays gives NumPy
+integers rather than ints, which other components don't treat as numbers.
+'''
+import array
+import base64
+import collections.abc as abc
+import dataclasses
+import sys
+import typing as t
+import zlib
+
+
+MAX_WORD_WIDTH = 64
+MAX_SPARSE_WORDS = 1 << 32
+# Words in each page of a SparseMemory
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+
+# Array type codes by item size, smallest first
+_TYPECODES = ('B', 'H', 'I', 'L', 'Q')
+
+
+def _typecode(word_width: int) -> str:
+    for typecode in _TYPECODES:
+        if array.array(typecode).itemsize * 8 >= word_width:
+            return typecode
+    raise ValueError(f'No array type holds {word_width} bit words')
+
+
+def _to_word(value: t.Any, mask: int) -> int:
+    return value & mask if isinstance(value, int) else 0
+
+
+def _encode(words: array.array) -> str:
+    ''' Compressed little endian bytes of words, which JSON can hold '''
+    if sys.byteorder == 'big':
+        words = array.array(words.typecode, words)
+        words.byteswap()
+    return base64.b64encode(zlib.compress(words.tobytes())).decode('ascii')
+
+
+def _decode(typecode: str, data: str) -> array.array:
+    words = array.array(typecode)
+    words.frombytes(zlib.decompress(base64.b64decode(data)))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+
+class WordMemory:
+    ''' Unsigned words of word_width bits, which start as fill
+
+    Storing a value keeps only its low word_width bits, so negative numbers
+    are stored in two's complement, and stores anything that isn't a number
+    (or is a float) as 0.
+    '''
+    def __init__(self, size: int, word_width: int, fill: int = 0) -> None:
+        if not 1 <= word_width <= MAX_WORD_WIDTH:
+            raise ValueError(
+                f'Word width must be from 1 to {MAX_WORD_WIDTH}, got {word_width}')
+        if size < 1:
+            raise ValueError(f'Size must be at least 1, got {size}')
+        self._word_width = word_width
+        self._mask = (1 << word_width) - 1
+        self._words = array.array(_typecode(word_width), [_to_word(fill, self._mask)])
+        self._words *= size
+
+    @property
+    def word_width(self) -> int:
+        return self._word_width
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __iter__(self) -> abc.Iterator[int]:
+        return iter(self._words)
+
+    def __getitem__(self, address: int) -> int:
+        return self._words[address]
+
+    def __setitem__(self, address: int, value: t.Any) -> None:
+        self._words[address] = _to_word(value, self._mask)
+
+    def items(self) -> abc.Iterator[tuple[int, int]]:
+        ''' Each address and its word, in order '''
+        return enumerate(self._words)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, WordMemory):
+            return NotImplemented
+        return self._word_width == other._word_width and self._words == other._words
+
+    def __repr__(self) -> str:
+        return f'WordMemory(size={len(self)}, word_width={self._word_width})'
+
+    def get_save_data(self) -> dict[str, t.Any]:
+        return {
+            'size': len(self._words),
+            'word_width': self._word_width,
+            'words': _encode(self._words),
+        }
+
+    @classmethod
+    def load(cls, data: dict[str, t.Any]) -> 'WordMemory':
+        memory = cls(1, data['word_width'])
+        words = _decode(memory._words.typecode, data['words'])
+        if len(words) != data['size']:
+            raise ValueError(f"Expected {data['size']} words, got {len(words)}")
+        memory._words = words
+        return memory
+
+
+@dataclasses.dataclass
+class PageStats:
+    page_size: int
+    num_pages: int
+    allocated_pages: int
+    allocated_bytes: int
+
+    def __str__(self) -> str:
+        return (f'{self.allocated_pages} of {self.num_pages} pages of '
+                f'{self.page_size} words allocated ({self.allocated_bytes} bytes)')
+
+
+class SparseMemory:
+    ''' Unsigned words of word_width bits, stored in pages of PAGE_SIZE words
+
+    Words that have never been stored to are fill. Stores are the same as
+    WordMemory's.
+    '''
+    def __init__(self, size: int, word_width: int, fill: int = 0) -> None:
+        if not 1 <= word_width <= MAX_WORD_WIDTH:
+            raise ValueError(
+                f'Word width must be from 1 to {MAX_WORD_WIDTH}, got {word_width}')
+        if not 1 <= size <= MAX_SPARSE_WORDS:
+            raise ValueError(f'Size must be from 1 to {MAX_SPARSE_WORDS}, got {size}')
+        self._size = size
+        self._word_width = word_width
+        self._mask = (1 << word_width) - 1
+        self._fill = _to_word(fill, self._mask)
+        self._typecode = _typecode(word_width)
+        self._pages: dict[int, array.array] = {}
+
+    @property
+    def word_width(self) -> int:
+        return self._word_width
+
+    @property
+    def fill(self) -> int:
+        return self._fill
+
+    @property
+    def page_stats(self) -> PageStats:
+        itemsize = array.array(self._typecode).itemsize
+        return PageStats(
+            page_size=PAGE_SIZE,
+            num_pages=(self._size + PAGE_SIZE - 1) // PAGE_SIZE,
+            allocated_pages=len(self._pages),
+            allocated_bytes=len(self._pages) * PAGE_SIZE * itemsize)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, address: int) -> int:
+        # The last page can hold words past the end
+        if not 0 <= address < self._size:
+            raise IndexError('memory index out of range')
+        page = self._pages.get(address >> PAGE_BITS)
+        if page is None:
+            return self._fill
+        return page[address & (PAGE_SIZE - 1)]
+
+    def __setitem__(self, address: int, value: t.Any) -> None:
+        if not 0 <= address < self._size:
+            raise IndexError('memory index out of range')
+        page = self._pages.get(address >> PAGE_BITS)
+        if page is None:
+            page = array.array(self._typecode, [self._fill]) * PAGE_SIZE
+            self._pages[address >> PAGE_BITS] = page
+        page[address & (PAGE_SIZE - 1)] = _to_word(value, self._mask)
+
+    def items(self) -> abc.Iterator[tuple[int, int]]:
+        ''' Each address in an allocated page and its word, in order '''
+        for index in sorted(self._pages):
+            first = index << PAGE_BITS
+            for offset, word in enumerate(self._pages[index][:self._size - first]):
+                yield first + offset, word
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, SparseMemory):
+            return NotImplemented
+        if (self._size, self._word_width, self._fill) != \
+                (other._size, other._word_width, other._fill):
+            return False
+        fill_page = array.array(self._typecode, [self._fill]) * PAGE_SIZE
+        return all(
+            self._pages.get(index, fill_page) == other._pages.get(index, fill_page)
+            for index in self._pages.keys() | other._pages.keys())
+
+    def __repr__(self) -> str:
+        return (f'SparseMemory(size={self._size}, word_width={self._word_width}, '
+                f'fill={self._fill})')
+
+    def get_save_data(self) -> dict[str, t.Any]:
+        return {
+            'size': self._size,
+            'word_width': self._word_width,
+            'fill': self._fill,
+            'pages': [
+                [index, _encode(page)] for index, page in sorted(self._pages.items())
+            ],
+        }
+
+    @classmethod
+    def load(cls, data: dict[str, t.Any]) -> 'SparseMemory':
+        memory = cls(data['size'], data['word_width'], data['fill'])
+        for index, words in data['pages']:
+            page = _decode(memory._typecode, words)
+            if len(page) != PAGE_SIZE:
+                raise ValueError(f'Expected {PAGE_SIZE} words, got {len(page)}')
+            memory._pages[index] = page
+        return memory
+
+
+def load(data: dict[str, t.Any]) -> t.Union[WordMemory, SparseMemory]:
+    ''' Load a WordMemory or SparseMemory from its get_save_data() '''
+    if 'pages' in data:
+        return SparseMemory.load(data)
+    return WordMemory.load(data)
@@ -0,0 +1,155 @@
+import collections.abc as abc
+import dataclasses
+import enum
+import typing as t
+
+if t.TYPE_CHECKING:
+    from . import component as component_mod
+
+
+class Kind(enum.Enum):
+    # Pure function of the inputs, see utils.create_nary_component
+    NARY = enum.auto()
+    MUX = enum.auto()
+    MEMORY = enum.auto()
+    RAM = enum.auto()
+    CLOCK = enum.auto()
+    DELAY = enum.auto()
+    PASS_THROUGH = enum.auto()
+    # Does nothing when updated
+    PASSIVE = enum.auto()
+
+
+@dataclasses.dataclass(frozen=True)
+class Kernel:
+    ''' Describes a component's update logic so it can be compiled
+
+    Components without a kernel can still be compiled, but are simulated by
+    calling their on_update function.
+
+    Boolean NARY kernels can also have a bit_function, which evaluates the
+    function on bit-sliced operands: ints whose bit i is the truth value of
+    the input in instance i. It is passed a mask with a bit set for every
+    instance, then the operands. See bitslice and batch.BatchSimulator.
+
+    NARY kernels can also have an array_function, which evaluates the
+    function elementwise on arrays of 64 bit ints, one per operand. It must
+    give the same results as the function for int and bool operands, unless
+    array_bool_operands is False, in which case it's only used for ints.
+    See vectorize.evaluate_group.
+
+    NARY kernels can also have a source_function, which is passed Python
+    expressions for the operands and returns an expression with the same
+    value as the function, raising an exception where it would. See
+    codegen.GeneratedEngine.
+    '''
+    kind: Kind
+    function: t.Optional[abc.Callable[..., t.Any]] = None
+    default_value: t.Any = None
+    bit_function: t.Optional[abc.Callable[..., int]] = None
+    array_function: t.Optional[abc.Callable[..., t.Any]] = None
+    array_bool_operands: bool = True
+    source_function: t.Optional[abc.Callable[..., str]] = None
+
+
+def get_kernel(component: 'component_mod.Component') -> t.Optional[Kernel]:
+    creator = component.creator
+    if creator is None:
+        return None
+    return creator.kernel
+
+
+@dataclasses.dataclass
+class Netlist:
+    ''' Integer-indexed view of a set of components and the wires between them
+
+    Each component is a node. A node's inputs are the input slots
+    first_slot[node] to first_slot[node+1] and its outputs are the nets
+    first_net[node] to first_net[node+1]. Each slot is driven by at most one
+    net (driver -1 if unconnected) and each net fans out to any number of
+    slots. Wires to components outside the netlist are ignored.
+    '''
+    components: list['component_mod.Component']
+    kernels: list[t.Optional[Kernel]]
+    first_slot: list[int]
+    first_net: list[int]
+    drivers: list[int]
+    fanout: list[list[int]]
+    slot_nodes: list[int]
+    net_nodes: list[int]
+    sensitivities: list['component_mod.Sensitivity']
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.components)
+
+    @property
+    def num_slots(self) -> int:
+        return len(self.drivers)
+
+    @property
+    def num_nets(self) -> int:
+        return len(self.fanout)
+
+    def slots(self, node: int) -> range:
+        return range(self.first_slot[node], self.first_slot[node+1])
+
+    def nets(self, node: int) -> range:
+        return range(self.first_net[node], self.first_net[node+1])
+
+    def successors(self) -> list[set[int]]:
+        ''' For each node, the nodes its outputs are connected to '''
+        successors: list[set[int]] = [set() for _ in self.components]
+        for net, slots in enumerate(self.fanout):
+            node = self.net_nodes[net]
+            successors[node].update(self.slot_nodes[slot] for slot in slots)
+        return successors
+
+    def index(self) -> dict['component_mod.Component', int]:
+        return {component: node for node, component in enumerate(self.components)}
+
+    @staticmethod
+    def build(components: abc.Iterable['component_mod.Component']) -> 'Netlist':
+        ordered = sorted(components, key=lambda c: c.id)
+
+        first_slot = [0]
+        first_net = [0]
+        slot_nodes: list[int] = []
+        net_nodes: list[int] = []
+        for node, component in enumerate(ordered):
+            slot_nodes.extend([node] * component.num_inputs)
+            net_nodes.extend([node] * component.num_outputs)
+            first_slot.append(len(slot_nodes))
+            first_net.append(len(net_nodes))
+
+        nets = {
+            output: first_net[node] + output.index
+            for node, component in enumerate(ordered)
+            for output in component.outputs
+        }
+
+        sensitivities = [
+            input.sensitivity for component in ordered for input in component.inputs
+        ]
+
+        drivers = [-1] * len(slot_nodes)
+        fanout: list[list[int]] = [[] for _ in net_nodes]
+        for node, component in enumerate(ordered):
+            for input in component.inputs:
+                output = input.connected_output
+                net = -1 if output is None else nets.get(output, -1)
+                if net >= 0:
+                    slot = first_slot[node] + input.index
+                    drivers[slot] = net
+                    fanout[net].append(slot)
+
+        return Netlist(
+            components=ordered,
+            kernels=[get_kernel(component) for component in ordered],
+            first_slot=first_slot,
+            first_net=first_net,
+            drivers=drivers,
+            fanout=fanout,
+            slot_nodes=slot_nodes,
+            net_nodes=net_nodes,
+            sensitivities=sensitivities)
@@ -0,0 +1,29 @@
+''' Options for how a circuit is simulated '''
+import dataclasses
+
+
+@dataclasses.dataclass(frozen=True)
+class EngineOptions:
+    ''' Which engine runs a circuit's updates, and how
+
+    Without compiled, each component's on_update is called. With it, an
+    engine.CompiledEngine runs the updates, or a codegen.GeneratedEngine
+    with generate. The other options only apply to those engines (see
+    engine.CompiledEngine), so setting any of them sets compiled too, and
+    collapse sets zero_delay.
+    '''
+    compiled: bool = False
+    zero_delay: bool = False
+    vectorize: bool = False
+    generate: bool = False
+    collapse: bool = False
+    fold: bool = False
+    merge: bool = False
+
+    def __post_init__(self) -> None:
+        # Frozen, so fields can only be set this way
+        if self.collapse:
+            object.__setattr__(self, 'zero_delay', True)
+        if (self.zero_delay or self.vectorize or self.generate or self.fold
+                or self.merge):
+            object.__setattr__(self, 'compiled', True)
@@ -0,0 +1,120 @@
+''' Timing helpers for running a circuit in real time '''
+import dataclasses
+import time
+import typing as t
+
+
+class RateCounter:
+    ''' Measures how many ticks are simulated per second of wall-clock time
+
+    Call update() with the circuit time as it runs. The rate is recalculated
+    at most every `interval` seconds so it stays readable while displayed.
+    '''
+    def __init__(self, interval: float = 0.5) -> None:
+        self._interval = interval
+        self._start: t.Optional[float] = None
+        self._start_ticks = 0
+        self._rate: t.Optional[float] = None
+
+    @property
+    def rate(self) -> t.Optional[float]:
+        ''' Ticks per second, or None if not measured yet '''
+        return self._rate
+
+    def update(self, ticks: int) -> None:
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+            self._start_ticks = ticks
+            return
+        elapsed = now - self._start
+        if elapsed >= self._interval:
+            self._rate = (ticks - self._start_ticks) / elapsed
+            self._start = now
+            self._start_ticks = ticks
+
+    def reset(self) -> None:
+        ''' Start measuring again, e.g. after pausing '''
+        self._start = None
+        self._rate = None
+
+
+@dataclasses.dataclass
+class PacingStats:
+    ticks: int = 0
+    # Ticks that finished after the next tick was due
+    overruns: int = 0
+    # Ticks that finished early and waited for the next tick
+    underruns: int = 0
+    # Times the schedule restarted after falling too far behind
+    resets: int = 0
+    dropped_repaints: int = 0
+    max_lateness: float = 0.0
+
+
+class Pacer:
+    ''' Runs ticks at a fixed period using absolute deadlines
+
+    Each tick is due one period after the previous tick was due, rather than
+    one period after it finished, so the time spent updating and repainting
+    doesn't accumulate as drift. Late ticks run immediately to catch up, but
+    if they fall more than max_lag seconds behind the schedule restarts from
+    the current time.
+
+    If drop_repaints is set, repaints are skipped while behind schedule
+    (except for one every repaint_interval seconds) so the time goes to
+    ticks instead.
+    '''
+    def __init__(self, period: float, max_lag: float = 1.0,
+                 repaint_interval: float = 1/30) -> None:
+        self.period = period
+        self.max_lag = max_lag
+        self.repaint_interval = repaint_interval
+        self.drop_repaints = False
+        self._deadline = time.monotonic()
+        self._behind = False
+        self._last_repaint = 0.0
+        self._stats = PacingStats()
+
+    @property
+    def stats(self) -> PacingStats:
+        return self._stats
+
+    @property
+    def behind(self) -> bool:
+        ''' Whether the last tick finished after the next one was due '''
+        return self._behind
+
+    def start(self) -> None:
+        ''' Restart the schedule and statistics from the current time '''
+        self._deadline = time.monotonic()
+        self._behind = False
+        self._stats = PacingStats()
+
+    def finish_tick(self) -> float:
+        ''' Record that a tick finished and return how long to wait for the next '''
+        now = time.monotonic()
+        stats = self._stats
+        stats.ticks += 1
+        self._deadline += self.period
+        remaining = self._deadline - now
+        self._behind = remaining < 0
+        if not self._behind:
+            stats.underruns += 1
+            return remaining
+
+        stats.overruns += 1
+        stats.max_lateness = max(stats.max_lateness, -remaining)
+        if -remaining > self.max_lag:
+            stats.resets += 1
+            self._deadline = now
+        return 0.0
+
+    def should_repaint(self) -> bool:
+        now = time.monotonic()
+        if (self.drop_repaints and self._behind
+                and now - self._last_repaint < self.repaint_interval):
+            self._stats.dropped_repaints += 1
+            return False
+        self._last_repaint = now
+        return True
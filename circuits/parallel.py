@@ -0,0 +1,325 @@
+''' Simulate one circuit in several processes
+
+The netlist is split into partitions (see graph.partition) and each one is
+simulated by a CompiledEngine in its own worker process. Every connection
+takes a tick, so a partition can run tick t once it has the values the other
+partitions set in tick t-1: this is a conservative parallel discrete event
+simulation with a lookahead of one tick. After each tick, the workers write
+the boundary nets that changed to shared memory, wait for each other, and
+set the other partitions' changes in their own engine before the next tick.
+
+Pass through components update instantly, so each one is kept in the same
+partition as the component driving it. Zero delay mode isn't supported since
+combinational components would need to settle across partitions.
+'''
+import collections.abc as abc
+import dataclasses
+import multiprocessing
+import pickle
+import queue
+import struct
+import typing as t
+
+from . import circuit as circuit_mod
+from . import engine as engine_mod
+from . import graph
+from . import netlist as netlist_mod
+from . import options as options_mod
+from . import scheduler
+
+if t.TYPE_CHECKING:
+    from . import component as component_mod
+
+
+# Bytes of shared memory for each partition's changes in a tick, plus this
+# much for each boundary net it drives
+BUFFER_SIZE = 1 << 16
+BUFFER_SIZE_PER_NET = 1024
+# How often to check whether a worker died without reporting a result
+POLL_INTERVAL = 1.0
+
+_LENGTH = struct.Struct('<q')
+
+
+@dataclasses.dataclass
+class PartitionedRun:
+    ''' The result of run_partitioned() '''
+    ticks: int
+    quiescent: bool
+    suppressed_propagations: int
+    num_partitions: int
+    # Nets read by a partition other than the one that drives them
+    boundary_nets: int
+
+
+def assign_partitions(netlist: netlist_mod.Netlist, num_partitions: int) -> list[int]:
+    ''' Choose the partition of each node, cutting as few connections as possible '''
+    # Pass through nodes are grouped with whatever drives them
+    groups = list(range(netlist.num_nodes))
+
+    def find(node: int) -> int:
+        while groups[node] != node:
+            groups[node] = groups[groups[node]]
+            node = groups[node]
+        return node
+
+    for node, kernel in enumerate(netlist.kernels):
+        if kernel is not None and kernel.kind is netlist_mod.Kind.PASS_THROUGH:
+            for slot in netlist.slots(node):
+                net = netlist.drivers[slot]
+                if net >= 0:
+                    groups[find(node)] = find(netlist.net_nodes[net])
+
+    group_index: dict[int, int] = {}
+    for node in range(netlist.num_nodes):
+        group_index.setdefault(find(node), len(group_index))
+    weights = [0] * len(group_index)
+    neighbours: list[dict[int, int]] = [{} for _ in group_index]
+    for node in range(netlist.num_nodes):
+        weights[group_index[find(node)]] += 1
+    for net, slots in enumerate(netlist.fanout):
+        source = group_index[find(netlist.net_nodes[net])]
+        for slot in slots:
+            target = group_index[find(netlist.slot_nodes[slot])]
+            if target != source:
+                neighbours[source][target] = neighbours[source].get(target, 0) + 1
+                neighbours[target][source] = neighbours[target].get(source, 0) + 1
+
+    group_parts = graph.partition(neighbours, weights, num_partitions)
+    return [group_parts[group_index[find(node)]] for node in range(netlist.num_nodes)]
+
+
+def boundary_nets(netlist: netlist_mod.Netlist, parts: abc.Sequence[int]) -> list[int]:
+    ''' The nets read by a partition other than the one that drives them '''
+    return [
+        net for net, slots in enumerate(netlist.fanout)
+        if any(parts[netlist.slot_nodes[slot]] != parts[netlist.net_nodes[net]]
+               for slot in slots)
+    ]
+
+
+def run_partitioned(circuit: circuit_mod.Circuit, num_partitions: int,
+                    max_ticks: t.Optional[int] = None,
+                    vectorize: bool = False) -> PartitionedRun:
+    ''' Update the circuit in parallel until nothing is scheduled or max_ticks have run
+
+    The final state is loaded back into the circuit, so its components are
+    replaced by new ones with the same ids, and its time is reset to zero as
+    when it is saved and loaded. Raises RuntimeError if a worker fails.
+    '''
+    if circuit.engine_options.zero_delay:
+        raise ValueError('Zero delay mode cannot be partitioned')
+    data = circuit.get_save_data()
+    # Nodes are in the order components are saved in
+    netlist = netlist_mod.Netlist.build(sorted(circuit.components, key=lambda c: c.id))
+    parts = assign_partitions(netlist, num_partitions)
+    num_partitions = max(parts, default=0) + 1
+    boundary = boundary_nets(netlist, parts)
+    driven = [0] * num_partitions
+    for net in boundary:
+        driven[parts[netlist.net_nodes[net]]] += 1
+
+    context = multiprocessing.get_context()
+    barrier = context.Barrier(num_partitions)
+    buffers = [
+        context.RawArray('B', BUFFER_SIZE + BUFFER_SIZE_PER_NET * count)
+        for count in driven
+    ]
+    next_times = context.RawArray('q', num_partitions)
+    results: 'multiprocessing.Queue[tuple[int, t.Any]]' = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker, daemon=True,
+            args=(index, data, parts, max_ticks, vectorize,
+                  barrier, buffers, next_times, results))
+        for index in range(num_partitions)
+    ]
+    for process in processes:
+        process.start()
+
+    partition_results: dict[int, t.Any] = {}
+    try:
+        while len(partition_results) < num_partitions:
+            try:
+                index, result = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if any(not process.is_alive() for worker, process in enumerate(processes)
+                       if worker not in partition_results):
+                    barrier.abort()
+                    raise RuntimeError('A partition worker exited without a result')
+                continue
+            partition_results[index] = result
+    finally:
+        for process in processes:
+            process.join(POLL_INTERVAL)
+            if process.is_alive():
+                process.terminate()
+
+    for index, result in sorted(partition_results.items()):
+        if isinstance(result, str):
+            raise RuntimeError(f'Partition {index} failed: {result}')
+
+    merged: dict[str, t.Any] = {'components': [], 'updates': {}}
+    for _, result in sorted(partition_results.items()):
+        merged['components'].extend(result['components'])
+        for delay, ids in result['updates'].items():
+            merged['updates'].setdefault(delay, []).extend(ids)
+    merged['components'].sort(key=lambda component_data: component_data['id'])
+    circuit.load(merged)
+
+    first = partition_results[0]
+    return PartitionedRun(
+        first['time'], first['quiescent'],
+        sum(result['suppressed_propagations'] for result in partition_results.values()),
+        num_partitions, len(boundary))
+
+
+def _worker(index: int, data: dict[str, t.Any], parts: list[int],
+            max_ticks: t.Optional[int], vectorize: bool, barrier: t.Any,
+            buffers: list[t.Any], next_times: t.Any, results: t.Any) -> None:
+    try:
+        result = _simulate_partition(
+            index, data, parts, max_ticks, vectorize, barrier, buffers, next_times)
+    except BaseException as error:
+        # Let the other workers stop waiting for this one
+        barrier.abort()
+        results.put((index, f'{type(error).__name__}: {error}'))
+    else:
+        results.put((index, result))
+
+
+def _simulate_partition(index: int, data: dict[str, t.Any], parts: list[int],
+                        max_ticks: t.Optional[int], vectorize: bool, barrier: t.Any,
+                        buffers: list[t.Any], next_times: t.Any) -> dict[str, t.Any]:
+    circuit = circuit_mod.Circuit()
+    # Sorted by id, loaded components are in the order they were saved in, so
+    # they have the same nodes as in the original circuit
+    components = sorted(circuit.load(data), key=lambda c: c.id)
+    original_ids = {
+        component.id: component_data['id']
+        for component, component_data in zip(components, data['components'])
+    }
+    by_original_id = {
+        component_data['id']: component
+        for component, component_data in zip(components, data['components'])
+    }
+    netlist = netlist_mod.Netlist.build(components)
+
+    owned = [node for node in range(netlist.num_nodes) if parts[node] == index]
+    # Components in other partitions that drive this one's inputs
+    drivers = {
+        netlist.net_nodes[netlist.drivers[slot]]
+        for node in owned for slot in netlist.slots(node)
+        if netlist.drivers[slot] >= 0
+    }
+    external = sorted(driver for driver in drivers if parts[driver] != index)
+
+    updates: scheduler.UpdateQueue['component_mod.Component'] = scheduler.UpdateQueue()
+    for delay, ids in data['updates'].items():
+        for id in ids:
+            updates.schedule(by_original_id[id], int(delay))
+    engine = engine_mod.CompiledEngine(
+        [components[node] for node in owned + external], updates, 0,
+        options=options_mod.EngineOptions(vectorize=vectorize),
+        external=[components[node] for node in external])
+
+    local_nodes = engine.netlist.index()
+
+    def local_net(net: int) -> int:
+        node = netlist.net_nodes[net]
+        return (engine.netlist.first_net[local_nodes[components[node]]]
+                + net - netlist.first_net[node])
+
+    outgoing = [
+        (net, local_net(net)) for net in boundary_nets(netlist, parts)
+        if parts[netlist.net_nodes[net]] == index
+    ]
+    incoming = {
+        net: local_net(net)
+        for node in external for net in netlist.nets(node)
+    }
+    sent = {net: engine.net_value(local) for net, local in outgoing}
+
+    end_time = max_ticks
+    time = 0
+    quiescent = False
+    with circuit.divert_updates(engine.schedule_update):
+        while True:
+            changes = []
+            for net, local in outgoing:
+                value = engine.net_value(local)
+                previous = sent[net]
+                if value != previous or type(value) is not type(previous):
+                    changes.append((net, value))
+                    sent[net] = value
+            _write_changes(buffers[index], changes)
+            barrier.wait()
+
+            for other, buffer in enumerate(buffers):
+                if other == index:
+                    continue
+                for net, value in _read_changes(buffer):
+                    local = incoming.get(net)
+                    if local is not None:
+                        engine.write(local, value)
+            next_time = engine.next_update_time()
+            next_times[index] = -1 if next_time is None else next_time
+            barrier.wait()
+
+            scheduled = [next_time for next_time in next_times if next_time >= 0]
+            if not scheduled:
+                quiescent = True
+                break
+            next_time = min(scheduled)
+            if end_time is not None and next_time > end_time:
+                time = end_time
+                break
+            engine.update(next_time)
+            time = next_time
+
+    engine.write_back()
+    component_data = []
+    for node in owned:
+        # The circuit's time wasn't advanced, only the engine's
+        save_data = components[node].get_save_data(time)
+        save_data['id'] = original_ids[save_data['id']]
+        for input_data in save_data['inputs']:
+            connection = input_data['connection']
+            if connection:
+                connection['component_id'] = original_ids[connection['component_id']]
+        component_data.append(save_data)
+    owned_components = {components[node] for node in owned}
+    update_data: dict[int, list[int]] = {}
+    for update_time, scheduled_components in engine.take_updates().items():
+        ids = sorted(original_ids[component.id] for component in scheduled_components
+                     if component in owned_components)
+        if ids:
+            update_data[update_time - time] = ids
+    return {
+        'components': component_data,
+        'updates': update_data,
+        'time': time,
+        'quiescent': quiescent,
+        'suppressed_propagations': engine.suppressed_propagations,
+    }
+
+
+def _write_changes(buffer: t.Any, changes: list[tuple[int, t.Any]]) -> None:
+    payload = pickle.dumps(changes) if changes else b''
+    if _LENGTH.size + len(payload) > len(buffer):
+        raise RuntimeError(
+            f'{len(changes)} boundary changes in one tick need {len(payload)} bytes, '
+            f'more than the {len(buffer)} bytes of shared memory')
+    view = memoryview(buffer).cast('B')
+    _LENGTH.pack_into(view, 0, len(payload))
+    view[_LENGTH.size:_LENGTH.size + len(payload)] = payload
+
+
+def _read_changes(buffer: t.Any) -> list[tuple[int, t.Any]]:
+    view = memoryview(buffer).cast('B')
+    length, = _LENGTH.unpack_from(view, 0)
+    if not length:
+        return []
+    changes: list[tuple[int, t.Any]] = pickle.loads(
+        view[_LENGTH.size:_LENGTH.size + length])
+    return changes
@@ -1,12 +1,11 @@
 import collections.abc as abc
 import typing as t
 
-from gi.repository import Gtk  # type: ignore
-
-from . import property_widgets
 from . import utils
 
 if t.TYPE_CHECKING:
+    from gi.repository import Gtk  # type: ignore
+
     from . import component as component_mod
 
 _T = t.TypeVar('_T')
@@ -34,15 +33,16 @@ class Property(t.Generic[_T]):
     def create_widget(self, component: 'component_mod.Component',
                       callback: t.Optional[
                         abc.Callable[['Property[_T]', 'component_mod.Component', _T],
-                                     None]] = None) -> Gtk.Widget:
+                                     None]] = None) -> 'Gtk.Widget':
         def real_callback(value: _T) -> None:
+            component.circuit.sync()
             self._setter(component, value)
             if callback:
                 callback(self, component, value)
         return self.real_create_widget(component, real_callback)
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[_T], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[_T], None]) -> 'Gtk.Widget':
         raise NotImplementedError()
 
 
@@ -53,7 +53,9 @@ class BoolProperty(Property[bool]):
         self._label = label
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[bool], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[bool], None]) -> 'Gtk.Widget':
+        from . import property_widgets
+
         return property_widgets.create_value_bool_widget(
             label=self._label,
             callback=callback,
@@ -70,7 +72,9 @@ class NumberProperty(Property[int]):
         self._max_value = max_value
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[int], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[int], None]) -> 'Gtk.Widget':
+        from . import property_widgets
+
         return property_widgets.create_value_int_widget(
             label=self._label,
             callback=callback,
@@ -96,7 +100,7 @@ class NumInputsProperty(NumberProperty):
         self._callback = callback
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[int], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[int], None]) -> 'Gtk.Widget':
         def real_callback(value: int) -> None:
             callback(value)
             if self._callback is not None:
@@ -122,7 +126,7 @@ class NumOutputsProperty(NumberProperty):
         self._callback = callback
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[int], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[int], None]) -> 'Gtk.Widget':
         def real_callback(value: int) -> None:
             callback(value)
             if self._callback is not None:
@@ -137,7 +141,9 @@ class StringProperty(Property[str]):
         self._label = label
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[str], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[str], None]) -> 'Gtk.Widget':
+        from . import property_widgets
+
         return property_widgets.create_value_string_widget(
             label=self._label,
             callback=callback,
@@ -152,7 +158,9 @@ class MultiValueProperty(Property[list[t.Any]]):
         self._title = title
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[list[t.Any]], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[list[t.Any]], None]) -> 'Gtk.Widget':
+        from . import property_widgets
+
         return property_widgets.create_multi_value_widget(
             title=self._title,
             callback=callback,
@@ -171,7 +179,9 @@ class RangedMultiValueProperty(Property[list[t.Any]]):
         self._start_index = start_index
 
     def real_create_widget(self, component: 'component_mod.Component',
-                           callback: abc.Callable[[list[t.Any]], None]) -> Gtk.Widget:
+                           callback: abc.Callable[[list[t.Any]], None]) -> 'Gtk.Widget':
+        from . import property_widgets
+
         return property_widgets.create_ranged_multi_value_widget(
             title=self._title,
             callback=callback,
@@ -0,0 +1,358 @@
+''' Run a saved circuit without the GUI
+
+Example:
+python -m circuits.run examples/brainfuck_interpreter.circuit --ticks 10000
+'''
+import argparse
+import collections.abc as abc
+import concurrent.futures
+import dataclasses
+import heapq
+import json
+import os
+import sys
+import time
+import typing as t
+
+from . import circuit as circuit_mod
+from . import codegen
+from . import component as component_mod
+from . import components  # noqa: F401 - import all components
+from .components import storage
+from . import loops
+from . import options as options_mod
+from . import parallel
+from . import utils
+from . import vectorize
+
+
+@dataclasses.dataclass
+class RunResult:
+    ticks: int
+    seconds: float
+    quiescent: bool
+    suppressed_propagations: int = 0
+
+    @property
+    def ticks_per_second(self) -> float:
+        if self.seconds <= 0:
+            return float('inf')
+        return self.ticks / self.seconds
+
+
+def load_circuit(filename: str) -> circuit_mod.Circuit:
+    with open(filename, 'r') as f:
+        data = json.load(f)
+    circuit = circuit_mod.Circuit()
+    circuit.load(data['circuit'])
+    return circuit
+
+
+def save_circuit(circuit: circuit_mod.Circuit, filename: str) -> None:
+    data = {
+        'position': (0.0, 0.0),
+        'circuit': circuit.get_save_data()
+    }
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=4)
+
+
+def find_components(circuit: circuit_mod.Circuit, key: str) \
+        -> list[component_mod.Component]:
+    ''' Find components by name, or by id if key is a number '''
+    return [
+        component for component in circuit.components
+        if component.name == key or str(component.id) == key
+    ]
+
+
+def run(circuit: circuit_mod.Circuit, max_ticks: t.Optional[int] = None) -> RunResult:
+    ''' Update the circuit until nothing is scheduled or max_ticks have run
+
+    Ticks with nothing scheduled are skipped over rather than updated.
+    '''
+    start_time = circuit.time
+    start_suppressed = circuit.suppressed_propagations
+    end_time = None if max_ticks is None else start_time + max_ticks
+    start = time.perf_counter()
+    while True:
+        next_time = circuit.next_update_time()
+        if next_time is None:
+            break
+        if end_time is not None and (next_time > end_time
+                                     or circuit.fast_forward(end_time)):
+            circuit.run_until(end_time)
+            break
+        circuit.advance_to_next_event()
+    seconds = time.perf_counter() - start
+    return RunResult(circuit.time - start_time, seconds,
+                     not circuit.has_pending_updates(),
+                     circuit.suppressed_propagations - start_suppressed)
+
+
+def run_parallel(circuit: circuit_mod.Circuit, max_ticks: t.Optional[int] = None,
+                 options: t.Optional[options_mod.EngineOptions] = None,
+                 jobs: t.Optional[int] = None) -> RunResult:
+    ''' Like run(), but simulates unconnected parts of the circuit in parallel
+
+    The circuit is split into islands of connected components, which are
+    shared between up to `jobs` worker processes (default: one per CPU) and
+    run independently. Their final state is loaded back into the circuit, so
+    its components are replaced by new ones with the same ids. The time of
+    the circuit is reset to zero, as when it is saved and loaded.
+    '''
+    start = time.perf_counter()
+    if options is None:
+        options = options_mod.EngineOptions()
+    islands = utils.get_islands(circuit.components)
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    groups = _group_islands(islands, jobs)
+    if len(groups) <= 1:
+        circuit.engine_options = options
+        return run(circuit, max_ticks)
+
+    tasks = [circuit.get_save_data(group) for group in groups]
+    with concurrent.futures.ProcessPoolExecutor(len(tasks)) as executor:
+        results = list(executor.map(
+            _run_saved, tasks, [max_ticks] * len(tasks), [options] * len(tasks)))
+
+    merged: dict[str, t.Any] = {'components': [], 'updates': {}}
+    for task, (data, _) in zip(tasks, results):
+        _merge_save_data(merged, task, data)
+    merged['components'].sort(key=lambda component_data: component_data['id'])
+    circuit.load(merged)
+
+    island_results = [result for _, result in results]
+    return RunResult(
+        max(result.ticks for result in island_results),
+        time.perf_counter() - start,
+        all(result.quiescent for result in island_results),
+        sum(result.suppressed_propagations for result in island_results))
+
+
+def run_partitioned(circuit: circuit_mod.Circuit, partitions: int,
+                    max_ticks: t.Optional[int] = None,
+                    options: t.Optional[options_mod.EngineOptions] = None) -> RunResult:
+    ''' Like run(), but splits the circuit into partitions simulated in parallel
+
+    See parallel.run_partitioned(). Of the engine options, only vectorize is
+    used by the partitions: zero delay mode isn't supported, and they don't
+    fold, merge or generate code.
+    '''
+    start = time.perf_counter()
+    if options is None:
+        options = options_mod.EngineOptions()
+    result = parallel.run_partitioned(circuit, partitions, max_ticks, options.vectorize)
+    circuit.engine_options = options
+    return RunResult(result.ticks, time.perf_counter() - start, result.quiescent,
+                     result.suppressed_propagations)
+
+
+def _group_islands(islands: list[set[component_mod.Component]],
+                   jobs: int) -> list[set[component_mod.Component]]:
+    # Give the largest islands to the group with the fewest components first
+    groups: list[tuple[int, int, set[component_mod.Component]]] = [
+        (0, index, set()) for index in range(min(jobs, len(islands)))
+    ]
+    for island in sorted(islands, key=len, reverse=True):
+        size, index, group = heapq.heappop(groups)
+        group |= island
+        heapq.heappush(groups, (size + len(island), index, group))
+    return [group for _, _, group in sorted(groups, key=lambda item: item[1])]
+
+
+def _run_saved(data: dict[str, t.Any], max_ticks: t.Optional[int],
+               options: options_mod.EngineOptions) -> tuple[dict[str, t.Any], RunResult]:
+    # Runs in a worker process
+    circuit = circuit_mod.Circuit()
+    circuit.load(data)
+    circuit.engine_options = options
+    result = run(circuit, max_ticks)
+    return circuit.get_save_data(), result
+
+
+def _merge_save_data(merged: dict[str, t.Any], task: dict[str, t.Any],
+                     result: dict[str, t.Any]) -> None:
+    # Components get new ids when loaded, in the order they were saved
+    ids = {
+        new['id']: old['id'] for old, new in zip(task['components'], result['components'])
+    }
+    for component_data in result['components']:
+        component_data['id'] = ids[component_data['id']]
+        for input_data in component_data['inputs']:
+            connection = input_data['connection']
+            if connection:
+                connection['component_id'] = ids[connection['component_id']]
+        merged['components'].append(component_data)
+    for delay, component_ids in result['updates'].items():
+        merged['updates'].setdefault(delay, []).extend(ids[id] for id in component_ids)
+
+
+def output_values(circuit: circuit_mod.Circuit) -> abc.Iterator[tuple[str, t.Any]]:
+    ''' Yield (label, value) for every Display and Console in the circuit '''
+    for component in sorted(circuit.components, key=lambda c: c.id):
+        creator = component.creator
+        if creator is None or creator.category != 'Output':
+            continue
+        label = f'{creator.name} {component.id}'
+        if component.name and component.name != creator.name:
+            label += f' ({component.name})'
+        if creator.name == 'Console':
+            yield label, component.data['text']
+        else:
+            yield label, component.inputs[0].value
+
+
+def main(argv: t.Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m circuits.run',
+        description='Simulate a circuit file without the GUI')
+    parser.add_argument('filename', help='.circuit file to load')
+    parser.add_argument(
+        '--ticks', type=int, default=None,
+        help='Maximum number of ticks to run (default: run until nothing is '
+             'scheduled)')
+    parser.add_argument(
+        '--compiled', action='store_true',
+        help='Simulate with the compiled engine')
+    parser.add_argument(
+        '--zero-delay', action='store_true',
+        help='Update combinational components without a tick of delay. '
+             'Implies --compiled')
+    parser.add_argument(
+        '--collapse', action='store_true',
+        help='Evaluate small trees of boolean gates with lookup tables. '
+             'Implies --zero-delay')
+    parser.add_argument(
+        '--fold', action='store_true',
+        help="Don't update constant components, or components whose outputs "
+             "can't be seen. Implies --compiled")
+    parser.add_argument(
+        '--merge', action='store_true',
+        help='Update components that duplicate another one only once. '
+             'Implies --compiled')
+    parser.add_argument(
+        '--vectorize', action='store_true',
+        help='Update groups of identical components with NumPy. '
+             'Implies --compiled')
+    parser.add_argument(
+        '--generate', action='store_true',
+        help='Simulate with generated Python code. Implies --compiled')
+    parser.add_argument(
+        '--check', action='store_true',
+        help='Instead of running the circuit, run generated code alongside the '
+             'interpreter and stop at the first difference. With other engine '
+             'options, compare it to the compiled engine with the same options '
+             'instead, which only checks the generated code, not whether those '
+             'options change what the circuit does')
+    parser.add_argument(
+        '--loops', action='store_true',
+        help='Report loops of components that may not settle before running, '
+             'and components that updated in every tick at the end')
+    parser.add_argument(
+        '--jobs', type=int, default=1, metavar='N',
+        help='Simulate unconnected parts of the circuit in up to N processes, '
+             'or one per CPU if N is 0 (default: 1)')
+    parser.add_argument(
+        '--partitions', type=int, default=1, metavar='N',
+        help='Split the circuit into N partitions simulated in parallel '
+             'processes, which exchange the values of connections between '
+             'them every tick (default: 1)')
+    parser.add_argument(
+        '--click', action='append', default=[], metavar='NAME',
+        help='Left click the components with this name or id before running. '
+             'May be given multiple times')
+    parser.add_argument(
+        '--show-outputs', action='store_true',
+        help='Print the values of Display and Console components when done')
+    parser.add_argument(
+        '--stats', action='store_true',
+        help='Print simulation statistics when done')
+    parser.add_argument(
+        '--save', metavar='FILENAME',
+        help='Save the circuit state to this file when done')
+    args = parser.parse_args(argv)
+
+    if args.vectorize and not vectorize.available():
+        parser.error('--vectorize requires NumPy')
+    if args.jobs < 0:
+        parser.error('--jobs must not be negative')
+    if args.partitions < 1:
+        parser.error('--partitions must be positive')
+    if args.partitions > 1 and args.jobs != 1:
+        parser.error('--partitions cannot be used with --jobs')
+    if args.partitions > 1 and (args.zero_delay or args.collapse or args.fold
+                                or args.merge or args.generate):
+        parser.error('--partitions cannot be used with --zero-delay, --collapse, '
+                     '--fold, --merge or --generate')
+    if args.check and (args.partitions > 1 or args.jobs != 1 or args.save):
+        parser.error('--check cannot be used with --partitions, --jobs or --save')
+    if args.loops and (args.partitions > 1 or args.jobs != 1):
+        parser.error('--loops cannot be used with --partitions or --jobs')
+    options = options_mod.EngineOptions(
+        compiled=args.compiled, zero_delay=args.zero_delay, vectorize=args.vectorize,
+        generate=args.generate, collapse=args.collapse, fold=args.fold, merge=args.merge)
+
+    circuit = load_circuit(args.filename)
+    circuit.engine_options = options
+
+    for key in args.click:
+        clicked = find_components(circuit, key)
+        if not clicked:
+            parser.error(f'No component named {key}')
+        for component in clicked:
+            component.on_click(utils.MouseButton.LEFT)
+
+    if args.loops:
+        for loop in loops.find_loops(circuit.components):
+            print(loop)
+        circuit.oscillation_detector = loops.OscillationDetector()
+
+    if args.check:
+        reference = ('the compiled engine' if codegen.reference_options(options).compiled
+                     else 'the interpreter')
+        mismatch = codegen.check(circuit, args.ticks)
+        if mismatch is not None:
+            print(f'Generated code differs from {reference}: {mismatch}')
+            sys.exit(1)
+        print(f'Generated code matches {reference}')
+        return
+
+    start_time = circuit.time
+    if args.partitions > 1:
+        result = run_partitioned(circuit, args.partitions, args.ticks, options)
+    elif args.jobs == 1:
+        result = run(circuit, args.ticks)
+    else:
+        result = run_parallel(circuit, args.ticks, options, args.jobs or None)
+    circuit.sync()
+
+    status = 'quiescent' if result.quiescent else 'still running'
+    print(f'Ran {result.ticks} ticks in {result.seconds:.3f}s '
+          f'({result.ticks_per_second:.1f} ticks/s), {status} at time '
+          f'{start_time + result.ticks}')
+
+    if args.stats:
+        print(f'Suppressed propagations: {result.suppressed_propagations}')
+        if circuit.fold_report is not None:
+            print(circuit.fold_report)
+        if circuit.engine_options.merge:
+            print(f'Merged duplicate components: {circuit.num_merged}')
+        for component, stats in storage.page_stats(circuit.components):
+            print(f'Component {component.id} ({component.name}) memory: {stats}')
+
+    if circuit.oscillation_detector is not None:
+        for component in circuit.oscillation_detector.oscillating:
+            print(f'Component {component.id} ({component.name}) is oscillating')
+
+    if args.show_outputs:
+        for label, value in output_values(circuit):
+            print(f'{label}: {value!r}')
+
+    if args.save:
+        save_circuit(circuit, args.save)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+import collections.abc as abc
+import heapq
+import typing as t
+
+
+_T = t.TypeVar('_T')
+
+
+class TimingWheel(t.Generic[_T]):
+    ''' Queue of items scheduled at integer times
+
+    Times less than `size` ticks ahead are stored in a ring of buckets, with
+    a bitmask of the occupied buckets so the next scheduled time can be found
+    without scanning. Later times wait in an overflow heap until they come
+    into range. If track_items is set, the times each item is scheduled at
+    are also recorded so items can be cancelled without searching.
+
+    Times must be popped in order: items can't be scheduled before the
+    current time, which is one past the last time popped.
+    '''
+    def __init__(self, time: int = 0, size: int = 256,
+                 track_items: bool = True) -> None:
+        if size <= 0 or size & (size - 1):
+            raise ValueError(f'Size must be a power of two, got {size}')
+        self._size = size
+        self._mask = size - 1
+        self._time = time
+        self._buckets: list[set[_T]] = [set() for _ in range(size)]
+        self._occupied = 0
+        self._overflow: dict[int, set[_T]] = {}
+        self._overflow_times: list[int] = []
+        self._count = 0
+        self._pending: t.Optional[dict[_T, set[int]]] = {} if track_items else None
+
+    @property
+    def time(self) -> int:
+        ''' The earliest time items can be scheduled at '''
+        return self._time
+
+    def __len__(self) -> int:
+        ''' The number of scheduled (time, item) pairs '''
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count > 0
+
+    def __contains__(self, item: _T) -> bool:
+        return item in self._item_times()
+
+    def __iter__(self) -> abc.Iterator[_T]:
+        ''' Iterate over the scheduled items, each once '''
+        return iter(list(self._item_times()))
+
+    def times(self, item: _T) -> abc.Set[int]:
+        ''' The times an item is scheduled at '''
+        return frozenset(self._item_times().get(item, ()))
+
+    def schedule(self, item: _T, time: int) -> None:
+        offset = time - self._time
+        if 0 <= offset < self._size:
+            index = time & self._mask
+            bucket = self._buckets[index]
+            if item in bucket:
+                return
+            if not bucket:
+                self._occupied |= 1 << index
+            bucket.add(item)
+        elif offset < 0:
+            raise ValueError(f'Cannot schedule at time {time} before {self._time}')
+        else:
+            bucket = self._overflow.get(time)
+            if bucket is None:
+                bucket = self._overflow[time] = set()
+                heapq.heappush(self._overflow_times, time)
+            elif item in bucket:
+                return
+            bucket.add(item)
+        self._count += 1
+        pending = self._pending
+        if pending is not None:
+            times = pending.get(item)
+            if times is None:
+                pending[item] = {time}
+            else:
+                times.add(time)
+
+    def cancel(self, item: _T) -> None:
+        ''' Remove every scheduled update of an item '''
+        for time in self._item_times().pop(item, ()):
+            bucket = self._bucket(time)
+            if bucket is None or item not in bucket:
+                continue
+            bucket.remove(item)
+            self._count -= 1
+            if not bucket:
+                self._remove_bucket(time)
+
+    def peek(self, time: int) -> abc.Set[_T]:
+        ''' The items scheduled at a time '''
+        return frozenset(self._bucket(time) or ())
+
+    def pop(self, time: int) -> set[_T]:
+        ''' Remove and return the items scheduled at a time
+
+        Afterwards the current time is time+1. Raises ValueError if anything
+        is scheduled before the given time.
+        '''
+        if time != self._time:
+            next_time = self.next_time()
+            if next_time is not None and next_time < time:
+                raise ValueError(
+                    f'Cannot pop time {time}, items are scheduled at {next_time}')
+            if time < self._time:
+                raise ValueError(f'Cannot pop time {time} before {self._time}')
+            self._set_time(time)
+
+        index = time & self._mask
+        items = self._buckets[index]
+        if items:
+            self._buckets[index] = set()
+            self._occupied &= ~(1 << index)
+            self._count -= len(items)
+            pending = self._pending
+            if pending is not None:
+                for item in items:
+                    times = pending[item]
+                    if len(times) == 1:
+                        del pending[item]
+                    else:
+                        times.discard(time)
+
+        self._set_time(time + 1)
+        return items
+
+    def next_time(self) -> t.Optional[int]:
+        ''' The earliest time anything is scheduled at, or None if empty '''
+        occupied = self._occupied
+        if occupied:
+            start = self._time & self._mask
+            later = occupied >> start
+            if later:
+                return self._time + _lowest_bit(later)
+            return self._time + self._size - start + _lowest_bit(occupied)
+        while self._overflow_times:
+            time = self._overflow_times[0]
+            if time in self._overflow:
+                return time
+            heapq.heappop(self._overflow_times)
+        return None
+
+    def items(self) -> abc.Iterator[tuple[int, set[_T]]]:
+        ''' Yield (time, items) for every scheduled time, in order '''
+        times = [
+            self._time + offset for offset in range(self._size)
+            if self._occupied & (1 << ((self._time + offset) & self._mask))
+        ]
+        times.extend(sorted(self._overflow))
+        for time in times:
+            yield time, set(self.peek(time))
+
+    def clear(self, time: int = 0) -> None:
+        self._time = time
+        self._buckets = [set() for _ in range(self._size)]
+        self._occupied = 0
+        self._overflow = {}
+        self._overflow_times = []
+        self._count = 0
+        if self._pending is not None:
+            self._pending = {}
+
+    def _item_times(self) -> dict[_T, set[int]]:
+        if self._pending is None:
+            raise RuntimeError('Items are not tracked by this TimingWheel')
+        return self._pending
+
+    def _bucket(self, time: int) -> t.Optional[set[_T]]:
+        if time < self._time:
+            return None
+        if time - self._time < self._size:
+            return self._buckets[time & self._mask]
+        return self._overflow.get(time)
+
+    def _remove_bucket(self, time: int) -> None:
+        if time - self._time < self._size:
+            self._occupied &= ~(1 << (time & self._mask))
+        else:
+            # The stale heap entry is skipped when it's popped
+            del self._overflow[time]
+
+    def _set_time(self, time: int) -> None:
+        # Only valid if nothing is scheduled before the new time
+        self._time = time
+        limit = time + self._size
+        overflow_times = self._overflow_times
+        while overflow_times and overflow_times[0] < limit:
+            overflow_time = heapq.heappop(overflow_times)
+            bucket = self._overflow.pop(overflow_time, None)
+            if bucket:
+                index = overflow_time & self._mask
+                self._buckets[index] = bucket
+                self._occupied |= 1 << index
+
+
+def _lowest_bit(value: int) -> int:
+    return (value & -value).bit_length() - 1
+
+
+class UpdateQueue(t.Generic[_T]):
+    ''' Items scheduled some number of ticks after the current time
+
+    Almost everything is scheduled for the next tick, so those items are kept
+    in a plain set and only later ones go in a TimingWheel.
+    '''
+    def __init__(self, time: int = 0, track_items: bool = True) -> None:
+        self._time = time
+        self._next_updates: set[_T] = set()
+        self._later: TimingWheel[_T] = TimingWheel(time+2, track_items=track_items)
+
+    @property
+    def time(self) -> int:
+        return self._time
+
+    @property
+    def next_updates(self) -> set[_T]:
+        ''' The items scheduled for the next tick, excluding later ones
+
+        Items can be added to this directly to schedule them. It is replaced
+        by a new set when the queue advances.
+        '''
+        return self._next_updates
+
+    def __bool__(self) -> bool:
+        return bool(self._next_updates) or bool(self._later)
+
+    def __iter__(self) -> abc.Iterator[_T]:
+        ''' Iterate over the scheduled items, each once '''
+        return iter(self._next_updates.union(self._later))
+
+    def times(self, item: _T) -> abc.Set[int]:
+        ''' The times an item is scheduled at '''
+        times = self._later.times(item)
+        if item in self._next_updates:
+            times = times | {self._time+1}
+        return times
+
+    def schedule(self, item: _T, delay: int = 1) -> None:
+        if delay <= 1:
+            self._next_updates.add(item)
+        else:
+            self._later.schedule(item, self._time+delay)
+
+    def cancel(self, item: _T) -> None:
+        self._next_updates.discard(item)
+        self._later.cancel(item)
+
+    def peek(self, time: int) -> abc.Set[_T]:
+        ''' The items scheduled at a time '''
+        items = self._later.peek(time)
+        if time == self._time+1:
+            items = items | self._next_updates
+        return items
+
+    def next_time(self) -> t.Optional[int]:
+        ''' The earliest time anything is scheduled at, or None if empty '''
+        if self._next_updates:
+            return self._time+1
+        return self._later.next_time()
+
+    def advance(self) -> set[_T]:
+        ''' Move to the next tick and return the items scheduled for it '''
+        self._time += 1
+        items = self._next_updates
+        self._next_updates = set()
+        if self._later.next_time() == self._time:
+            items |= self._later.pop(self._time)
+        return items
+
+    def advance_to(self, time: int) -> set[_T]:
+        ''' Move to a later tick and return the items scheduled for it
+
+        Raises ValueError if anything is scheduled before that tick.
+        '''
+        if time == self._time+1:
+            return self.advance()
+        if time <= self._time:
+            raise ValueError(f'Cannot advance to time {time} from {self._time}')
+        next_time = self.next_time()
+        if next_time is not None and next_time < time:
+            raise ValueError(
+                f'Cannot advance to time {time}, items are scheduled at {next_time}')
+        self._time = time
+        if next_time == time:
+            return self._later.pop(time)
+        return set()
+
+    def items(self) -> abc.Iterator[tuple[int, set[_T]]]:
+        ''' Yield (time, items) for every scheduled time, in order '''
+        later = self._later.items()
+        if self._next_updates:
+            items = set(self._next_updates)
+            first = next(later, None)
+            if first is not None and first[0] == self._time+1:
+                items |= first[1]
+                first = None
+            yield self._time+1, items
+            if first is not None:
+                yield first
+        yield from later
+
+    def clear(self, time: int = 0) -> None:
+        self._time = time
+        self._next_updates = set()
+        self._later.clear(time+2)
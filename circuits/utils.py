@@ -4,13 +4,15 @@ import inspect
 import pathlib
 import typing as t
 
-from gi.repository import Gtk, Gdk  # type: ignore
-
 from . import circuit as circuit_mod
 from . import component as component_mod
 from . import component_registry
+from . import netlist
 from . import properties
 
+if t.TYPE_CHECKING:
+    from gi.repository import Gtk, Gdk  # type: ignore
+
 
 class MouseButton(enum.IntEnum):
     LEFT = 1
@@ -36,26 +38,41 @@ def data_file(name: str) -> str:
 
 def get_connected_components(components: abc.Iterable['component_mod.Component']) \
         -> set['component_mod.Component']:
-    def build(component: 'component_mod.Component',
-              components: set['component_mod.Component']) -> None:
-        if component in components:
-            return
-        components.add(component)
+    all_components: set['component_mod.Component'] = set()
+    # Iterative so large circuits don't hit the recursion limit
+    stack = list(components)
+    while stack:
+        component = stack.pop()
+        if component in all_components:
+            continue
+        all_components.add(component)
         for input in component.inputs:
             output = input.connected_output
             if output is not None:
-                build(output.component, components)
+                stack.append(output.component)
         for output in component.outputs:
             for connected_input in output.connected_inputs:
-                build(connected_input.component, components)
-    all_components: set['component_mod.Component'] = set()
-    for component in components:
-        build(component, all_components)
+                stack.append(connected_input.component)
     return all_components
 
 
-def show_popup(title: str, options: abc.Iterable[str], event: Gdk.EventButton,
+def get_islands(components: abc.Iterable['component_mod.Component']) \
+        -> list[set['component_mod.Component']]:
+    ''' Split components into sets that aren't connected to each other '''
+    islands = []
+    seen: set['component_mod.Component'] = set()
+    for component in sorted(components, key=lambda c: c.id):
+        if component not in seen:
+            island = get_connected_components([component])
+            seen |= island
+            islands.append(island)
+    return islands
+
+
+def show_popup(title: str, options: abc.Iterable[str], event: 'Gdk.EventButton',
                callback: abc.Callable[[int, str], None]) -> None:
+    from gi.repository import Gtk
+
     menu = Gtk.Menu()
 
     title_menu = Gtk.MenuItem(title)
@@ -63,7 +80,7 @@ def show_popup(title: str, options: abc.Iterable[str], event: Gdk.EventButton,
     menu.append(title_menu)
 
     for i, option in enumerate(options):
-        def activate(widget: Gtk.Widget, option: str = option, i: int = i) -> None:
+        def activate(widget: 'Gtk.Widget', option: str = option, i: int = i) -> None:
             callback(i, option)
 
         item = Gtk.MenuItem(option)
@@ -79,7 +96,12 @@ def create_nary_component(name: str, category: str, function: abc.Callable[...,
                           max_inputs: t.Optional[int] = None,
                           input_labels: t.Optional[list[str]] = None,
                           output_labels: t.Optional[list[str]] = None,
-                          default_value: t.Optional[t.Any] = None) -> None:
+                          default_value: t.Optional[t.Any] = None,
+                          bit_function: t.Optional[abc.Callable[..., int]] = None,
+                          array_function: t.Optional[abc.Callable[..., t.Any]] = None,
+                          array_bool_operands: bool = True,
+                          source_function: t.Optional[abc.Callable[..., str]] = None) \
+        -> None:
     real_min_inputs = min_inputs or len(inspect.signature(function).parameters)
     max_inputs = max_inputs or real_min_inputs
 
@@ -98,6 +120,10 @@ def create_nary_component(name: str, category: str, function: abc.Callable[...,
         on_update(component)
         return component
 
+    creator.kernel = netlist.Kernel(
+        netlist.Kind.NARY, function, default_value, bit_function,
+        array_function, array_bool_operands, source_function)
+
     if real_min_inputs != max_inputs:
         creator.add_property(properties.NumInputsProperty(
             min_value=real_min_inputs, max_value=max_inputs))
@@ -124,7 +150,7 @@ def attr_setter(name: str) -> abc.Callable[['component_mod.Component', t.Any], N
 _T = t.TypeVar('_T')
 
 
-def get_builder_obj(builder: Gtk.Builder, name: str, object_type: t.Type[_T]) -> _T:
+def get_builder_obj(builder: 'Gtk.Builder', name: str, object_type: t.Type[_T]) -> _T:
     obj = builder.get_object(name)
     if obj is None:
         raise RuntimeError(f'Failed to find object {name}')
@@ -0,0 +1,58 @@
+''' Evaluate groups of identical components with NumPy array operations
+
+NumPy is optional: if it isn't installed, available() is False and groups
+are always evaluated one component at a time.
+'''
+import collections.abc as abc
+import typing as t
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+if t.TYPE_CHECKING:
+    from . import netlist as netlist_mod
+
+
+# Smaller groups are faster to evaluate one component at a time
+MIN_GROUP_SIZE = 16
+# Operands must be smaller than this so sums and products of two fit in 64 bits
+MAX_OPERAND = 2**31
+
+
+def available() -> bool:
+    return np is not None
+
+
+def evaluate_group(kernel: 'netlist_mod.Kernel', operands: abc.Sequence[t.Any],
+                   num_operands: int) -> t.Optional[list[t.Any]]:
+    ''' Evaluate a kernel's array_function for a group of components
+
+    operands has the num_operands operands of each component in turn. Returns
+    the result for each component, or None if the operands can't be evaluated
+    as arrays, e.g. because they aren't all ints or are too large, in which
+    case the kernel's function should be used.
+    '''
+    function = kernel.array_function
+    if np is None or function is None or not operands:
+        return None
+    accepted = _INT_TYPES if kernel.array_bool_operands else _INT_ONLY
+    if not set(map(type, operands)) <= accepted:
+        return None
+    try:
+        array = np.array(operands, dtype=np.int64)
+    except OverflowError:
+        return None
+    if array.max() >= MAX_OPERAND or array.min() <= -MAX_OPERAND:
+        return None
+    try:
+        results = function(*array.reshape(-1, num_operands).T)
+    except TypeError:
+        # The function doesn't take this many operands
+        return None
+    return np.broadcast_to(results, len(operands) // num_operands).tolist()
+
+
+_INT_TYPES = frozenset({int, bool})
+_INT_ONLY = frozenset({int})
@@ -0,0 +1,53 @@
+import random
+
+from circuits import circuit as circuit_mod
+from circuits import component as component_mod
+from circuits import components  # noqa: F401 - import all components
+from circuits.component_registry import registry
+
+
+NUM_INSTANCES = 100
+
+
+def _make_circuit(seed: int) -> tuple[circuit_mod.Circuit,
+                                      list[component_mod.Component],
+                                      list[component_mod.Component]]:
+    ''' Buttons into a random network of logic gates '''
+    rnd = random.Random(seed)
+    circuit = circuit_mod.Circuit()
+    buttons = [registry.get_creator('Input', 'Button')(circuit) for _ in range(4)]
+    outputs = [button.outputs[0] for button in buttons]
+    gates = []
+    for _ in range(40):
+        kind = rnd.choice(['And', 'Or', 'Xor', 'Not', 'Nand'])
+        gate = registry.get_creator('Logic', kind)(circuit)
+        for input in gate.inputs:
+            input.connect(rnd.choice(outputs))
+        outputs.append(gate.outputs[0])
+        gates.append(gate)
+    circuit.update()
+    return circuit, buttons, gates
+
+
+def _run(bitslice: bool) -> list[object]:
+    circuit, buttons, gates = _make_circuit(1)
+    batch = circuit.batch(NUM_INSTANCES, bitslice=bitslice)
+    rnd = random.Random(2)
+    history = []
+    for step in range(20):
+        # Change a few instances' inputs, so gates update for some instances
+        button = rnd.choice(buttons)
+        values = batch.values(button.outputs[0])
+        for instance in rnd.sample(range(NUM_INSTANCES), step * 5 + 1):
+            values[instance] = not values[instance]
+        batch.set_values(button.outputs[0], values)
+        for _ in range(5):
+            batch.update()
+            history.append([batch.values(gate.outputs[0]) for gate in gates])
+    history.append(batch.suppressed_propagations)
+    return history
+
+
+def test_bitsliced_matches_batch() -> None:
+    assert _run(bitslice=True) == _run(bitslice=False)
+
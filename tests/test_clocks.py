@@ -0,0 +1,42 @@
+from circuits import circuit as circuit_mod
+from circuits import components  # noqa: F401 - import all components
+from circuits import options
+from circuits.component_registry import registry
+
+
+def _make_circuit() -> circuit_mod.Circuit:
+    ''' A fast clock into the value input of a RAM stored to by a slow clock '''
+    circuit = circuit_mod.Circuit()
+    fast = registry.get_creator('Time', 'Clock')(circuit)
+    fast.data['on_delay'] = 2
+    fast.data['off_delay'] = 3
+    slow = registry.get_creator('Time', 'Clock')(circuit)
+    slow.data['on_delay'] = slow.data['off_delay'] = 1000
+    ram = registry.get_creator('Storage', 'RAM')(circuit)
+    ram.inputs[0].connect(slow.outputs[0])
+    ram.inputs[2].connect(fast.outputs[0])
+    return circuit
+
+
+def _state(circuit: circuit_mod.Circuit) -> list[object]:
+    circuit.sync()
+    return sorted((
+        component.id,
+        [output.value for output in component.outputs],
+        [(input.value, input.new_value) for input in component.inputs],
+        component.data.get('memory'),
+    ) for component in circuit.components)
+
+
+def test_fast_forward_clock_into_ignored_input() -> None:
+    expected = _make_circuit()
+    expected.run_until(5000)
+
+    circuit = _make_circuit()
+    circuit.engine_options = options.EngineOptions(compiled=True)
+    circuit.run_until(10)
+    # The fast clock is skipped over until the slow clock's next edge
+    assert circuit.fast_forward(999)
+    circuit.run_until(5000)
+    assert circuit.time == 5000
+    assert _state(circuit) == _state(expected)
@@ -0,0 +1,55 @@
+import pathlib
+
+import pytest
+
+from circuits import circuit as circuit_mod
+from circuits import codegen
+from circuits import netlist
+from circuits import options
+from circuits import run
+from circuits import utils
+
+
+EXAMPLE = (pathlib.Path(__file__).parent.parent / 'examples'
+           / 'brainfuck_interpreter.circuit')
+
+
+def _load(engine_options: options.EngineOptions) -> circuit_mod.Circuit:
+    ''' The brainfuck interpreter example, running its program '''
+    circuit = run.load_circuit(str(EXAMPLE))
+    circuit.engine_options = engine_options
+    for component in run.find_components(circuit, 'Run'):
+        component.on_click(utils.MouseButton.LEFT)
+    return circuit
+
+
+@pytest.mark.parametrize('engine_options', [
+    options.EngineOptions(generate=True),
+    options.EngineOptions(generate=True, fold=True),
+    options.EngineOptions(generate=True, merge=True),
+    options.EngineOptions(generate=True, zero_delay=True),
+    options.EngineOptions(generate=True, zero_delay=True, collapse=True),
+])
+def test_check_example(engine_options: options.EngineOptions) -> None:
+    circuit = _load(engine_options)
+    data = circuit.get_save_data()
+    assert codegen.check(circuit, 2000) is None
+    # The circuit itself isn't run
+    assert circuit.get_save_data() == data
+
+
+def test_check_finds_mismatch(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Gates pass on their first input instead
+    monkeypatch.setitem(codegen._GENERATORS, netlist.Kind.NARY,
+                        codegen._generate_pass_through)
+    mismatch = codegen.check(_load(options.EngineOptions(generate=True)), 2000)
+    assert mismatch is not None
+    assert 'instead of' in str(mismatch)
+
+
+def test_reference_options() -> None:
+    assert codegen.reference_options(
+        options.EngineOptions(compiled=True, generate=True)) == options.EngineOptions()
+    assert codegen.reference_options(
+        options.EngineOptions(generate=True, fold=True)
+    ) == options.EngineOptions(fold=True)
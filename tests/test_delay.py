@@ -0,0 +1,97 @@
+import json
+import typing as t
+
+import pytest
+
+from circuits import circuit as circuit_mod
+from circuits import component as component_mod
+from circuits import components  # noqa: F401 - import all components
+from circuits import options
+from circuits.component_registry import registry
+
+
+ENGINE_OPTIONS = [
+    options.EngineOptions(),
+    options.EngineOptions(compiled=True),
+    options.EngineOptions(generate=True),
+]
+
+
+def _make_circuit(delay: int) -> tuple[circuit_mod.Circuit,
+                                       component_mod.Component,
+                                       component_mod.Component]:
+    ''' A Clock into a Delay '''
+    circuit = circuit_mod.Circuit()
+    clock = registry.get_creator('Time', 'Clock')(circuit)
+    clock.data['on_delay'] = 3
+    clock.data['off_delay'] = 5
+    component = registry.get_creator('Time', 'Delay')(circuit)
+    component.data['delay'] = delay
+    component.inputs[0].connect(clock.outputs[0])
+    return circuit, clock, component
+
+
+def _history(circuit: circuit_mod.Circuit, clock: component_mod.Component,
+             component: component_mod.Component,
+             ticks: int) -> dict[int, tuple[t.Any, t.Any]]:
+    ''' The Clock's and Delay's outputs after each tick '''
+    history = {}
+    for _ in range(ticks):
+        circuit.update()
+        circuit.sync()
+        history[circuit.time] = (clock.outputs[0].value, component.outputs[0].value)
+    return history
+
+
+@pytest.mark.parametrize('engine_options', ENGINE_OPTIONS)
+@pytest.mark.parametrize('delay', [1, 2, 7, 1000])
+def test_delay_shifts_input(delay: int, engine_options: options.EngineOptions) -> None:
+    circuit, clock, component = _make_circuit(delay)
+    circuit.engine_options = engine_options
+    history = _history(circuit, clock, component, delay + 40)
+    for time in range(delay + 2, delay + 40):
+        assert history[time][1] == history[time - delay][0]
+    # Only the changes waiting to be output are queued, two each period
+    assert len(component.data['updates']) <= delay // 4 + 2
+
+
+@pytest.mark.parametrize('engine_options', ENGINE_OPTIONS)
+def test_lowered_delay_stays_in_order(engine_options: options.EngineOptions) -> None:
+    circuit, clock, component = _make_circuit(100)
+    circuit.engine_options = engine_options
+    circuit.run_until(150)
+    circuit.sync()
+    component.data['delay'] = 10
+    for _ in range(200):
+        circuit.update()
+        circuit.sync()
+        times = [update_time for _, update_time in component.data['updates']]
+        assert times == sorted(set(times))
+        assert all(update_time >= circuit.time for update_time in times)
+    history = _history(circuit, clock, component, 40)
+    for time in range(circuit.time - 29, circuit.time + 1):
+        assert history[time][1] == history[time - 10][0]
+
+
+@pytest.mark.parametrize('engine_options', ENGINE_OPTIONS)
+def test_save_load_keeps_queue(engine_options: options.EngineOptions) -> None:
+    expected, _, expected_component = _make_circuit(150)
+    expected.engine_options = engine_options
+    expected.run_until(500)
+    expected.sync()
+
+    circuit, _, _ = _make_circuit(150)
+    circuit.engine_options = engine_options
+    circuit.run_until(234)
+    data = json.loads(json.dumps(circuit.get_save_data()))
+    loaded = circuit_mod.Circuit()
+    loaded.load(data)
+    loaded.engine_options = engine_options
+    loaded.run_until(500 - 234)
+    loaded.sync()
+    component = next(
+        component for component in loaded.components
+        if isinstance(component, type(expected_component)))
+    assert component.outputs[0].value == expected_component.outputs[0].value
+    assert ([(value, time + 234) for value, time in component.data['updates']]
+            == list(expected_component.data['updates']))
@@ -0,0 +1,187 @@
+import random
+import typing as t
+
+import pytest
+
+from circuits import circuit as circuit_mod
+from circuits import component as component_mod
+from circuits import components  # noqa: F401 - import all components
+from circuits import fold
+from circuits import netlist
+from circuits import options
+from circuits import utils
+from circuits import vectorize
+from circuits.component_registry import registry
+
+
+# What random circuits are made of, besides their inputs
+_GATES = ('And', 'Or', 'Nand', 'Nor', 'Xor', 'Not', 'Mux')
+_KINDS = [('Logic', name) for name in _GATES] * 3 + [
+    ('Bitwise', 'And'), ('Arithmetic', 'Add'), ('Compare', '<'), ('Storage', 'RAM'),
+    ('Time', 'PassThrough'), ('Time', 'Delay'), ('Output', 'Display'),
+] + [('Storage', 'Memory')] * 4
+
+
+def _create(circuit: circuit_mod.Circuit, category: str,
+            name: str) -> component_mod.Component:
+    return registry.get_creator(category, name)(circuit)
+
+
+def _click_through_gate(engine_options: options.EngineOptions) -> t.Any:
+    ''' Click a Button into an Or gate into a Memory's clk, and get what it stored '''
+    circuit = circuit_mod.Circuit()
+    circuit.engine_options = engine_options
+    button = _create(circuit, 'Input', 'Button')
+    gate = _create(circuit, 'Logic', 'Or')
+    memory = _create(circuit, 'Storage', 'Memory')
+    constant = _create(circuit, 'Input', 'Constant')
+    gate.inputs[0].connect(button.outputs[0])
+    memory.inputs[0].connect(gate.outputs[0])
+    memory.inputs[1].connect(constant.outputs[0])
+    circuit.run_until(3)
+    button.on_click(utils.MouseButton.LEFT)
+    circuit.run_until(13)
+    circuit.sync()
+    return memory.outputs[0].value
+
+
+@pytest.mark.parametrize('engine_options', [
+    options.EngineOptions(compiled=True),
+    options.EngineOptions(zero_delay=True),
+    options.EngineOptions(collapse=True),
+    options.EngineOptions(zero_delay=True, generate=True),
+])
+def test_click_through_gate(engine_options: options.EngineOptions) -> None:
+    expected = _click_through_gate(options.EngineOptions())
+    assert expected is not None
+    assert _click_through_gate(engine_options) == expected
+
+
+def _random_circuit(seed: int) -> tuple[circuit_mod.Circuit,
+                                        list[component_mod.Component]]:
+    ''' Random components fed by Clocks, Buttons and Constants, and the Buttons
+
+    Some components duplicate an earlier one, with the same inputs, and a few
+    inputs are connected back to later outputs to make loops.
+    '''
+    rnd = random.Random(seed)
+    circuit = circuit_mod.Circuit()
+    outputs = []
+    for _ in range(2):
+        clock = _create(circuit, 'Time', 'Clock')
+        clock.data['on_delay'] = rnd.randint(1, 7)
+        clock.data['off_delay'] = rnd.randint(1, 7)
+        outputs.append(clock.outputs[0])
+    buttons = [_create(circuit, 'Input', 'Button') for _ in range(5)]
+    outputs.extend(button.outputs[0] for button in buttons)
+    for value in (0, 1, 5, None, True, False):
+        constant = _create(circuit, 'Input', 'Constant')
+        constant.outputs[0].value = value
+        outputs.append(constant.outputs[0])
+    created: list[tuple[tuple[str, str], component_mod.Component]] = []
+    for _ in range(60):
+        if created and rnd.random() < 0.3:
+            kind, original = rnd.choice(created)
+            component = _create(circuit, *kind)
+            for input, original_input in zip(component.inputs, original.inputs):
+                if original_input.connected_output is not None:
+                    input.connect(original_input.connected_output)
+        else:
+            kind = rnd.choice(_KINDS)
+            component = _create(circuit, *kind)
+            for input in component.inputs:
+                # Mostly recent outputs, to make longer paths, and Buttons
+                if rnd.random() < 0.15:
+                    input.connect(rnd.choice(buttons).outputs[0])
+                elif rnd.random() < 0.5:
+                    input.connect(rnd.choice(outputs[-8:]))
+                elif rnd.random() < 0.9:
+                    input.connect(rnd.choice(outputs))
+        created.append((kind, component))
+        outputs.extend(component.outputs)
+    for _, component in rnd.sample(created, 3):
+        if component.inputs:
+            component.inputs[0].connect(rnd.choice(outputs))
+    return circuit, buttons
+
+
+def _state(circuit: circuit_mod.Circuit, pure: bool = True) -> list[t.Any]:
+    ''' Everything about the circuit's components that can be compared
+
+    Old values aren't, for components that only set their outputs from their
+    inputs (see fold.PURE_KINDS), and those are left out if pure isn't set.
+    The engine keeps running, so this can be called after every tick.
+    '''
+    circuit.refresh()
+    state = []
+    for component in sorted(circuit.components, key=lambda component: component.id):
+        kernel = netlist.get_kernel(component)
+        is_pure = kernel is not None and kernel.kind in fold.PURE_KINDS
+        if is_pure and not pure:
+            continue
+        state.append((
+            component.id,
+            [(output.value, type(output.value)) for output in component.outputs],
+            [input.state[:2] if is_pure else (input.state, input.edge_state)
+             for input in component.inputs],
+            repr(component.data),
+        ))
+    return state
+
+
+def _run_random(seed: int, engine_options: options.EngineOptions,
+                pure: bool = True) -> list[t.Any]:
+    ''' The state of a random circuit after each tick, clicking its Buttons
+
+    pure is passed on to _state().
+    '''
+    circuit, buttons = _random_circuit(seed)
+    circuit.engine_options = engine_options
+    rnd = random.Random(seed)
+    states = []
+    for phase in range(30):
+        if phase:
+            rnd.choice(buttons).on_click(utils.MouseButton.LEFT)
+        for _ in range(rnd.randint(1, 8)):
+            circuit.update()
+            states.append((circuit.time, _state(circuit, pure)))
+    return states
+
+
+@pytest.mark.parametrize('engine_options', [
+    options.EngineOptions(compiled=True),
+    options.EngineOptions(generate=True),
+    options.EngineOptions(fold=True),
+    options.EngineOptions(fold=True, merge=True, generate=True),
+    pytest.param(options.EngineOptions(vectorize=True), marks=pytest.mark.skipif(
+        not vectorize.available(), reason='NumPy is not installed')),
+])
+@pytest.mark.parametrize('seed', range(5))
+def test_matches_interpreter(seed: int, engine_options: options.EngineOptions) -> None:
+    # Folded components' state is only up to date once the engine is discarded
+    pure = not engine_options.fold
+    expected = _run_random(seed, options.EngineOptions(), pure)
+    assert _run_random(seed, engine_options, pure) == expected
+
+
+@pytest.mark.parametrize('engine_options', [
+    options.EngineOptions(collapse=True),
+    options.EngineOptions(collapse=True, generate=True),
+    options.EngineOptions(collapse=True, fold=True),
+])
+@pytest.mark.parametrize('seed', range(30))
+def test_collapse_matches_zero_delay(seed: int,
+                                     engine_options: options.EngineOptions) -> None:
+    pure = not engine_options.fold
+    expected = _run_random(seed, options.EngineOptions(zero_delay=True), pure)
+    assert _run_random(seed, engine_options, pure) == expected
+
+
+@pytest.mark.parametrize('engine_options', [
+    options.EngineOptions(merge=True),
+    options.EngineOptions(merge=True, generate=True),
+])
+@pytest.mark.parametrize('seed', range(40))
+def test_merge_matches_interpreter(seed: int,
+                                   engine_options: options.EngineOptions) -> None:
+    assert _run_random(seed, engine_options) == _run_random(seed, options.EngineOptions())
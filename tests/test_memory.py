@@ -0,0 +1,147 @@
+import json
+
+import pytest
+
+from circuits import circuit as circuit_mod
+from circuits import memory
+from circuits import options
+from circuits.component_registry import registry
+from circuits.components import storage
+
+
+@pytest.mark.parametrize('memory_class', [memory.WordMemory, memory.SparseMemory])
+def test_stores_words(memory_class: type) -> None:
+    words = memory_class(20, 8, fill=3)
+    assert list(words[address] for address in range(20)) == [3] * 20
+    words[0] = 0x1ff
+    words[1] = -1
+    words[2] = None
+    words[3] = 1.5
+    words[19] = 7
+    assert [words[address] for address in range(5)] == [0xff, 0xff, 0, 0, 3]
+    assert words[19] == 7
+    assert len(words) == 20
+    assert words.word_width == 8
+
+
+@pytest.mark.parametrize('memory_class', [memory.WordMemory, memory.SparseMemory])
+@pytest.mark.parametrize('word_width', [1, 8, 9, 33, 64])
+def test_save_load(memory_class: type, word_width: int) -> None:
+    words = memory_class(5000, word_width)
+    for address in (0, 1, 4095, 4096, 4999):
+        words[address] = (1 << word_width) - 1 - address
+    loaded = memory.load(json.loads(json.dumps(words.get_save_data())))
+    assert type(loaded) is memory_class
+    assert loaded == words
+    assert list(loaded.items()) == list(words.items())
+
+
+@pytest.mark.parametrize('memory_class', [memory.WordMemory, memory.SparseMemory])
+def test_bad_sizes(memory_class: type) -> None:
+    with pytest.raises(ValueError):
+        memory_class(0, 8)
+    with pytest.raises(ValueError):
+        memory_class(10, 0)
+    with pytest.raises(ValueError):
+        memory_class(10, memory.MAX_WORD_WIDTH + 1)
+
+
+@pytest.mark.parametrize('memory_class', [memory.WordMemory, memory.SparseMemory])
+def test_out_of_range(memory_class: type) -> None:
+    words = memory_class(10, 8)
+    words[5] = 1
+    # Past the end of an allocated page, and in one that isn't
+    for address in (10, memory.PAGE_SIZE):
+        with pytest.raises(IndexError):
+            words[address]
+        with pytest.raises(IndexError):
+            words[address] = 1
+
+
+def test_sparse_pages() -> None:
+    words = memory.SparseMemory(memory.MAX_SPARSE_WORDS, 16, fill=0xabcd)
+    assert words[memory.MAX_SPARSE_WORDS - 1] == 0xabcd
+    assert words.page_stats.allocated_pages == 0
+    words[memory.MAX_SPARSE_WORDS - 1] = 1
+    words[memory.PAGE_SIZE + 1] = 2
+    stats = words.page_stats
+    assert stats.num_pages == memory.MAX_SPARSE_WORDS // memory.PAGE_SIZE
+    assert stats.allocated_pages == 2
+    assert stats.allocated_bytes == 2 * memory.PAGE_SIZE * 2
+    items = dict(words.items())
+    assert len(items) == 2 * memory.PAGE_SIZE
+    assert items[memory.PAGE_SIZE + 1] == 2
+    assert items[memory.PAGE_SIZE] == 0xabcd
+    # Pages of fill are the same as pages that aren't allocated
+    other = memory.SparseMemory(memory.MAX_SPARSE_WORDS, 16, fill=0xabcd)
+    other[0] = 0xabcd
+    other[memory.MAX_SPARSE_WORDS - 1] = 1
+    other[memory.PAGE_SIZE + 1] = 2
+    assert other == words
+    other[0] = 0
+    assert other != words
+
+
+def test_sparse_items_stop_at_size() -> None:
+    words = memory.SparseMemory(10, 8)
+    words[9] = 1
+    assert list(words.items()) == [(address, int(address == 9)) for address in range(10)]
+
+
+def _typed_ram(engine_options: options.EngineOptions) -> circuit_mod.Circuit:
+    ''' A Clock storing constants to a Typed RAM '''
+    circuit = circuit_mod.Circuit()
+    circuit.engine_options = engine_options
+    clock = registry.get_creator('Time', 'Clock')(circuit)
+    address = registry.get_creator('Input', 'Constant')(circuit)
+    value = registry.get_creator('Input', 'Constant')(circuit)
+    ram = registry.get_creator('Storage', 'Typed RAM')(circuit)
+    address.outputs[0].value = 5
+    value.outputs[0].value = 0x1234
+    ram.inputs[0].connect(clock.outputs[0])
+    ram.inputs[1].connect(address.outputs[0])
+    ram.inputs[2].connect(value.outputs[0])
+    return circuit
+
+
+@pytest.mark.parametrize('engine_options', [
+    options.EngineOptions(),
+    options.EngineOptions(compiled=True),
+    options.EngineOptions(generate=True),
+])
+@pytest.mark.parametrize('sparse', [False, True])
+def test_typed_ram(engine_options: options.EngineOptions, sparse: bool) -> None:
+    circuit = _typed_ram(engine_options)
+    ram, = [component for component in circuit.components
+            if isinstance(component, storage.TypedRAMComponent)]
+    storage.sparse_setter(ram, sparse)
+    storage.size_setter(ram, 1 << 20 if sparse else 1000)
+    circuit.run_until(10)
+    circuit.sync()
+    assert ram.data['memory'][5] == 0x34
+    assert ram.outputs[0].value == 0x34
+    assert type(ram.outputs[0].value) is int
+
+    loaded = circuit_mod.Circuit()
+    loaded.load(json.loads(json.dumps(circuit.get_save_data())))
+    loaded_ram, = [component for component in loaded.components
+                   if isinstance(component, storage.TypedRAMComponent)]
+    assert loaded_ram.data['memory'] == ram.data['memory']
+
+
+def test_typed_ram_replace_memory() -> None:
+    ram = registry.get_creator('Storage', 'Typed RAM')(circuit_mod.Circuit())
+    ram.data['memory'][0] = 0xff
+    storage.fill_setter(ram, 0x1ff)
+    # Unstored words become the new fill, which is kept to the word width
+    assert ram.data['fill'] == 0xff
+    assert ram.data['memory'][1] == 0xff
+    storage.word_width_setter(ram, 4)
+    assert ram.data['fill'] == 0xf
+    assert ram.data['memory'][0] == 0xf
+    storage.sparse_setter(ram, True)
+    assert isinstance(ram.data['memory'], memory.SparseMemory)
+    assert ram.data['memory'].page_stats.allocated_pages == 0
+    storage.size_setter(ram, memory.MAX_SPARSE_WORDS)
+    with pytest.raises(ValueError):
+        storage.sparse_setter(ram, False)
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from circuits import scheduler
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_timing_wheel_matches_dict(seed: int) -> None:
+    ''' Schedule, cancel and pop at random, with most times in the overflow '''
+    rnd = random.Random(seed)
+    wheel: scheduler.TimingWheel[int] = scheduler.TimingWheel(size=8)
+    expected: dict[int, set[int]] = {}
+    time = 0
+    while time < 500:
+        for _ in range(rnd.randint(0, 4)):
+            item = rnd.randrange(20)
+            scheduled_time = time + rnd.choice([0, 1, 5, 7, 8, 9, 30, 100])
+            wheel.schedule(item, scheduled_time)
+            expected.setdefault(scheduled_time, set()).add(item)
+        if rnd.random() < 0.2:
+            item = rnd.randrange(20)
+            assert item in wheel or not any(item in items for items in expected.values())
+            wheel.cancel(item)
+            for items in expected.values():
+                items.discard(item)
+        expected = {time: items for time, items in expected.items() if items}
+        assert len(wheel) == sum(len(items) for items in expected.values())
+        assert list(wheel.items()) == sorted(expected.items())
+        next_time = min(expected, default=None)
+        assert wheel.next_time() == next_time
+        if next_time is None or rnd.random() < 0.5:
+            assert wheel.pop(time) == expected.pop(time, set())
+            time += 1
+        else:
+            assert wheel.pop(next_time) == expected.pop(next_time)
+            time = next_time + 1
+        assert wheel.time == time
+
+
+def test_timing_wheel_overflow_comes_into_range() -> None:
+    wheel: scheduler.TimingWheel[str] = scheduler.TimingWheel(size=4)
+    wheel.schedule('a', 10)
+    wheel.schedule('b', 10)
+    wheel.schedule('c', 3)
+    assert wheel.times('a') == {10}
+    assert wheel.next_time() == 3
+    assert wheel.pop(3) == {'c'}
+    # 10 is still past the end of the wheel
+    assert wheel.peek(10) == {'a', 'b'}
+    wheel.cancel('b')
+    assert wheel.pop(10) == {'a'}
+    assert not wheel
+    assert wheel.next_time() is None
+
+
+def test_timing_wheel_cancelled_overflow_time_is_skipped() -> None:
+    wheel: scheduler.TimingWheel[str] = scheduler.TimingWheel(size=4)
+    wheel.schedule('a', 20)
+    wheel.schedule('b', 30)
+    wheel.cancel('a')
+    assert wheel.next_time() == 30
+    assert list(wheel.items()) == [(30, {'b'})]
+
+
+def test_timing_wheel_errors() -> None:
+    with pytest.raises(ValueError):
+        scheduler.TimingWheel(size=6)
+    wheel: scheduler.TimingWheel[str] = scheduler.TimingWheel(time=5, size=4)
+    with pytest.raises(ValueError):
+        wheel.schedule('a', 4)
+    wheel.schedule('a', 7)
+    with pytest.raises(ValueError):
+        wheel.pop(8)
+    with pytest.raises(ValueError):
+        wheel.pop(4)
+    untracked: scheduler.TimingWheel[str] = scheduler.TimingWheel(track_items=False)
+    untracked.schedule('a', 1)
+    with pytest.raises(RuntimeError):
+        untracked.cancel('a')
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_update_queue_matches_dict(seed: int) -> None:
+    rnd = random.Random(seed)
+    queue: scheduler.UpdateQueue[int] = scheduler.UpdateQueue()
+    expected: dict[int, set[int]] = {}
+    for _ in range(300):
+        for _ in range(rnd.randint(0, 3)):
+            item = rnd.randrange(20)
+            delay = rnd.choice([1, 1, 1, 2, 3, 300, 1000])
+            queue.schedule(item, delay)
+            expected.setdefault(queue.time + delay, set()).add(item)
+        assert list(queue.items()) == sorted(expected.items())
+        assert queue.next_time() == min(expected, default=None)
+        if expected and rnd.random() < 0.3:
+            time = min(expected)
+            assert queue.advance_to(time) == expected.pop(time)
+        else:
+            time = queue.time + 1
+            assert queue.advance() == expected.pop(time, set())